@@ -1,4 +1,24 @@
 from .nodes import *
-from .parser import parse
-from .codegen import codegen
+from .codegen import codegen, codegen_many, check_targets, write_output
+from .registry import TargetRegistry, targets
 from .debug import DebugTree
+
+# The parser pulls in PLY which is fairly expensive to import, only load
+# it when it's actually used. The codegen targets are loaded lazily by
+# codegen.targets.
+_lazy_attrs = {
+    "parse":   "parser",
+    "Watcher": "watch",
+}
+
+def __getattr__(name):
+    module = _lazy_attrs.get(name)
+    if module is None:
+        raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
+    import importlib
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attrs))
@@ -3,7 +3,6 @@ This module contains the tree nodes that represent the C++ code to be output.
 """
 
 from . import ccodeio
-import inspect
 import os
 import re
 import sys
@@ -18,6 +17,12 @@ class BlankLine(CCodeNode):
     def codegen(self, out):
         out.write_line('')
 
+class Comment(CCodeNode):
+    def __init__(self, text=""):
+        self.text = text
+    def codegen(self, out, current_access=None):
+        out.write_line('// ' + self.text)
+
 class CppMacro(CCodeNode):
     """
     All the C-Preprocessor macros subclass this. The `first` field is the
@@ -69,10 +74,15 @@ class CppEndif(CppMacro):
 
 class CppLine(CppMacro):
     def codegen(self, out):
+        if out.line_map and not out.map_line(self.first, self.second):
+            return
         super().codegen(out, name='line')
 
 class CppLineReset(CppMacro):
     def codegen(self, out):
+        if out.line_map:
+            out.defer_line_reset()
+            return
         loc = out.reset_location
         CppLine(first='%d' % (out.reset_location.line + 1),
                 second='"%s"' % out.reset_location.file
@@ -85,6 +95,12 @@ class TranslationUnit(CCodeNode):
         self.is_header = is_header
         self.stmts = [] if stmts is None else stmts
     def codegen(self, out):
+        self.codegen_begin(out)
+        for stmt in self.stmts:
+            stmt.codegen(out)
+        self.codegen_end(out)
+    def codegen_begin(self, out):
+        " Everything before the statements, for rendering them piecemeal. "
         def fn_to_ident(fn):
             return re.sub(r'[^a-zA-Z_0-9]+', '_', os.path.basename(fn))
         out.write_line('// This file is auto-generated, do not edit.')
@@ -97,8 +113,7 @@ class TranslationUnit(CCodeNode):
             for inc in self.includes:
                 inc.codegen(out)
             out.write('\n')
-        for stmt in self.stmts:
-            stmt.codegen(out)
+    def codegen_end(self, out):
         # ...
         if self.is_header:
             out.write('\n')
@@ -110,10 +125,14 @@ class Namespace(CCodeNode):
         self.trailing_comment = trailing_comment
         self.stmts = [] if stmts is None else stmts
     def codegen(self, out):
-        out.write_line('namespace ' + self.name + ' {')
-        out.indent()
+        self.codegen_begin(out)
         for stmt in self.stmts:
             stmt.codegen(out)
+        self.codegen_end(out)
+    def codegen_begin(self, out):
+        out.write_line('namespace ' + self.name + ' {')
+        out.indent()
+    def codegen_end(self, out):
         out.unindent()
         out.write_line('}')
 
@@ -156,7 +175,7 @@ class Parameter(CCodeNode):
             self.type.codegen(out)
             out.write(' ' + self.name)
             if self.default:
-                out.write('=')
+                out.write(' = ')
                 self.default.codegen(out)
 
 class InitializerArgument(CCodeNode):
@@ -288,16 +307,35 @@ class Method(CCodeNode):
             out.write_line('}')
 
 class InlineMethod(ClassMember):
-    def __init__(self, type=None, name="", params=None, stmts=None, is_const=False):
+    def __init__(self, type=None, name="", params=None, stmts=None, is_const=False,
+                 is_virtual=False, is_static=False, template_args=None, is_inline=False):
         super().__init__()
         self.type = type
         self.name = name
-        self.params = [] if params is not None else params
-        self.stmts = [] if stmts is not None else stmts
+        self.params = [] if params is None else params
+        self.stmts = [] if stmts is None else stmts
         self.is_const = is_const
+        self.is_virtual = is_virtual
+        self.is_static = is_static
+        self.template_args = [] if template_args is None else template_args
+        self.is_inline = is_inline
     def codegen(self, out, current_access=None):
         self.access.codegen(out, current_access)
+        if self.template_args:
+            out.write_indented('template <')
+            last = self.template_args[-1]
+            for arg in self.template_args:
+                arg.codegen(out)
+                if arg is not last:
+                    out.write(', ')
+            out.write('>\n')
         out.write_indented('')
+        if self.is_virtual:
+            out.write('virtual ')
+        if self.is_static:
+            out.write('static ')
+        if self.is_inline:
+            out.write('inline ')
         self.type.codegen(out)
         out.write(' ' + self.name + '(')
         if self.params:
@@ -320,6 +358,12 @@ class InlineMethod(ClassMember):
             out.unindent()
             out.write_line('}')
 
+class Function(InlineMethod):
+    " A free function defined in a header, so it's inline. "
+    def __init__(self, type=None, name="", params=None, stmts=None, template_args=None):
+        super().__init__(type=type, name=name, params=params, stmts=stmts,
+                         template_args=template_args, is_inline=True)
+
 class Constructor(ClassMember):
     def __init__(self, name="", params=None, initializers=None, stmts=None):
         super().__init__()
@@ -358,10 +402,11 @@ class Constructor(ClassMember):
             out.write('\n')
             for stmt in self.stmts:
                 stmt.codegen(out)
+            out.unindent()
             out.write_line('}')
         else:
             out.write('}\n')
-        out.unindent()
+            out.unindent()
 
 class Destructor(CCodeNode):
     def __init__(self, name="", stmts=None, is_virtual=False, is_inline=False):
@@ -419,6 +464,42 @@ class Stmt(CCodeNode):
             if len(self.code) > 0:
                 out.write('\n')
 
+class Block(CCodeNode):
+    " A braced block of statements, ex. `while (cond) { ... }`. "
+    def __init__(self, head="", stmts=None):
+        self.head = head
+        self.stmts = [] if stmts is None else stmts
+    def codegen(self, out):
+        if self.head:
+            out.write_line(self.head + ' {')
+        else:
+            out.write_line('{')
+        out.indent()
+        for stmt in self.stmts:
+            stmt.codegen(out)
+        out.unindent()
+        out.write_line('}')
+
+class Enum(CCodeNode):
+    " An enum with each enumerator on its own line. "
+    def __init__(self, name="", type=None, values=None, is_scoped=True):
+        self.name = name
+        self.type = type
+        self.values = [] if values is None else values
+        self.is_scoped = is_scoped
+    def codegen(self, out):
+        out.write_indented('enum class ' if self.is_scoped else 'enum ')
+        out.write(self.name)
+        if self.type:
+            out.write(' : ')
+            self.type.codegen(out)
+        out.write(' {\n')
+        out.indent()
+        for value in self.values:
+            out.write_line(value + ',')
+        out.unindent()
+        out.write_line('};')
+
 class DataType(CCodeNode):
     def __init__(self, name="", namespace=""):
         self.name = name
@@ -508,7 +589,7 @@ class CCodeVisitor(object):
     def generic_visit(self, node):
         pass
     def visit(self, node):
-        for cls in inspect.getmro(node.__class__):
+        for cls in node.__class__.__mro__:
             func_name = 'visit_' + cls.__name__
             if hasattr(self, func_name):
                 func = getattr(self, func_name)
@@ -1,13 +1,44 @@
+import re
 from . import codeio
 from . import nodes
 
 class CCodeIO(codeio.CodeIO):
 
-    def __init__(self, fn, indent='  ', cpp_indent=' '):
-        super().__init__(fn, indent)
+    def __init__(self, fn, indent='  ', cpp_indent=' ', line_map=False, stream=None):
+        super().__init__(fn, indent, stream)
         self.cpp_indent_chr = cpp_indent
         self.cpp_indent_level = 0
         self.cpp_indent_string = ''
+        # In line map mode #line directives are only written when they
+        # change where the output maps to, `mapping` is the (file, spec line
+        # minus output line) currently in effect or None when the output
+        # maps to itself.
+        self.line_map = line_map
+        self.mapping = None
+        # set by defer_line_reset(), write() maps the output back to itself
+        # before the next text unless a #line directive cancels it first
+        self.pending_line_reset = False
+
+    def empty_copy(self):
+        " A new CCodeIO for the same file, at the same indentation levels. "
+        out = self.__class__(self.fn, self.indent_chr, self.cpp_indent_chr, self.line_map)
+        out.indent_level = self.indent_level
+        out.indent_string = self.indent_string
+        out.cpp_indent_level = self.cpp_indent_level
+        out.cpp_indent_string = self.cpp_indent_string
+        return out
+
+    def write_rendered(self, text):
+        """
+        Writes the contents of an empty_copy() here, renumbering the #line
+        directives resetting the output's line numbers to where they end up.
+        """
+        offset = self.line - 1
+        if offset and ('"%s"' % self.fn) in text:
+            pattern = re.compile(r'^(#[^\n]*?line )(\d+)( "%s")$' % re.escape(self.fn), re.M)
+            text = pattern.sub(lambda m: '%s%d%s' % (m.group(1), int(m.group(2)) + offset,
+                                                     m.group(3)), text)
+        self.write(text)
 
     def cpp_indent(self):
         self.cpp_indent_level += 1
@@ -34,3 +65,36 @@ class CCodeIO(codeio.CodeIO):
             self.write('#' + self.cpp_indentation + text)
         else:
             self.write('#' + text)
+
+    def map_line(self, first, second):
+        """
+        Whether a `#line first second` directive is needed here, assumes it
+        will be written when it is.
+        """
+        self.cancel_line_reset()
+        mapping = (second, int(first) - self.line)
+        if mapping == self.mapping:
+            return False
+        # the line following the directive is the one mapped to `first`
+        self.mapping = (second, mapping[1] - 1)
+        return True
+
+    def defer_line_reset(self):
+        """
+        Map the output back to itself before anything else is written,
+        unless a #line directive comes first.
+        """
+        if self.mapping is not None:
+            self.pending_line_reset = True
+
+    def cancel_line_reset(self):
+        self.pending_line_reset = False
+
+    def write(self, text):
+        if self.pending_line_reset:
+            self.pending_line_reset = False
+            self.mapping = None
+            self.cpp_write_line('line %d "%s"' % (self.line + 1, self.fn))
+        # CodeIO.write(), inlined since it's called for every bit of code
+        self.line += text.count('\n')
+        self.out.write(text)
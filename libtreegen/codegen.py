@@ -1,12 +1,11 @@
+import os
 import sys
 from .nodes import *
+from . import registry
 from . import report
 
-# Supported codegen targets, update when adding new targets
-from . import cplusplus
-targets = {
-    "CPlusPlus": cplusplus.CPlusPlusTarget
-}
+# Codegen targets by name, see registry.py for adding targets
+targets = registry.targets
 
 def _target_from_name(name, targets):
     for target in targets:
@@ -14,7 +13,6 @@ def _target_from_name(name, targets):
             return target
     return None
 
-# TODO: can probably make this way more efficient
 def _write_if_different(fn, out_file, content):
     # on error, content will be empty, don't overwrite last output in this case
     if not content:
@@ -30,18 +28,90 @@ def _write_if_different(fn, out_file, content):
             out_file.truncate(0)
         out_file.write(content)
 
-def codegen(spec, target, out_file=None, out_filename=None, indent='  '):
+def _target_class(spec, target):
     if not target in targets:
+        message = "unknown target '%s', available targets are: %s" % (
+            target, ', '.join(targets.names()))
         tgt = _target_from_name(target, spec.targets)
         if tgt:
-            report.error("unknown target '%s'" % target, tgt.location)
+            report.error(message, tgt.location)
         else:
-            report.error("unknown target '%s'" % target)
-    target = targets[target](spec)
+            report.error(message)
+    try:
+        return targets[target]
+    except (ImportError, AttributeError) as e:
+        report.error("failed to load codegen target '%s': %s" % (target, e))
+
+def check_targets(spec, targets):
+    " Report the first of the `targets` names that isn't available. "
+    for target in targets:
+        _target_class(spec, target)
+
+def codegen(spec, target, out_file=None, out_filename=None, indent='  ', render_jobs=1,
+            render_cache=None):
+    """
+    Generate the code for `target` and write it to `out_file` when given,
+    see write_output(). Returns the code, or None when the target wrote it
+    to `out_file` as it was rendered.
+    """
+    target = _target_class(spec, target)(spec)
+    target.render_jobs = render_jobs
+    target.render_cache = render_cache
+    if out_file is not None and not _rewrites(out_file, out_filename):
+        target.out_stream = out_file
     code = target.codegen(out_filename, indent)
-    if out_file is not None:
-        if out_filename is None:
-            out_file.write(code)
-        else:
-            _write_if_different(out_filename, out_file, code)
+    if out_file is not None and code is not None:
+        write_output(out_file, out_filename, code)
     return code
+
+# spec being generated by the forked worker processes of codegen_many()
+_fork_spec = None
+
+def _fork_codegen(args):
+    target, out_filename, indent = args
+    try:
+        return codegen(_fork_spec, target, None, out_filename, indent)
+    except SystemExit:
+        return None # error was already reported by the worker
+
+def codegen_many(spec, targets, indent='  ', jobs=1, render_jobs=1):
+    """
+    Generate the code for several targets from the same spec, `targets` is
+    a list of (target name, output filename) pairs. Returns the generated
+    code for each target, in order.
+
+    With more than one job the targets are generated in forked processes
+    (where supported), which share the parsed spec with this one. Each
+    target is rendered with `render_jobs` processes otherwise.
+    """
+    global _fork_spec
+    check_targets(spec, [target for target, out_filename in targets])
+    jobs = min(jobs, len(targets))
+    if jobs <= 1 or not hasattr(os, "fork"):
+        return [codegen(spec, target, None, out_filename, indent, render_jobs)
+                for target, out_filename in targets]
+    import multiprocessing
+    _fork_spec = spec
+    try:
+        with multiprocessing.get_context("fork").Pool(jobs) as pool:
+            codes = pool.map(_fork_codegen, [(target, out_filename, indent)
+                                             for target, out_filename in targets])
+    finally:
+        _fork_spec = None
+    if any(code is None for code in codes):
+        sys.exit(1)
+    return codes
+
+def _rewrites(out_file, out_filename):
+    # only rewrite in place when out_file is the file named out_filename,
+    # stdout redirected to a file is seekable as well
+    seekable = getattr(out_file, "seekable", None)
+    return not (out_file is sys.stdout or out_filename in (None, "<stdout>") or
+                getattr(out_file, "name", None) != out_filename or
+                not (seekable and seekable()))
+
+def write_output(out_file, out_filename, code):
+    if _rewrites(out_file, out_filename):
+        _write_if_different(out_filename, out_file, code)
+    else:
+        out_file.write(code)
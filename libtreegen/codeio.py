@@ -6,8 +6,10 @@ class CodeIO(object):
     Supports indentation and output line-number tracking.
     """
 
-    def __init__(self, fn, indent='  '):
-        self.out = io.StringIO()
+    def __init__(self, fn, indent='  ', stream=None):
+        # written straight to `stream` when given, kept in memory otherwise
+        self.stream = stream
+        self.out = io.StringIO() if stream is None else stream
         self.fn = fn
         self.line = 1
         self.indent_chr = indent
@@ -31,7 +33,8 @@ class CodeIO(object):
 
     @property
     def contents(self):
-        return self.out.getvalue()
+        ' The output written so far, None when it went to a stream. '
+        return self.out.getvalue() if self.stream is None else None
 
     def write(self, text):
         ' Write text as-is to the output. Keeps track of line count. '
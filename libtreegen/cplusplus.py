@@ -1,3 +1,7 @@
+import hashlib
+import marshal
+import os
+import sys
 from . import ccode
 from . import ccodeio
 from . import nodes
@@ -5,29 +9,100 @@ from . import report
 from . import target
 from .target import OptionInfo as OptInf
 
+# Target and output template the forked workers of render_nodes() use
+_fork_render = None
+
+def _fork_render_nodes(args):
+    stage, start, end = args
+    target, template = _fork_render
+    out = template.empty_copy()
+    add_code = getattr(target, stage)
+    try:
+        for node in target.spec.order[start:end]:
+            add_code(node)
+            target.render(out)
+    except SystemExit:
+        return None # error was already reported
+    return out.contents
+
+def _signature(value, origin):
+    """
+    The parts of `value` which can make a difference to the code rendered
+    for the node `origin` (or for the rest of the spec when None), as a
+    value of tuples and plain values. Other nodes and extern types are only
+    referred to by name.
+    """
+    tp = type(value)
+    if tp is str or tp is bool or tp is int or value is None:
+        return value
+    elif tp is list or tp is tuple or tp is nodes.Location:
+        return tuple([_signature(item, origin) for item in value])
+    elif isinstance(value, nodes.BaseNode):
+        if value is not origin and (tp is nodes.Node or tp is nodes.ExternType):
+            return (tp.__name__, value.name)
+        return (tp.__name__,) + tuple([(key, _signature(item, origin))
+                                       for key, item in value.__dict__.items()
+                                       if key != 'parent' and key != 'children'])
+    return value
+
 class CPlusPlusTarget(target.CodegenTarget):
     # Name of the target as in the spec file
     name = "CPlusPlus"
 
     # Options allowed in target X { ... } blocks
+    #   allocator: expression called with the constructor arguments to
+    #              allocate a node in generated create() methods
+    #   deleter:   statement releasing an owned node pointer
+    #   line_map:  only emit #line directives where the output stops
+    #              following on from the previous one, see CCodeIO
+    #   use_kinds: store the kind of each node in its root node for
+    #              isa<>(), cast<>() and dyn_cast<>() without RTTI
+    #   reorder_fields: order each class's data members by alignment when
+    #              that saves padding, constructor parameters keep their order
+    #              (classes with members of extern types aren't reordered)
+    #   use_dispatch: emit dispatch(node, visitor) switching on the kind
+    #              of the node (needs use_kinds), use_accept: false then
+    #              leaves out the accept methods
     options = {
         "allocator":           OptInf(nodes.StringLiteral, nodes.StringLiteral(value="new $@")),
+        "arena_name":          OptInf(nodes.StringLiteral, nodes.StringLiteral(value="Arena")),
         "class_extra":         OptInf(nodes.ListLiteral,   nodes.ListLiteral()),
+        "compact_visitors":    OptInf(nodes.BoolLiteral,   nodes.BoolLiteral(value=False)),
         "cpp_indent":          OptInf(nodes.StringLiteral, nodes.StringLiteral(value="")),
         "deleter":             OptInf(nodes.StringLiteral, nodes.StringLiteral(value="delete $$")),
         "epilog":              OptInf(nodes.StringLiteral, nodes.StringLiteral(value="")),
         "header_only":         OptInf(nodes.BoolLiteral,   nodes.BoolLiteral(value=True)),
         "includes":            OptInf(nodes.ListLiteral,   nodes.ListLiteral()),
         "indent":              OptInf(nodes.StringLiteral, nodes.StringLiteral(value="    ")),
+        "line_map":            OptInf(nodes.BoolLiteral,   nodes.BoolLiteral(value=False)),
         "list_type":           OptInf(nodes.StringLiteral, nodes.StringLiteral(value="std::vector<$@>")),
         "namespace":           OptInf(nodes.StringLiteral, nodes.StringLiteral(value="")),
         "prolog":              OptInf(nodes.StringLiteral, nodes.StringLiteral(value="")),
+        "reorder_fields":      OptInf(nodes.BoolLiteral,   nodes.BoolLiteral(value=False)),
         "strong_ptr":          OptInf(nodes.StringLiteral, nodes.StringLiteral(value="$@*")),
+        "use_accept":          OptInf(nodes.BoolLiteral,   nodes.BoolLiteral(value=True)),
         "use_accessors":       OptInf(nodes.BoolLiteral,   nodes.BoolLiteral(value=False)),
+        "use_arena":           OptInf(nodes.BoolLiteral,   nodes.BoolLiteral(value=False)),
+        "use_dispatch":        OptInf(nodes.BoolLiteral,   nodes.BoolLiteral(value=False)),
+        "use_kinds":           OptInf(nodes.BoolLiteral,   nodes.BoolLiteral(value=False)),
         "use_line_directives": OptInf(nodes.BoolLiteral,   nodes.BoolLiteral(value=True)),
+        "visitor_base":        OptInf(nodes.StringLiteral, nodes.StringLiteral(value="VisitorBase")),
         "weak_ptr":            OptInf(nodes.StringLiteral, nodes.StringLiteral(value="$@*")),
     }
 
+    # Sizes and alignments of data member types assumed by 'reorder_fields'
+    # (LP64 with libstdc++), classes with members of other types aren't
+    # reordered
+    member_layouts = {
+        "bool":           (1, 1),
+        "float":          (4, 4),
+        "int":            (4, 4),
+        "std::string":    (32, 8),
+        "unsigned char":  (1, 1),
+        "unsigned int":   (4, 4),
+        "unsigned short": (2, 2),
+    }
+
     # Options allowed in extern X { ... } blocks
     external_options = {
         "construct": OptInf(nodes.StringLiteral, nodes.StringLiteral(value="")),
@@ -35,9 +110,21 @@ class CPlusPlusTarget(target.CodegenTarget):
         "type":      OptInf(nodes.StringLiteral, nodes.StringLiteral(value=""), True),
     }
 
+    # Options allowed in visitor X { ... } blocks
+    visitor_options = {
+        "accept_method":  OptInf(nodes.StringLiteral, nodes.StringLiteral(value="accept")),
+        "inorder":        OptInf(nodes.BoolLiteral,   nodes.BoolLiteral(value=False)),
+        "postorder":      OptInf(nodes.BoolLiteral,   nodes.BoolLiteral(value=False)),
+        "preorder":       OptInf(nodes.BoolLiteral,   nodes.BoolLiteral(value=False)),
+        "visit_children": OptInf(nodes.BoolLiteral,   nodes.BoolLiteral(value=False)),
+        "visit_method":   OptInf(nodes.StringLiteral, nodes.StringLiteral(value="visit")),
+    }
+
     def __init__(self, spec):
         self.spec = spec
         self.pstack = []
+        self.field_types = {}
+        self.class_extra = None
 
         # TODO: move to super class, pass spec file up to super constructor
         have_target = False
@@ -53,8 +140,16 @@ class CPlusPlusTarget(target.CodegenTarget):
             report.warning("spec file '%s' contains no " % spec.filename +
                            "'%s' target, attempting to use default options " % self.name +
                            "(some options may be required)")
+            self.target = None
+            super().__init__(None, None, spec.visitors)
+        else:
+            super().__init__(self.target.options, self.target.externs, spec.visitors)
 
-        super().__init__(self.target.options, self.target.externs)
+        # looked up for every node and visitor
+        self.visit_methods = dict((name, opts["visit_method"].value)
+                                  for name, opts in self.visitors.items())
+        self.accept_methods = dict((name, opts["accept_method"].value)
+                                   for name, opts in self.visitors.items())
 
     def extern_type(self, name):
         return self.get_ext_opt(name, "type")
@@ -71,37 +166,97 @@ class CPlusPlusTarget(target.CodegenTarget):
         }
         return d[name]
 
+    def visit_method(self, visitor):
+        return self.visit_methods[visitor.name]
+
+    def accept_method(self, visitor):
+        return self.accept_methods[visitor.name]
+
+    def walk_order(self, visitor):
+        """
+        Returns the C++ expression for the walk order flags of a visitor, or
+        None if the visitor doesn't traverse children.
+        """
+        if not self.get_visitor_opt(visitor.name, "visit_children").value:
+            return None
+        flags = []
+        for opt, flag in (("preorder",  "WALK_PREORDER"),
+                          ("inorder",   "WALK_INORDER"),
+                          ("postorder", "WALK_POSTORDER")):
+            if self.get_visitor_opt(visitor.name, opt).value:
+                flags.append(flag)
+        return ' | '.join(flags) if flags else "WALK_PREORDER"
+
+    def is_child_field(self, field):
+        if field.type.is_weak:
+            return False
+        if isinstance(field.type.type, nodes.ListElementType):
+            return isinstance(field.type.type.type, nodes.Node)
+        return isinstance(field.type.type, nodes.Node)
+
+    def find_child_fields(self):
+        """
+        Maps each node to its own fields which own child nodes, computed
+        once and shared by every traversing visitor.
+        """
+        return dict((node, [f for f in node.fields if self.is_child_field(f)])
+                    for node in self.spec.nodes)
+
     @property
     def top(self):
         return self.pstack[-1]
 
     def line_dir(self, location):
-        if location:
-            lds = self.get_opt("use_line_directives")
-            if isinstance(lds, nodes.BoolLiteral) and lds.value:
-                return ccode.CppLine(first='%d' % location.line,
-                                     second='"%s"' % location.file)
+        if location and self.config.use_line_directives:
+            return ccode.CppLine(first='%d' % location.line,
+                                 second='"%s"' % location.file)
         return ccode.Stmt(code='')
 
     def reset_line_dir(self):
-        lds = self.get_opt("use_line_directives")
-        if isinstance(lds, nodes.BoolLiteral) and lds.value:
+        if self.config.use_line_directives:
             return ccode.CppLineReset()
         return ccode.Stmt(code='')
 
     def codegen(self, out_filename, indent='  ', cpp_indent=' '):
         """
-        First builds a CCodeNode tree from the spec file and then calls the
-        codegen method to generate output code.
+        Builds CCodeNode trees from the spec file and renders them to a
+        CCodeIO object piece by piece, each node's class and definitions
+        are dropped once written so only one class is held at a time.
         """
 
         self.tu = ccode.TranslationUnit(filename=out_filename, is_header=True)
         self.pstack.append(self.tu)
 
+        self.walkers = [v for v in self.spec.visitors if self.walk_order(v)]
+        self.child_fields = self.find_child_fields() if self.walkers else {}
+        self.field_types = self.find_field_types()
+        self.class_extra = self.find_class_extra()
+
         # include required by primitive string type
         self.tu.includes.append(ccode.CppInclude(first="<string>"))
 
         includes = self.get_opt("includes", None)
+        # include required by the walk stack of traversing visitors
+        if self.walkers:
+            self.add_system_include("<vector>")
+        if any(self.is_movable(f) for node in self.spec.nodes for f in node.fields):
+            self.add_system_include("<utility>")
+        if self.config.use_arena:
+            if not self.owns_raw_pointers():
+                strong_ptr = self.get_opt("strong_ptr")
+                report.error("'use_arena' can't be used with a 'strong_ptr' other " +
+                             "than '$@*', nodes in an arena are owned by the arena",
+                             strong_ptr.location)
+            for inc in ("<cstddef>", "<cstdint>", "<new>", "<type_traits>",
+                        "<utility>", "<vector>"):
+                self.add_system_include(inc)
+        if self.config.use_kinds:
+            self.add_system_include("<cassert>")
+        elif self.config.use_dispatch:
+            report.error("'use_dispatch' requires 'use_kinds', the dispatcher " +
+                         "switches on the kind of the node",
+                         self.get_opt("use_dispatch").location)
+
         if includes:
             for inc in includes.value:
                 if not isinstance(inc, nodes.StringLiteral):
@@ -116,13 +271,18 @@ class CPlusPlusTarget(target.CodegenTarget):
                 self.tu.includes.append(ccode.CppInclude(first=inc_name))
                 self.tu.includes.append(self.reset_line_dir())
 
+        out = ccodeio.CCodeIO(out_filename, indent, cpp_indent,
+                              line_map=self.config.line_map, stream=self.out_stream)
+        self.tu.codegen_begin(out)
+
         ns_name = self.get_opt("namespace")
         if ns_name:
             self.top.stmts.append(self.line_dir(ns_name.location))
+            self.render(out)
             ns_name = ns_name.value
             ns = ccode.Namespace(name=ns_name)
+            ns.codegen_begin(out)
             ns.stmts.append(self.reset_line_dir())
-            self.top.stmts.append(ns)
             self.pstack.append(ns)
             self.top.stmts.append(ccode.BlankLine())
 
@@ -133,70 +293,575 @@ class CPlusPlusTarget(target.CodegenTarget):
 
         self.top.stmts.append(ccode.BlankLine())
 
+        if self.config.use_kinds:
+            self.add_kinds()
+            self.top.stmts.append(ccode.BlankLine())
+
+        if self.config.use_arena:
+            self.add_arena()
+            self.top.stmts.append(ccode.BlankLine())
+
         # create a class for each visitor
-        # TODO: use the visitor X { ... } block options to control output
+        if self.config.compact_visitors:
+            self.add_compact_visitors()
+        else:
+            self.add_visitors()
+
+        self.top.stmts.append(ccode.BlankLine())
+
+        self.render(out)
+
+        # create all the node classes, then all the destructor definitions
+        # and accessors after the classes are fully defined
+        self.render_nodes(out, ("add_node_class", "add_node_defs"))
+
+        if self.config.use_dispatch:
+            self.add_dispatchers()
+            self.render(out)
+
+        ns_name = self.get_opt("namespace")
+        if ns_name:
+            # pop the namespace off
+            self.pstack.pop().codegen_end(out)
+
+        self.render(out)
+        self.tu.codegen_end(out)
+        return out.contents
+
+    def render(self, out):
+        " Writes the statements added to the current scope so far and drops them. "
+        for stmt in self.top.stmts:
+            stmt.codegen(out)
+        del self.top.stmts[:]
+
+    def render_nodes(self, out, stages):
+        """
+        Adds and renders the code of every node, bases first (see
+        SpecFile.order), with each method named in `stages` in turn. With
+        more than one render job (where fork is supported) the nodes are
+        split into runs rendered by a pool of forked processes and the text
+        of each run is written in order.
+        """
+        global _fork_render
+        node_list = self.spec.order
+        jobs = min(self.render_jobs, len(node_list))
+        # the line_map state depends on everything written before
+        if self.render_cache is not None and not self.config.line_map:
+            self.render_nodes_cached(out, stages)
+            return
+        elif jobs <= 1 or self.config.line_map or not hasattr(os, "fork"):
+            for stage in stages:
+                add_code = getattr(self, stage)
+                for node in node_list:
+                    add_code(node)
+                    self.render(out)
+            return
+        import multiprocessing
+        size = -(-len(node_list) // (jobs * 4))
+        runs = [(start, start + size) for start in range(0, len(node_list), size)]
+        _fork_render = (self, out.empty_copy())
+        try:
+            with multiprocessing.get_context("fork").Pool(jobs) as pool:
+                for stage in stages:
+                    for text in pool.imap(_fork_render_nodes,
+                                          [(stage, start, end) for start, end in runs]):
+                        if text is None:
+                            sys.exit(1) # error was already reported by the worker
+                        out.write_rendered(text)
+        finally:
+            _fork_render = None
+
+    def render_nodes_cached(self, out, stages):
+        """
+        Like render_nodes() but reusing the code in `render_cache` for the
+        nodes which are the same as when it was rendered: the node, its
+        bases and the names of the nodes deriving from it (classof() tests
+        for a range of kinds) having the same _signature(), in a spec which
+        is the same apart from the nodes. Nodes which moved in the spec are
+        rendered again since their #line directives changed. The cache is
+        left holding the code of this spec's nodes.
+        """
+        context = (self.name, out.fn, out.indent_chr, out.indent_level,
+                   out.cpp_indent_chr, out.cpp_indent_level,
+                   _signature([self.spec.targets, self.spec.visitors, self.spec.root], None))
+        context = hashlib.sha1(marshal.dumps(context)).digest()
+        # the digest of each node's signature and those of its bases
+        keys = {}
+        for node in self.spec.order:
+            digest = hashlib.sha1(marshal.dumps(_signature(node, node)))
+            digest.update(marshal.dumps(tuple(n.name for n in self.spec.descendants(node))))
+            if node.base is not None:
+                digest.update(keys[node.base])
+            keys[node] = digest.digest()
+        cache = {}
+        for stage in stages:
+            add_code = getattr(self, stage)
+            for node in self.spec.order:
+                key = (stage, context, keys[node])
+                text = self.render_cache.get(key)
+                if text is None:
+                    part = out.empty_copy()
+                    add_code(node)
+                    self.render(part)
+                    text = part.contents
+                cache[key] = text
+                out.write_rendered(text)
+        self.render_cache.clear()
+        self.render_cache.update(cache)
+
+    def add_node_class(self, node):
+        self.top.stmts.append(self.line_dir(node.location))
+        bases = [node.base] if node.base else []
+        cls = ccode.ClassDecl(name=node.name, bases=bases)
+        self.top.stmts.append(cls)
+        self.pstack.append(cls)
+        self.top.fields.append(self.reset_line_dir())
+        if self.config.use_kinds:
+            self.add_kind_members(node)
+        self.add_fields(node)
+        self.add_constructors(node)
+        if not self.config.use_arena:
+            self.add_destructor_decl(node)
+        self.add_method_decls(node)
+        self.add_class_extra()
+        self.pstack.pop()
+        self.top.stmts.append(ccode.BlankLine())
+
+    def add_node_defs(self, node):
+        self.add_method_defs(node)
+        if not self.config.use_arena:
+            self.add_destructor_def(node)
+
+    def add_system_include(self, name):
+        " Adds an #include unless it or the spec's 'includes' option already has it. "
+        if name in self.config.includes:
+            return
+        for inc in self.tu.includes:
+            if isinstance(inc, ccode.CppInclude) and inc.first == name:
+                return
+        self.tu.includes.append(ccode.CppInclude(first=name))
+
+    def add_arena(self):
+        """
+        Emits a bump pointer arena which nodes can be constructed in. Memory
+        is only released when the arena is destroyed, at which point the
+        destructors of any objects which aren't trivially destructible are
+        run in reverse order of construction.
+        """
+        name = self.get_opt("arena_name")
+        if name.value in self.spec.types:
+            report.error("arena class name '%s' conflicts " % name.value +
+                         "with a node name", name.location)
+        cls = ccode.ClassDecl(name=name.value)
+        self.top.stmts.append(cls)
+
+        dtor_rec = ccode.ClassDecl(name="DtorRecord")
+        dtor_rec.fields.append(ccode.Stmt(code="void (*destroy)(void* object);"))
+        dtor_rec.fields.append(ccode.Field(type=ccode.DataType(name="void*"), name="object"))
+        dtor_rec.fields.append(ccode.Field(type=ccode.DataType(name="DtorRecord*"), name="next"))
+        cls.fields.append(dtor_rec)
+        for type_name, field_name in (("std::size_t", "block_size"),
+                                      ("char*", "next"),
+                                      ("std::size_t", "left"),
+                                      ("DtorRecord*", "dtors"),
+                                      ("std::vector<char*>", "blocks")):
+            cls.fields.append(ccode.Field(type=ccode.DataType(name=type_name), name=field_name))
+
+        ctor = ccode.Constructor(name=cls.name)
+        ctor.params.append(ccode.Parameter(type=ccode.DataType(name="std::size_t"),
+                                           name="block_size",
+                                           default=ccode.DataType(name="65536")))
+        for target, arg in (("block_size", "block_size"), ("next", "nullptr"),
+                            ("left", "0"), ("dtors", "nullptr")):
+            ctor.initializers.append(ccode.Initializer(
+                target=target, arg=ccode.InitializerArgument(name=arg)))
+        cls.constructors.append(ctor)
+        cls.constructors.append(ccode.Stmt(code="%s(const %s&) = delete;" % (cls.name, cls.name)))
+        cls.constructors.append(ccode.Stmt(code="%s& operator=(const %s&) = delete;" %
+                                                (cls.name, cls.name)))
+
+        cls.destructor = ccode.DestructorDecl(name=cls.name)
+
+        align = "(align - reinterpret_cast<std::uintptr_t>(next) % align) % align"
+        alloc = ccode.InlineMethod(
+                type=ccode.DataType(name="void*"),
+                name="allocate",
+                params=[ccode.Parameter(type=ccode.DataType(name="std::size_t"), name="size"),
+                        ccode.Parameter(type=ccode.DataType(name="std::size_t"), name="align")])
+        alloc.stmts.append(ccode.Stmt(code="std::size_t pad = %s;" % align))
+        alloc.stmts.append(ccode.Block(head="if (pad + size > left)", stmts=[
+            ccode.Stmt(code="std::size_t bytes = size + align > block_size ? " +
+                            "size + align : block_size;"),
+            ccode.Stmt(code="next = static_cast<char*>(::operator new(bytes));"),
+            ccode.Stmt(code="blocks.push_back(next);"),
+            ccode.Stmt(code="left = bytes;"),
+            ccode.Stmt(code="pad = %s;" % align),
+        ]))
+        alloc.stmts.append(ccode.Stmt(code="void* ptr = next + pad;"))
+        alloc.stmts.append(ccode.Stmt(code="next += pad + size;"))
+        alloc.stmts.append(ccode.Stmt(code="left -= pad + size;"))
+        alloc.stmts.append(ccode.Stmt(code="return ptr;"))
+        cls.methods.append(alloc)
+
+        make = ccode.InlineMethod(
+                type=ccode.DataType(name="T*"),
+                name="make",
+                params=[ccode.Parameter(type=ccode.DataType(name="Args&&..."), name="args")],
+                template_args=[ccode.TemplateArgument(name="T"),
+                               ccode.TemplateArgument(name="Args", is_variadic=True)])
+        make.stmts.append(ccode.Stmt(code="T* object = new (allocate(sizeof(T), alignof(T))) " +
+                                          "T(std::forward<Args>(args)...);"))
+        make.stmts.append(ccode.Block(head="if (!std::is_trivially_destructible<T>::value)", stmts=[
+            ccode.Stmt(code="void* rec = allocate(sizeof(DtorRecord), alignof(DtorRecord));"),
+            ccode.Stmt(code="dtors = new (rec) DtorRecord{&destroy<T>, object, dtors};"),
+        ]))
+        make.stmts.append(ccode.Stmt(code="return object;"))
+        cls.methods.append(make)
+
+        destroy = ccode.InlineMethod(
+                type=ccode.DataType(name="void"),
+                name="destroy",
+                params=[ccode.Parameter(type=ccode.DataType(name="void*"), name="object")],
+                is_static=True,
+                template_args=[ccode.TemplateArgument(name="T")])
+        destroy.stmts.append(ccode.Stmt(code="static_cast<T*>(object)->~T();"))
+        cls.methods.append(destroy)
+
+        self.top.stmts.append(ccode.BlankLine())
+        dtor = ccode.Destructor(name=cls.name, is_inline=True)
+        dtor.stmts.append(ccode.Stmt(
+            code="for (DtorRecord* rec = dtors; rec; rec = rec->next) rec->destroy(rec->object);"))
+        dtor.stmts.append(ccode.Stmt(code="for (char* block : blocks) ::operator delete(block);"))
+        self.top.stmts.append(dtor)
+
+    def kind_enum(self, node):
+        " Name of the enum of node kinds for the hierarchy `node` is in. "
+        while node.base:
+            node = node.base
+        return node.name + "Kind"
+
+    def add_kinds(self):
+        """
+        Emits an enum of the node kinds of each hierarchy, in the depth first
+        order of SpecFile.preorder, so that the kinds of a node and the nodes
+        deriving from it are a range and classof() is a constant time test.
+        isa<>(), cast<>() and dyn_cast<>() check a node's kind with classof()
+        instead of dynamic_cast.
+        """
+        for root in self.spec.root_nodes:
+            kinds = self.spec.preorder[root.enter:root.exit]
+            self.top.stmts.append(ccode.Enum(name=self.kind_enum(root),
+                                             type=ccode.DataType(name=self.kind_type(root)),
+                                             values=[node.name for node in kinds]))
+        self.top.stmts.append(ccode.BlankLine())
+        template_args = [ccode.TemplateArgument(name="T"), ccode.TemplateArgument(name="U")]
+        bool_type = ccode.DataType(name="bool")
+        params = [ccode.Parameter(type=ccode.DataType(name="const U*"), name="node")]
+        func = ccode.Function(type=bool_type, name="isa", params=params,
+                              template_args=template_args)
+        func.stmts.append(ccode.Stmt(code="return T::classof(node);"))
+        self.top.stmts.append(func)
+        # overloaded so the casts keep the constness of the node pointer
+        for const in ("", "const "):
+            params = [ccode.Parameter(type=ccode.DataType(name=const + "U*"), name="node")]
+            ptr_type = ccode.DataType(name=const + "T*")
+            func = ccode.Function(type=ptr_type, name="cast", params=params,
+                                  template_args=template_args)
+            func.stmts.append(ccode.Stmt(code='assert(isa<T>(node) && "cast<T>() of ' +
+                                              'the wrong kind of node");'))
+            func.stmts.append(ccode.Stmt(code="return static_cast<%sT*>(node);" % const))
+            self.top.stmts.append(func)
+            func = ccode.Function(type=ptr_type, name="dyn_cast", params=params,
+                                  template_args=template_args)
+            func.stmts.append(ccode.Stmt(code="return node && isa<T>(node) ? " +
+                                              "static_cast<%sT*>(node) : nullptr;" % const))
+            self.top.stmts.append(func)
+
+    def kind_type(self, root):
+        " The smallest unsigned type holding the kinds of a hierarchy. "
+        count = root.exit - root.enter
+        if count <= 0x100:
+            return "unsigned char"
+        elif count <= 0x10000:
+            return "unsigned short"
+        return "unsigned int"
+
+    def add_kind_members(self, node):
+        " The classof() method of every node, root nodes get kind_ with the fields. "
+        enum = self.kind_enum(node)
+        root = enum[:-len("Kind")]
+        last = self.spec.preorder[node.exit - 1]
+        if last is node:
+            test = "node->kind_ == %s::%s" % (enum, node.name)
+        else:
+            test = "node->kind_ >= %s::%s && node->kind_ <= %s::%s" % (
+                        enum, node.name, enum, last.name)
+        param = ccode.Parameter(type=ccode.DataType(name="const %s*" % root), name="node")
+        meth = ccode.InlineMethod(type=ccode.DataType(name="bool"), name="classof",
+                                  params=[param], is_static=True)
+        meth.stmts.append(ccode.Stmt(code="return %s;" % test))
+        self.top.methods.append(meth)
+
+    def add_dispatchers(self):
+        """
+        Emits a dispatch() template for each hierarchy calling the visit()
+        method of the visitor for the dynamic type of a node, found with a
+        switch on its kind. With the visitor's own type as `V` the calls
+        needn't be virtual (and can be inlined), unlike accept methods.
+        """
+        for root in self.spec.root_nodes:
+            enum = self.kind_enum(root)
+            params = [ccode.Parameter(type=ccode.DataType(name=root.name + "&"), name="node"),
+                      ccode.Parameter(type=ccode.DataType(name="V&"), name="visitor")]
+            func = ccode.Function(type=ccode.DataType(name="void"), name="dispatch",
+                                  params=params, template_args=[ccode.TemplateArgument(name="V")])
+            switch = ccode.Block(head="switch (node.kind_)")
+            for node in self.spec.preorder[root.enter:root.exit]:
+                switch.stmts.append(ccode.Stmt(
+                    code="case %s::%s: visitor.visit(static_cast<%s&>(node)); break;" % (
+                            enum, node.name, node.name)))
+            func.stmts.append(switch)
+            self.top.stmts.append(func)
+        self.top.stmts.append(ccode.BlankLine())
+
+    def kind_stmt(self, node):
+        return ccode.Stmt(code="this->kind_ = %s::%s;" % (self.kind_enum(node), node.name))
+
+    def add_visit_methods(self, cls, name="visit", is_virtual=False):
+        for node in self.spec.nodes:
+            meth_type = ccode.DataType(name="void")
+            param_type = ccode.DataType(name=node.name + "&")
+            meth_param = ccode.Parameter(type=param_type, name="node")
+            meth = ccode.InlineMethod(
+                    type=meth_type,
+                    name=name,
+                    params=[meth_param],
+                    is_virtual=is_virtual)
+            cls.methods.append(meth)
+
+    def add_visitors(self):
         for visitor in self.spec.visitors:
             self.top.stmts.append(self.line_dir(visitor.location))
             cls = ccode.ClassDecl(name=visitor.name)
             cls.fields.append(self.reset_line_dir())
             self.top.stmts.append(cls)
-            self.pstack.append(cls)
-            for node in self.spec.nodes:
-                meth_type = ccode.DataType(name="void")
-                param_type = ccode.DataType(name=node.name + "&")
-                meth_param = ccode.Parameter(type=param_type, name="node")
-                meth = ccode.InlineMethod(
-                        type=meth_type,
-                        name="visit",
-                        params=[meth_param])
-                cls.methods.append(meth)
-            self.pstack.pop()
+            walk_order = self.walk_order(visitor)
+            # virtual so visit methods overridden in subclasses get walked
+            self.add_visit_methods(cls, self.visit_method(visitor),
+                                   is_virtual=walk_order is not None)
+            if walk_order:
+                self.add_walker(cls, walk_order, self.visit_method(visitor))
 
+    def add_compact_visitors(self):
+        """
+        Emits the visit methods once in a shared base class which all of the
+        visitors derive from, so the output grows with visitors + nodes
+        rather than visitors * nodes.
+        """
+        if not self.spec.visitors:
+            return
+        for visitor in self.spec.visitors:
+            if self.visit_method(visitor) != "visit" or self.accept_method(visitor) != "accept":
+                report.error("custom visit_method and accept_method options of " +
+                             "visitor '%s' can't be used with " % visitor.name +
+                             "'compact_visitors'", visitor.location)
+        base_name = self.get_opt("visitor_base")
+        if base_name.value in self.spec.types or \
+                any(v.name == base_name.value for v in self.spec.visitors):
+            report.error("visitor base class name '%s' " % base_name.value +
+                         "conflicts with a node or visitor name", base_name.location)
+        base = ccode.ClassDecl(name=base_name.value)
+        base.destructor = ccode.DestructorDecl(name=base.name, is_virtual=True)
+        self.top.stmts.append(base)
+        self.add_visit_methods(base, is_virtual=True)
+        if self.walkers:
+            self.add_walker(base, "WALK_PREORDER", "visit")
         self.top.stmts.append(ccode.BlankLine())
-
-        # create all the node classes
-        for node in self.spec.nodes:
-            self.top.stmts.append(self.line_dir(node.location))
-            bases = [node.base] if node.base else []
-            cls = ccode.ClassDecl(name=node.name, bases=bases)
+        for visitor in self.spec.visitors:
+            self.top.stmts.append(self.line_dir(visitor.location))
+            cls = ccode.ClassDecl(name=visitor.name, bases=[base])
+            cls.fields.append(self.reset_line_dir())
+            walk_order = self.walk_order(visitor)
+            if walk_order:
+                ctor = ccode.Constructor(name=visitor.name)
+                ctor.stmts.append(ccode.Stmt(code="walk_order = %s;" % walk_order))
+                cls.constructors.append(ctor)
             self.top.stmts.append(cls)
-            self.pstack.append(cls)
-            self.top.fields.append(self.reset_line_dir())
-            self.add_fields(node)
-            self.add_constructors(node)
-            self.add_destructor_decl(node)
-            self.add_method_decls(node)
-            self.add_class_extra()
-            self.pstack.pop()
-            self.top.stmts.append(ccode.BlankLine())
+        self.top.stmts.append(ccode.BlankLine())
+        dtor = ccode.Destructor(name=base.name, is_inline=True)
+        self.top.stmts.append(dtor)
 
-        # create all the destructor definitions and accessors after the classes are fully defined
-        for node in self.spec.nodes:
-            self.add_method_defs(node)
-            self.add_destructor_def(node)
+    def add_walker(self, cls, walk_order, visit_name):
+        """
+        Adds an iterative tree walker to a visitor class. The pending nodes
+        are kept on an explicit stack rather than the C++ call stack, so
+        very deep trees can be traversed without overflowing it. Each node's
+        virtual walk_step() calls back into walk_node() with its dynamic type.
+        """
+        void_type = ccode.DataType(name="void")
+        cls.fields.append(ccode.Stmt(code="enum { WALK_PREORDER = 1, WALK_INORDER = 2, " +
+                                          "WALK_POSTORDER = 4 };"))
+        frame = ccode.ClassDecl(name="WalkFrame")
+        frame.fields.append(ccode.Stmt(code="void (*step)(%s& visitor, " % cls.name +
+                                            "void* node, int stage);"))
+        frame.fields.append(ccode.Field(type=ccode.DataType(name="void*"), name="node"))
+        frame.fields.append(ccode.Field(type=ccode.DataType(name="int"), name="stage"))
+        cls.fields.append(frame)
+        cls.fields.append(ccode.Stmt(code="int walk_order = %s;" % walk_order))
+        cls.fields.append(ccode.Field(type=ccode.DataType(name="std::vector<WalkFrame>"),
+                                      name="walk_stack"))
 
-        ns_name = self.get_opt("namespace")
-        if ns_name:
-            # pop the namespace off
-            self.pstack.pop()
+        walk = ccode.InlineMethod(
+                type=void_type,
+                name="walk",
+                params=[ccode.Parameter(type=ccode.DataType(name="T&"), name="node")],
+                template_args=[ccode.TemplateArgument(name="T")])
+        walk.stmts.append(ccode.Stmt(code="std::size_t base = walk_stack.size();"))
+        walk.stmts.append(ccode.Stmt(code="walk_push(&node);"))
+        walk.stmts.append(ccode.Block(head="while (walk_stack.size() > base)", stmts=[
+            ccode.Stmt(code="WalkFrame frame = walk_stack.back();"),
+            ccode.Stmt(code="walk_stack.pop_back();"),
+            ccode.Stmt(code="frame.step(*this, frame.node, frame.stage);"),
+        ]))
+        cls.methods.append(walk)
 
-        # codegen everything to CCodeIO object
-        out = ccodeio.CCodeIO(out_filename, indent, cpp_indent)
-        self.tu.codegen(out)
-        return out.contents
+        push = ccode.InlineMethod(
+                type=void_type,
+                name="walk_push",
+                params=[ccode.Parameter(type=ccode.DataType(name="T*"), name="node")],
+                template_args=[ccode.TemplateArgument(name="T")])
+        push.stmts.append(ccode.Stmt(code="if (node) walk_stack.push_back(" +
+                                          "WalkFrame{&walk_thunk<T>, node, 0});"))
+        cls.methods.append(push)
 
-    def add_class_extra(self):
+        thunk = ccode.InlineMethod(
+                type=void_type,
+                name="walk_thunk",
+                params=[ccode.Parameter(type=ccode.DataType(name=cls.name + "&"),
+                                        name="visitor"),
+                        ccode.Parameter(type=ccode.DataType(name="void*"), name="node"),
+                        ccode.Parameter(type=ccode.DataType(name="int"), name="stage")],
+                is_static=True,
+                template_args=[ccode.TemplateArgument(name="T")])
+        thunk.stmts.append(ccode.Stmt(code="static_cast<T*>(node)->walk_step(visitor, stage);"))
+        cls.methods.append(thunk)
+
+        step = ccode.InlineMethod(
+                type=void_type,
+                name="walk_node",
+                params=[ccode.Parameter(type=ccode.DataType(name="T&"), name="node"),
+                        ccode.Parameter(type=ccode.DataType(name="int"), name="stage")],
+                template_args=[ccode.TemplateArgument(name="T")])
+        step.stmts.append(ccode.Block(head="if (stage != 0)", stmts=[
+            ccode.Stmt(code="%s(node);" % visit_name),
+            ccode.Stmt(code="return;"),
+        ]))
+        step.stmts.append(ccode.Stmt(code="if (walk_order & WALK_PREORDER) %s(node);" % visit_name))
+        step.stmts.append(ccode.Stmt(code="if (walk_order & WALK_POSTORDER) " +
+                                          "walk_stack.push_back(WalkFrame{&walk_thunk<T>, " +
+                                          "&node, WALK_POSTORDER});"))
+        step.stmts.append(ccode.Stmt(code="std::size_t mark = walk_stack.size();"))
+        step.stmts.append(ccode.Stmt(code="node.walk_children(*this);"))
+        # the in-order visit goes right under the first child on the stack
+        step.stmts.append(ccode.Stmt(code="if (walk_order & WALK_INORDER) " +
+                                          "walk_stack.insert(walk_stack.end() - " +
+                                          "(walk_stack.size() > mark ? 1 : 0), " +
+                                          "WalkFrame{&walk_thunk<T>, &node, WALK_INORDER});"))
+        cls.methods.append(step)
+
+    def add_accept_methods(self):
+        meth_type = ccode.DataType(name="void")
+        if self.config.compact_visitors:
+            # a single template covers every visitor class
+            if not self.spec.visitors:
+                return
+            param_type = ccode.DataType(name="V&")
+            meth_param = ccode.Parameter(type=param_type, name="visitor")
+            targ = ccode.TemplateArgument(name="V")
+            meth = ccode.InlineMethod(type=meth_type, name="accept",
+                                      params=[meth_param], template_args=[targ])
+            meth.stmts.append(ccode.Stmt(code="visitor.visit(*this);"))
+            self.top.methods.append(meth)
+            return
+        for visitor in self.spec.visitors:
+            param_type = ccode.DataType(name=visitor.name + "&")
+            meth_param = ccode.Parameter(type=param_type, name="visitor")
+            meth = ccode.InlineMethod(type=meth_type, name=self.accept_method(visitor),
+                                      params=[meth_param])
+            meth.stmts.append(ccode.Stmt(code="visitor.%s(*this);" % self.visit_method(visitor)))
+            self.top.methods.append(meth)
+
+    def add_walk_methods(self, node):
+        if not self.walkers:
+            return
+        if self.config.compact_visitors:
+            owners = [self.config.visitor_base]
+        else:
+            owners = [visitor.name for visitor in self.walkers]
+        for owner in owners:
+            params = [ccode.Parameter(type=ccode.DataType(name=owner + "&"), name="visitor"),
+                      ccode.Parameter(type=ccode.DataType(name="int"), name="stage")]
+            meth = ccode.InlineMethod(type=ccode.DataType(name="void"), name="walk_step",
+                                      params=params, is_virtual=True)
+            meth.stmts.append(ccode.Stmt(code="visitor.walk_node(*this, stage);"))
+            self.top.methods.append(meth)
+        # children are pushed last to first so that the first one is walked first
+        meth = ccode.InlineMethod(
+                type=ccode.DataType(name="void"),
+                name="walk_children",
+                params=[ccode.Parameter(type=ccode.DataType(name="W&"), name="walker")],
+                template_args=[ccode.TemplateArgument(name="W")])
+        # smart pointers are expected to have a get() method for the raw pointer
+        get = "" if self.owns_raw_pointers() else ".get()"
+        for field in reversed(self.child_fields[node]):
+            if isinstance(field.type.type, nodes.ListElementType):
+                meth.stmts.append(ccode.Stmt(
+                    code="for (auto i = this->%s.rbegin(); " % field.name +
+                         "i != this->%s.rend(); ++i) walker.walk_push((*i)%s);" % (
+                            field.name, get)))
+            else:
+                meth.stmts.append(ccode.Stmt(code="walker.walk_push(this->%s%s);" % (
+                                                    field.name, get)))
+        if node.base:
+            meth.stmts.append(ccode.Stmt(code="%s::walk_children(walker);" % node.base.name))
+        self.top.methods.append(meth)
+
+    def find_class_extra(self):
+        " The 'class_extra' option, checked once rather than for every class. "
         extra = self.get_opt("class_extra", None)
+        if not extra:
+            return None
+        for ext in extra.value:
+            if not isinstance(ext, nodes.StringLiteral):
+                raise ValueError("expected a list of string literal for 'class_extra' option")
+        return extra
+
+    def add_class_extra(self):
+        extra = self.class_extra
         if extra:
             self.top.extra_stmts.append(self.line_dir(extra.location))
             for ext in extra.value:
-                if not isinstance(ext, nodes.StringLiteral):
-                    raise ValueError("expected a list of string literal for 'class_extra' option")
                 self.top.extra_stmts.append(ccode.Stmt(code=ext.value))
             self.top.extra_stmts.append(self.reset_line_dir())
 
+    def getter_type(self, field):
+        " Smart node pointers may be move-only so they're returned by reference. "
+        dt = self.datatype_from_field(field)
+        tp = field.type.type
+        if isinstance(tp, nodes.ListElementType):
+            if not isinstance(tp.type, nodes.Node):
+                return dt
+            ptr = self.node_pointer_type(tp.type, tp.is_weak)
+        elif isinstance(tp, nodes.Node):
+            ptr = dt.name
+        else:
+            return dt
+        if ptr.endswith('*'):
+            return dt
+        return ccode.DataType(name='const ' + dt.name + '&')
+
     def add_getter_decl(self, field):
-        meth = ccode.MethodDecl(type=self.datatype_from_field(field),
+        meth = ccode.MethodDecl(type=self.getter_type(field),
                                 name='get_' + field.name,
                                 params=[],
                                 is_const=True)
@@ -217,25 +882,17 @@ class CPlusPlusTarget(target.CodegenTarget):
         self.top.methods.append(meth)
 
     def add_method_decls(self, node):
-        use_accessors = self.get_opt("use_accessors", None)
-        if use_accessors:
-            if not isinstance(use_accessors, nodes.BoolLiteral):
-                raise ValueError("expected a boolean literal for 'use_accessors'")
-            if use_accessors.value:
-                if self.get_opt("use_accessors", False):
-                    for field in node.fields:
-                        self.add_getter_decl(field)
-                        self.add_setter_decl(field)
-        for visitor in self.spec.visitors:
-            meth_type = ccode.DataType(name="void")
-            param_type = ccode.DataType(name=visitor.name + "&")
-            meth_param = ccode.Parameter(type=param_type, name="visitor")
-            meth = ccode.InlineMethod(type=meth_type, name="accept", params=[meth_param])
-            meth.stmts.append(ccode.Stmt(code="visitor.visit(*this);"))
-            self.top.methods.append(meth)
+        if self.config.use_accessors:
+            for field in node.fields:
+                self.add_getter_decl(field)
+                self.add_setter_decl(field)
+        self.add_factories(node)
+        if self.config.use_accept:
+            self.add_accept_methods()
+        self.add_walk_methods(node)
 
     def add_getter_def(self, cls, field):
-        meth = ccode.Method(type=self.datatype_from_field(field),
+        meth = ccode.Method(type=self.getter_type(field),
                             name='get_' + field.name,
                             params=[],
                             is_const=True,
@@ -251,50 +908,183 @@ class CPlusPlusTarget(target.CodegenTarget):
                             params=[param],
                             cls=cls)
         field_name = 'this->' + field.name if field.name == 'value' else field.name
-        if not field.type.is_weak and \
-                isinstance(field.type.type, (nodes.Node, nodes.ExternType)):
-            meth.stmts.append(ccode.Stmt(code='delete ' + field_name + ';'))
-        meth.stmts.append(ccode.Stmt(code=field_name + ' = value;'))
+        if not isinstance(field.type.type, nodes.ListElementType):
+            dtor_stmt = self.field_delete_stmt(field, field_name)
+            if dtor_stmt:
+                meth.stmts.append(dtor_stmt)
+        if self.is_movable(field):
+            meth.stmts.append(ccode.Stmt(code=field_name + ' = std::move(value);'))
+        else:
+            meth.stmts.append(ccode.Stmt(code=field_name + ' = value;'))
         self.top.stmts.append(meth)
 
     def add_method_defs(self, node):
-        use_accessors = self.get_opt("use_accessors", None)
-        if use_accessors:
-            if not isinstance(use_accessors, nodes.BoolLiteral):
-                raise ValueError("expected a boolean literal for 'use_accessors'")
-            if use_accessors.value:
-                if self.get_opt("use_accessors", False):
-                    for field in node.fields:
-                        self.add_getter_def(node.name, field)
-                        self.add_setter_def(node.name, field)
+        if self.config.use_accessors:
+            for field in node.fields:
+                self.add_getter_def(node.name, field)
+                self.add_setter_def(node.name, field)
+
+    def node_pointer_type(self, node, is_weak):
+        ptr = self.config.weak_ptr if is_weak else self.config.strong_ptr
+        return ptr.replace('$@', node.name)
+
+    def owns_raw_pointers(self):
+        " Whether strong node pointers are plain pointers which need deleting. "
+        return self.config.strong_ptr.replace(' ', '') == "$@*"
+
+    def element_type_name(self, elem_type, is_weak):
+        if isinstance(elem_type, nodes.Node):
+            return self.node_pointer_type(elem_type, is_weak)
+        elif isinstance(elem_type, nodes.PrimitiveType):
+            return self.primitive_type(elem_type.name)
+        elif isinstance(elem_type, nodes.ExternType):
+            return self.extern_type_name(elem_type.name)
+        return elem_type.name
+
+    def extern_type_name(self, name):
+        ext_type = self.extern_type(name)
+        if not ext_type:
+            raise ValueError("extern in target doesn't specify a type: option")
+        if not isinstance(ext_type, nodes.StringLiteral):
+            raise ValueError("expected string literal")
+        return ext_type.value
+
+    def find_field_types(self):
+        """
+        Maps each field to its C++ data type, each distinct type is only
+        rendered once and its DataType is shared by all the fields of that
+        type, their parameters and their accessors. Primitive types are
+        told apart by name since each use of one gets its own object, nodes
+        and extern types by identity.
+        """
+        def type_key(tp):
+            if isinstance(tp, nodes.PrimitiveType):
+                return tp.name
+            return tp
+        by_type = {}
+        field_types = {}
+        for node in self.spec.nodes:
+            for field in node.fields:
+                tp = field.type.type
+                if isinstance(tp, nodes.ListElementType):
+                    key = (type_key(tp.type), tp.is_weak, True)
+                else:
+                    key = (type_key(tp), field.type.is_weak, False)
+                if key not in by_type:
+                    by_type[key] = self.make_datatype(field)
+                field_types[field] = by_type[key]
+        return field_types
 
     def datatype_from_field(self, field):
+        dt = self.field_types.get(field)
+        if dt is None:
+            dt = self.make_datatype(field)
+        return dt
+
+    def make_datatype(self, field):
         if isinstance(field.type.type, nodes.Node):
-            return ccode.DataType(name=field.type.type.name + '*')
+            return ccode.DataType(name=self.node_pointer_type(field.type.type,
+                                                              field.type.is_weak))
         elif isinstance(field.type.type, nodes.PrimitiveType):
             return ccode.DataType(name=self.primitive_type(field.type.type.name))
         elif isinstance(field.type.type, nodes.ListElementType):
-            el_type = field.type.type.type
-            list_type = self.get_opt('list_type', 'std::vector<$@>')
-            list_type = list_type.value
-            star = '*' if isinstance(el_type, nodes.Node) else ''
-            list_type = list_type.replace('$@', el_type.name + star)
+            el_type = field.type.type
+            list_type = self.config.list_type.replace('$@', self.element_type_name(
+                el_type.type, el_type.is_weak))
             return ccode.DataType(name=list_type)
         elif isinstance(field.type.type, nodes.ExternType):
-            ext_type = self.extern_type(field.type.type.name)
-            if not ext_type:
-                raise ValueError("extern in target doesn't specify a type: option")
-            if not isinstance(ext_type, nodes.StringLiteral):
-                raise ValueError("expected string literal")
-            return ccode.DataType(name=ext_type.value)
+            return ccode.DataType(name=self.extern_type_name(field.type.type.name))
 
-    def add_fields(self, node):
+    def is_movable(self, field):
+        """
+        Whether values of the field's type are worth passing with std::move,
+        which is the case for anything but the scalar primitive types and
+        plain pointers. Move-only types such as std::unique_ptr require it.
+        """
+        tp = field.type.type
+        if isinstance(tp, nodes.PrimitiveType):
+            return tp.name == "string"
+        return not self.datatype_from_field(field).name.endswith('*')
+
+    def move_arg(self, field):
+        if field is not None and self.is_movable(field):
+            return 'std::move(%s)' % field.name
+        return field.name
+
+    def member_layout(self, type_name):
+        " (size, alignment) of a member type or None if it isn't known. "
+        if type_name.endswith('*'):
+            return (8, 8)
+        elif type_name.startswith("std::vector<"):
+            return (24, 8)
+        return self.member_layouts.get(type_name)
+
+    def layout_size(self, layouts):
+        " Size of a struct of members with the given (size, alignment). "
+        size, max_align = 0, 1
+        for member_size, align in layouts:
+            size = -(-size // align) * align + member_size
+            max_align = max(max_align, align)
+        return -(-size // max_align) * max_align
+
+    def node_members(self, node):
+        """
+        The data members of a node's class as (field, type, name, layout)
+        tuples, the field being None for the kind of root nodes. Returns
+        them in spec order and in the order to emit them, which with the
+        'reorder_fields' option is by decreasing alignment (keeping the
+        spec order otherwise) if that makes them smaller. Guessing wrong
+        could make them bigger, so they stay in spec order if the layout of
+        any of them isn't known.
+        """
+        members = []
+        if self.config.use_kinds and node.base is None:
+            kind_type = self.kind_type(node)
+            members.append((None, ccode.DataType(name=self.kind_enum(node)), "kind_",
+                            self.member_layouts[kind_type]))
         for field in node.fields:
-            self.top.fields.append(self.line_dir(field.location))
             dt = self.datatype_from_field(field)
             if dt is None:
                 raise ValueError("unknown field type '%s'" % field.type.type.name)
-            self.top.fields.append(ccode.Field(type=dt, name=field.name))
+            members.append((field, dt, field.name, self.member_layout(dt.name)))
+        if not self.config.reorder_fields or any(m[3] is None for m in members):
+            return members, members
+        ordered = sorted(members, key=lambda member: -member[3][1])
+        if self.layout_size(m[3] for m in ordered) >= self.layout_size(m[3] for m in members):
+            return members, members
+        return members, ordered
+
+    def add_layout_check(self, node, members, ordered):
+        """
+        Notes how much smaller reordering the members made them and adds
+        a static_assert checking the members take no more space than in
+        spec order with the compiler's own sizes. The sizes of the members
+        alone are compared, with a nested struct of them in each order,
+        since the size of the class also depends on its bases.
+        """
+        saved = self.layout_size(m[3] for m in members) - \
+                self.layout_size(m[3] for m in ordered)
+        self.top.fields.append(ccode.Comment(
+            text="data members ordered by alignment, %d bytes smaller on LP64" % saved))
+        for name, layout_members in (("SpecOrder_", members), ("AlignOrder_", ordered)):
+            layout = ccode.ClassDecl(name=name)
+            for field, dt, member_name, member_layout in layout_members:
+                layout.fields.append(ccode.Field(type=dt, name=member_name))
+            self.top.fields.append(layout)
+        self.top.fields.append(ccode.Stmt(
+            code='static_assert(sizeof(AlignOrder_) <= sizeof(SpecOrder_), ' +
+                 '"the members of %s take more space ordered by alignment");' % node.name))
+
+    def add_fields(self, node):
+        members, ordered = self.node_members(node)
+        if ordered is not members:
+            self.add_layout_check(node, members, ordered)
+        for field, dt, name, layout in ordered:
+            if field is None:
+                self.top.fields.append(ccode.Field(type=dt, name=name))
+                continue
+            self.top.fields.append(self.line_dir(field.location))
+            self.top.fields.append(ccode.Field(type=dt, name=name))
             self.top.fields.append(self.reset_line_dir())
 
     def find_field(self, node, name):
@@ -337,18 +1127,32 @@ class CPlusPlusTarget(target.CodegenTarget):
                 fields = []
                 self.list_ctor_fields(None, node.base, fields)
                 for field in fields:
-                    init_arg = ccode.InitializerArgument(name=field.name)
+                    init_arg = ccode.InitializerArgument(name=field.name,
+                                                         use_move=self.is_movable(field))
                     init.args.append(init_arg)
             self.top.initializers.append(init)
         if len(node.ctrs) > 0:
+            inits = []
             for ctr in node.ctrs:
                 for arg in ctr.args:
-                    init_arg = ccode.InitializerArgument(name=arg)
-                    init = ccode.Initializer(target=arg, arg=init_arg)
-                    self.top.initializers.append(init)
+                    field = node.get_field(arg)
+                    use_move = field is not None and self.is_movable(field)
+                    init_arg = ccode.InitializerArgument(name=arg, use_move=use_move)
+                    inits.append(ccode.Initializer(target=arg, arg=init_arg))
+            if self.config.reorder_fields:
+                # initialized in the order the members are declared in anyway
+                members, ordered = self.node_members(node)
+                position = dict((m[2], index) for index, m in enumerate(ordered))
+                inits.sort(key=lambda init: position.get(init.target, -1))
+            self.top.initializers.extend(inits)
 
     def add_constructors(self, node):
         if len(node.ctrs) == 0:
+            if self.config.use_kinds and self.has_default_ctor(node):
+                # the constructors are what set the kind of a node
+                ctor = ccode.Constructor(name=node.name)
+                ctor.stmts.append(self.kind_stmt(node))
+                self.top.constructors.append(ctor)
             return
         for ctr in node.ctrs:
             self.top.constructors.append(self.line_dir(ctr.location))
@@ -358,6 +1162,8 @@ class CPlusPlusTarget(target.CodegenTarget):
             self.pstack.append(ctor)
             self.add_construct_params(ctr, node)
             self.add_initializers(ctr, node)
+            if self.config.use_kinds:
+                ctor.stmts.append(self.kind_stmt(node))
             self.pstack.pop()
 
     def add_destructor_decl(self, node):
@@ -372,17 +1178,78 @@ class CPlusPlusTarget(target.CodegenTarget):
         self.pstack.pop()
         self.top.stmts.append(ccode.BlankLine())
 
+    def deleter(self, target):
+        return self.config.deleter.replace('$$', target)
+
+    def field_delete_stmt(self, field, target):
+        """
+        Returns the statement releasing what an owning field points to or
+        None if there's nothing to release. Nodes in an arena are released
+        all at once with the arena, so their fields never own anything.
+        """
+        if field.type.is_weak or self.config.use_arena:
+            return None
+        if isinstance(field.type.type, nodes.Node):
+            if self.owns_raw_pointers():
+                return ccode.Stmt(code=self.deleter(target))
+        elif isinstance(field.type.type, nodes.ExternType):
+            dtor_stmt = self.extern_destructor(field.type.type.name)
+            if dtor_stmt and dtor_stmt.value:
+                return ccode.Stmt(code=dtor_stmt.value.replace('$$', target))
+        elif isinstance(field.type.type, nodes.ListElementType):
+            if isinstance(field.type.type.type, nodes.Node) and self.owns_raw_pointers():
+                return ccode.Stmt(code='for (auto i : ' + target + ') { ' +
+                                       self.deleter('i') + '; }')
+        return None
+
     def delete_stmts(self, node):
         for field in node.fields:
-            if not field.type.is_weak:
-                if isinstance(field.type.type, nodes.Node):
-                        #self.top.stmts.append(ccode.DeleteStmt(target=field.name))
-                        self.top.stmts.append(ccode.Stmt(code='delete ' + field.name))
-                elif isinstance(field.type.type, nodes.ExternType):
-                    dtor_stmt = self.extern_destructor(field.type.type.name)
-                    dtor_stmt = dtor_stmt.value.replace('$$', field.name)
-                    self.top.stmts.append(ccode.Stmt(code=dtor_stmt))
-                elif isinstance(field.type.type, nodes.ListElementType):
-                    dtor_stmt = ccode.Stmt(code='for (auto i : ' + field.name +
-                        ') { delete i; }')
-                    self.top.stmts.append(dtor_stmt)
+            dtor_stmt = self.field_delete_stmt(field, field.name)
+            if dtor_stmt:
+                self.top.stmts.append(dtor_stmt)
+
+    def has_default_ctor(self, node):
+        while node:
+            if node.ctrs:
+                return False
+            node = node.base
+        return True
+
+    def add_factories(self, node):
+        """
+        Adds static create() methods for each constructor which allocate the
+        node with the 'allocator' option or, in arena mode, in an arena.
+        """
+        if node.is_abstract:
+            return
+        use_arena = self.config.use_arena
+        if not use_arena and not self.has_opt("allocator"):
+            return
+        if node.ctrs:
+            ctor_fields = []
+            for ctr in node.ctrs:
+                fields = []
+                self.list_ctor_fields(ctr, node, fields)
+                ctor_fields.append(fields)
+        elif self.has_default_ctor(node):
+            ctor_fields = [[]]
+        else:
+            return
+        for fields in ctor_fields:
+            params = []
+            if use_arena:
+                arena_type = ccode.DataType(name=self.config.arena_name + '&')
+                params.append(ccode.Parameter(type=arena_type, name='arena'))
+            for field in fields:
+                params.append(ccode.Parameter(type=self.datatype_from_field(field),
+                                              name=field.name))
+            args = ', '.join(self.move_arg(field) for field in fields)
+            if use_arena:
+                code = 'return arena.make<%s>(%s);' % (node.name, args)
+            else:
+                alloc = self.config.allocator.replace('$@', node.name)
+                code = 'return %s(%s);' % (alloc, args)
+            meth = ccode.InlineMethod(type=ccode.DataType(name=node.name + '*'),
+                                      name='create', params=params, is_static=True)
+            meth.stmts.append(ccode.Stmt(code=code))
+            self.top.methods.append(meth)
@@ -159,12 +159,17 @@ class DebugTree(NodeVisitor):
     def visit_Prolog(self, node):
         self.write_line('<Prolog src="%s"/>' % node.filename)
 
+    def visit_Import(self, node):
+        self.write_line('<Import src="%s"/>' % node.filename)
+
     def visit_RootSpec(self, node):
         self.write_line('<Root>%s</Root>' % node.type.name)
 
     def visit_SpecFile(self, node):
         self.write_line('<Spec src="%s">' % node.filename)
         self.indent()
+        for imp in node.imports:
+            imp.accept(self)
         if node.root:
             node.root.accept(self)
         for target in node.targets:
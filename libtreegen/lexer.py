@@ -1,3 +1,6 @@
+import codecs
+import io
+import mmap
 from . import nodes
 from . import report
 
@@ -5,6 +8,7 @@ reserved = {
     "abstract": "ABSTRACT",
     "extern":   "EXTERN",
     "false":    "FALSE",
+    "import":   "IMPORT",
     "node":     "NODE",
     "null":     "NULL",
     "root":     "ROOT",
@@ -125,6 +129,9 @@ t_ignore = ' \t'
 
 def find_column(input, token, index=1):
     pos = token.lexpos if not callable(token.lexpos) else token.lexpos(index)
+    if input is None:
+        # streamed input, StreamLexer already made the positions columns
+        return pos
     last_cr = input.rfind('\n', 0, pos)
     if last_cr < 0:
         last_cr = 0
@@ -134,3 +141,144 @@ def find_column(input, token, index=1):
 def t_error(t):
     location = nodes.Location(t.lexer.filename, t.lexer.lineno, find_column(t.lexer.lexdata, t))
     report.error("illegal character '%s'" % t.value[0], location)
+
+# Size of the pieces of text StreamLexer works with
+CHUNK_SIZE = 1 << 20
+
+class _NeedInput(Exception):
+    pass
+
+class StreamLexer(object):
+    """
+    Lexes text arriving in chunks (ex. from a memory mapped file or a
+    pipe) with a PLY lexer, only keeping the text from the start of the
+    current line onwards in memory. Since the text doesn't stay around,
+    token positions are turned into columns as the tokens are produced
+    and `lexdata` is always None (see find_column()).
+    """
+    lexdata = None
+
+    def __init__(self, lexer, chunks, filename):
+        self.lexer = lexer.clone()
+        self.lexer.input('')
+        self.lexer.lineno = 1
+        self.lexer.filename = filename
+        self.error_func = lexer.lexerrorf
+        self.lexer.lexerrorf = self._lex_error
+        self.chunks = iter(chunks)
+        self.filename = filename
+        self.at_eof = False
+        # position of the last newline in the text so far, only string and
+        # character literals go on past the end of a line so tokens ending
+        # before it won't turn out differently with more input
+        self.line_end = -1
+        # newline before the last token and where the search for it stopped,
+        # so columns on long lines don't search back to the start each time
+        self.col_start = -1
+        self.col_pos = 0
+
+    @property
+    def lineno(self):
+        return self.lexer.lineno
+
+    @lineno.setter
+    def lineno(self, value):
+        self.lexer.lineno = value
+
+    @property
+    def lexpos(self):
+        # the parser uses this for empty productions, make it a column too
+        return find_column(self.lexer.lexdata, self.lexer)
+
+    def _lex_error(self, t):
+        # might just be a token cut in half at the end of the text so far
+        if not self.at_eof and (t.lexpos >= self.line_end or
+                                t.lexer.lexdata[t.lexpos] in '"\''):
+            raise _NeedInput()
+        return self.error_func(t)
+
+    def _refill(self, pos):
+        # drop the text before the line `pos` is on, keeping the newline
+        # so columns come out the same as when lexing the whole text
+        data = self.lexer.lexdata
+        start = max(data.rfind('\n', 0, pos), 0)
+        parts = [data[start:]]
+        # read at least as much as is kept, so a long line or literal is
+        # copied a bounded number of times rather than once per chunk
+        size = 0
+        while size == 0 or size < len(parts[0]):
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.at_eof = True
+                break
+            parts.append(chunk)
+            size += len(chunk)
+        data = ''.join(parts)
+        self.lexer.input(data)
+        self.lexer.lexpos = pos - start
+        self.line_end = data.rfind('\n')
+        self.col_start -= start
+        self.col_pos = pos - start
+
+    def _column(self, pos):
+        # same as find_column() on the text so far
+        nl = self.lexer.lexdata.rfind('\n', self.col_pos, pos)
+        if nl >= 0:
+            self.col_start = nl
+        self.col_pos = pos
+        return pos - max(self.col_start, 0) + 1
+
+    def token(self):
+        lexer = self.lexer
+        while True:
+            pos = lexer.lexpos
+            lineno = lexer.lineno
+            try:
+                tok = lexer.token()
+                # anything reaching the last line of the text so far could
+                # turn out differently with more input, so lex it again then
+                if self.at_eof or lexer.lexpos <= self.line_end:
+                    break
+            except _NeedInput:
+                pass
+            lexer.lineno = lineno
+            self._refill(pos)
+        if tok is not None:
+            tok.lexpos = self._column(tok.lexpos)
+            tok.lexer = self
+        return tok
+
+def _decode_chunks(chunks, encoding='utf-8'):
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder(encoding)(), translate=True)
+    for chunk in chunks:
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', final=True)
+
+def mmap_chunks(filename, size=CHUNK_SIZE):
+    """
+    Text of a (UTF-8 or ASCII) file as a series of chunks, read through a
+    memory map rather than into one big string.
+    """
+    with open(filename, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # empty file
+            return
+        with buf:
+            yield from _decode_chunks(buf[start:start+size]
+                                      for start in range(0, len(buf), size))
+
+def file_chunks(file, size=CHUNK_SIZE):
+    """
+    Text of an open file (ex. stdin) as a series of chunks. When the file
+    has a binary buffer it's read with read1(), which returns whatever is
+    available instead of waiting for `size` bytes, so the text coming
+    down a pipe is lexed as it arrives.
+    """
+    buf = getattr(file, 'buffer', None)
+    if buf is not None and hasattr(buf, 'read1'):
+        encoding = getattr(file, 'encoding', None) or 'utf-8'
+        yield from _decode_chunks(iter(lambda: buf.read1(size), b''), encoding)
+    else:
+        yield from iter(lambda: file.read(size), '')
@@ -127,6 +127,11 @@ class Visitor(BaseNode):
                 return opt.value
         return default
 
+class Import(BaseNode):
+    def __init__(self, filename):
+        super().__init__()
+        self.filename = filename
+
 class RootSpec(BaseNode):
     def __init__(self, type):
         super().__init__()
@@ -159,6 +164,12 @@ class Node(BaseNode):
         self.fields = [] if fields is None else fields
         self.ctrs = [] if ctrs is None else ctrs
         self.is_abstract = is_abstract
+        # number of bases above this node, the nodes directly deriving from
+        # it and its span in SpecFile.preorder, set once the types are resolved
+        self.depth = 0
+        self.derived = []
+        self.enter = 0
+        self.exit = 0
     def get_field(self, name):
         for field in self.fields:
             if field.name == name:
@@ -172,8 +183,22 @@ class SpecFile(BaseNode):
         self.visitors = [] if visitors is None else visitors
         self.root = root
         self.nodes = [] if nodes is None else nodes
+        # the nodes with bases before derived nodes, the nodes without a base
+        # and the nodes depth first, once the types are resolved
+        self.order = []
+        self.root_nodes = []
+        self.preorder = []
         self.types = {}
         self.filename = filename
+        self.imports = []
+        # spec files this one is made of, imported ones first
+        self.modules = [self]
+    def is_subclass(self, node, base):
+        " True if `node` is `base` or derives from it, in constant time. "
+        return base.enter <= node.enter < base.exit
+    def descendants(self, node):
+        " The nodes deriving from `node`, directly or not, depth first. "
+        return self.preorder[node.enter + 1:node.exit]
 
 class NodeVisitor(object):
     def generic_visit(self, node):
@@ -1,3 +1,4 @@
+import mmap
 import os
 import ply.lex as lex
 import ply.yacc as yacc
@@ -5,26 +6,19 @@ import ply.yacc as yacc
 from .lexer import *
 from .nodes import *
 from . import report
+from . import snapshot
 
 start = "spec_file"
 
-def push_parent(p, node):
-    parents = getattr(p.parser, "parents")
-    parents.append(node)
-
-def pop_parent(p):
-    parents = getattr(p.parser, "parents")
-    top = parents[-1]
-    parents.pop()
-
-def add_node(p, node, index=1):
-    parents = getattr(p.parser, "parents")
-    top = parents[-1]
-    node.parent = top
-    node.location = Location(p.lexer.filename,
-                             p.lexer.lineno,
-                             find_column(p.lexer.lexdata, p, index))
-    top.children.append(node)
+def location(p, index=1):
+    return Location(p.lexer.filename,
+                    p.lineno(index),
+                    find_column(p.lexer.lexdata, p, index))
+
+def adopt(node, children):
+    for child in children:
+        child.parent = node
+    node.children.extend(children)
     return node
 
 def p_expr_list_first(p):
@@ -40,290 +34,263 @@ def p_expr_list_rest(p):
     p[0] = p[1]
     return p
 
-def p_list_literal(p):
-    ''' list_literal : LBRACKET expr_list RBRACKET
-    '''
-    p[0] = add_node(p, ListLiteral(p[2]), 2)
-    return p
-
-def p_list_literal_empty(p):
-    ''' list_literal : LBRACKET RBRACKET
+def p_expr_list_literal(p):
+    ''' expr : LBRACKET expr_list RBRACKET
     '''
-    p[0] = add_node(p, ListLiteral([]))
+    p[0] = adopt(ListLiteral(p[2]), p[2])
+    p[0].location = location(p)
     return p
 
-def p_literal_bool(p):
-    ''' literal : BOOLEAN
+def p_expr_list_literal_empty(p):
+    ''' expr : LBRACKET RBRACKET
     '''
-    p[0] = add_node(p, BoolLiteral(p[1]))
+    p[0] = ListLiteral([])
+    p[0].location = location(p)
     return p
 
-def p_literal_int(p):
-    ''' literal : INTEGER
+def p_expr_bool(p):
+    ''' expr : BOOLEAN
     '''
-    p[0] = add_node(p, IntLiteral(p[1]))
+    p[0] = BoolLiteral(p[1])
+    p[0].location = location(p)
     return p
 
-def p_literal_float(p):
-    ''' literal : FLOAT
+def p_expr_int(p):
+    ''' expr : INTEGER
     '''
-    p[0] = add_node(p, FloatLiteral(p[1]))
+    p[0] = IntLiteral(p[1])
+    p[0].location = location(p)
     return p
 
-def p_literal_chr(p):
-    ''' literal : CHRLIT
+def p_expr_float(p):
+    ''' expr : FLOAT
     '''
-    p[0] = add_node(p, CharLiteral(p[1]))
+    p[0] = FloatLiteral(p[1])
+    p[0].location = location(p)
     return p
 
-def p_literal_str(p):
-    ''' literal : STRLIT
+def p_expr_chr(p):
+    ''' expr : CHRLIT
     '''
-    p[0] = add_node(p, StringLiteral(p[1]))
+    p[0] = CharLiteral(p[1])
+    p[0].location = location(p)
     return p
 
-def p_literal_null(p):
-    ''' literal : NULL
+def p_expr_str(p):
+    ''' expr : STRLIT
     '''
-    p[0] = add_node(p, NullLiteral())
-    return p
-
-def p_literal_list(p):
-    ''' literal : list_literal
-    '''
-    p[0] = p[1]
+    p[0] = StringLiteral(p[1])
+    p[0].location = location(p)
     return p
 
-def p_expr(p):
-    ''' expr : literal
+def p_expr_null(p):
+    ''' expr : NULL
     '''
-    p[0] = p[1]
+    p[0] = NullLiteral()
+    p[0].location = location(p)
     return p
 
 def p_expr_call(p):
     ''' expr : IDENT LPAREN RPAREN
     '''
-    p[0] = add_node(p, Call(p[1]))
-    return p
-
-def p_primitive_type(p):
-    ''' primitive_type : BOOL
-                       | FLOAT
-                       | INT
-                       | STRING
-    '''
-    p[0] = p[1]
+    p[0] = Call(p[1])
+    p[0].location = location(p)
     return p
 
 def p_data_type_prim(p):
-    ''' data_type : primitive_type
+    ''' data_type : BOOL
+                  | FLOAT
+                  | INT
+                  | STRING
     '''
-    p[0] = add_node(p, PrimitiveType(p[1]))
+    p[0] = PrimitiveType(p[1])
+    p[0].location = location(p)
     return p
 
 def p_data_type_unresolved(p):
     ''' data_type : IDENT
     '''
-    p[0] = add_node(p, UnresolvedType(p[1]))
-    return p
-
-def p_option_decl(p):
-    ''' option_decl : IDENT
-    '''
-    p[0] = add_node(p, Option(p[1], None))
-    push_parent(p, p[0])
+    p[0] = UnresolvedType(p[1])
+    p[0].location = location(p)
     return p
 
-def p_option(p):
-    ''' option : option_decl COLON expr SEMICOLON
-    '''
-    p[0] = p[1]
-    p[0].value = p[3]
-    pop_parent(p)
-    return p
+def make_option(p, index):
+    opt = Option(p[index], p[index + 2])
+    opt.location = location(p, index)
+    opt.value.parent = opt
+    opt.children.append(opt.value)
+    return opt
 
 def p_option_list_first(p):
-    ''' option_list : option
+    ''' option_list : IDENT COLON expr SEMICOLON
     '''
-    p[0] = [p[1]]
+    p[0] = [make_option(p, 1)]
     return p
 
 def p_option_list_rest(p):
-    ''' option_list : option_list option
+    ''' option_list : option_list IDENT COLON expr SEMICOLON
     '''
-    p[1].append(p[2])
+    p[1].append(make_option(p, 2))
     p[0] = p[1]
     return p
 
 def p_extern(p):
     ''' extern : EXTERN IDENT LBRACE option_list RBRACE
     '''
-    p[0] = add_node(p, ExternTypeDef(p[2], p[4]))
-    for opt in p[4]:
-        opt.parent = p[0]
-        p[0].children.append(opt)
-    return p
-
-def p_target_item_option(p):
-    ''' target_item : option
-    '''
-    p[0] = p[1]
+    p[0] = adopt(ExternTypeDef(p[2], p[4]), p[4])
+    p[0].location = location(p)
     return p
 
-def p_target_item_extern(p):
-    ''' target_item : extern
+def p_target_item_list_option(p):
+    ''' target_item_list : IDENT COLON expr SEMICOLON
     '''
-    p[0] = p[1]
+    p[0] = [make_option(p, 1)]
     return p
 
-def p_target_item_list_first(p):
-    ''' target_item_list : target_item
+def p_target_item_list_extern(p):
+    ''' target_item_list : extern
     '''
     p[0] = [p[1]]
     return p
 
-def p_target_item_list_rest(p):
-    ''' target_item_list : target_item_list target_item
+def p_target_item_list_rest_option(p):
+    ''' target_item_list : target_item_list IDENT COLON expr SEMICOLON
     '''
-    p[1].append(p[2])
+    p[1].append(make_option(p, 2))
     p[0] = p[1]
     return p
 
-def p_target_decl(p):
-    ''' target_decl : TARGET IDENT
+def p_target_item_list_rest_extern(p):
+    ''' target_item_list : target_item_list extern
     '''
-    p[0] = add_node(p, Target(p[2]))
-    push_parent(p, p[0])
+    p[1].append(p[2])
+    p[0] = p[1]
     return p
 
 def p_target(p):
-    ''' target : target_decl LBRACE target_item_list RBRACE
+    ''' target : TARGET IDENT LBRACE target_item_list RBRACE
     '''
-    p[0] = p[1]
-    for item in p[3]:
+    p[0] = adopt(Target(p[2]), p[4])
+    p[0].location = location(p)
+    for item in p[4]:
         if isinstance(item, Option):
             p[0].options.append(item)
-        elif isinstance(item, ExternTypeDef):
+        else:
             p[0].externs.append(item)
-        else: # should be/is disallowed by parsing rules
-            report.error("unexpected %s in codegen target, " % item.__class__.__name__ +
-                         "only options and extern types are allowed", item.location)
-        p[0].children.append(item)
-        item.parent = p[0]
-    pop_parent(p)
-    return p
-
-def p_visitor_decl(p):
-    ''' visitor_decl : VISITOR IDENT
-    '''
-    p[0] = add_node(p, Visitor(p[2]))
-    push_parent(p, p[0])
     return p
 
 def p_visitor(p):
-    ''' visitor : visitor_decl LBRACE option_list RBRACE
+    ''' visitor : VISITOR IDENT LBRACE option_list RBRACE
     '''
-    p[0] = p[1]
-    p[0].options = p[3]
-    pop_parent(p)
+    p[0] = adopt(Visitor(p[2], p[4]), p[4])
+    p[0].location = location(p)
     return p
 
 def p_visitor_empty(p):
-    ''' visitor : visitor_decl LBRACE RBRACE
+    ''' visitor : VISITOR IDENT LBRACE RBRACE
     '''
-    p[0] = p[1]
+    p[0] = Visitor(p[2])
+    p[0].location = location(p)
     return p
 
 def p_root(p):
     ''' root : ROOT IDENT SEMICOLON
     '''
-    p[0] = add_node(p, RootSpec(None))
-    push_parent(p, p[0])
-    p[0].type = add_node(p, UnresolvedType(p[2]), 2)
-    pop_parent(p)
-    return p
-
-def p_field_specifier(p):
-    ''' field_specifier : WEAK
-                        | LIST
-    '''
-    p[0] = p[1]
+    root_type = UnresolvedType(p[2])
+    root_type.location = location(p, 2)
+    p[0] = adopt(RootSpec(root_type), [root_type])
+    p[0].location = location(p)
     return p
 
 def p_field_specifier_list_first(p):
-    ''' field_specifier_list : field_specifier
+    ''' field_specifier_list : WEAK
+                             | LIST
     '''
     p[0] = [p[1]]
     return p
 
 def p_field_specifier_list_rest(p):
-    ''' field_specifier_list : field_specifier_list field_specifier
+    ''' field_specifier_list : field_specifier_list WEAK
+                             | field_specifier_list LIST
     '''
     p[1].append(p[2])
     p[0] = p[1]
     return p
 
-def p_field_decl(p):
-    ''' field_decl : IDENT
+def p_field_type(p):
+    ''' field_type : field_specifier_list data_type
     '''
-    p[0] = add_node(p, Field(type=None, name=p[1]))
+    is_weak = True if "weak" in p[1] else False
+    is_list = True if "list" in p[1] else False
+    if is_list:
+        let = adopt(ListElementType(p[2], is_weak=is_weak), [p[2]])
+        let.location = location(p)
+        p[0] = adopt(FieldType(let, is_weak=is_weak), [let])
+    else:
+        p[0] = adopt(FieldType(p[2], is_weak=is_weak), [p[2]])
+    p[0].location = location(p)
     return p
 
-def p_field_decl_init(p):
-    ''' field_decl : IDENT EQUAL expr
+def p_field_type_prim(p):
+    ''' field_type : BOOL
+                   | FLOAT
+                   | INT
+                   | STRING
     '''
-    p[0] = add_node(p, Field(type=None, name=p[1], default=p[3]))
-    push_parent(p, p[0])
-    add_node(p, p[3])
-    pop_parent(p)
+    data_type = PrimitiveType(p[1])
+    data_type.location = location(p)
+    p[0] = FieldType(data_type)
+    p[0].location = data_type.location
+    data_type.parent = p[0]
+    p[0].children.append(data_type)
     return p
 
-def p_field_decl_list_first(p):
-    ''' field_decl_list : field_decl
+def p_field_type_unresolved(p):
+    ''' field_type : IDENT
     '''
-    p[0] = [p[1]]
+    data_type = UnresolvedType(p[1])
+    data_type.location = location(p)
+    p[0] = FieldType(data_type)
+    p[0].location = data_type.location
+    data_type.parent = p[0]
+    p[0].children.append(data_type)
     return p
 
-def p_field_decl_list_rest(p):
-    ''' field_decl_list : field_decl_list COMMA field_decl
+def make_field(p, index):
+    node = Field(type=None, name=p[index])
+    node.location = location(p, index)
+    return node
+
+def make_field_init(p, index):
+    node = Field(type=None, name=p[index], default=p[index + 2])
+    node.location = location(p, index)
+    node.default.parent = node
+    return node
+
+def p_field_decl_list_first(p):
+    ''' field_decl_list : IDENT
     '''
-    p[1].append(p[3])
-    p[0] = p[1]
+    p[0] = [make_field(p, 1)]
     return p
 
-def p_field_type(p):
-    ''' field_type : field_specifier_list data_type
+def p_field_decl_list_first_init(p):
+    ''' field_decl_list : IDENT EQUAL expr
     '''
-    is_weak = True if "weak" in p[1] else False
-    is_list = True if "list" in p[1] else False
-    p[0] = add_node(p, FieldType(p[2], is_weak=is_weak))
-    push_parent(p, p[0])
-    if is_list:
-        let = add_node(p, ListElementType(None, is_weak=is_weak))
-        push_parent(p, let)
-        let.type = add_node(p, p[2], 2)
-        pop_parent(p)
-        p[0].type = let
-    else:
-        p[0].type = add_node(p, p[2], 2)
-    pop_parent(p)
+    p[0] = [make_field_init(p, 1)]
     return p
 
-def p_field_type_no_spec(p):
-    ''' field_type : data_type
+def p_field_decl_list_rest(p):
+    ''' field_decl_list : field_decl_list COMMA IDENT
     '''
-    p[0] = add_node(p, FieldType(p[1]))
+    p[1].append(make_field(p, 3))
+    p[0] = p[1]
     return p
 
-def p_fields(p):
-    ''' fields : field_type field_decl_list SEMICOLON
+def p_field_decl_list_rest_init(p):
+    ''' field_decl_list : field_decl_list COMMA IDENT EQUAL expr
     '''
-    p[0] = []
-    for field in p[2]:
-        push_parent(p, field)
-        field.type = add_node(p, p[1])
-        pop_parent(p)
-        p[0].append(field)
+    p[1].append(make_field_init(p, 3))
+    p[0] = p[1]
     return p
 
 def p_arg_list_first(p):
@@ -339,70 +306,54 @@ def p_arg_list_rest(p):
     p[0] = p[1]
     return p
 
-def p_ctor_ident(p):
-    ''' ctor_ident : IDENT
+def p_node_item_list_empty(p):
+    ''' node_item_list :
     '''
-    p[0] = add_node(p, Constructor(p[1],[]))
-    push_parent(p, p[0])
+    p[0] = []
+    return p
 
-def p_ctor_no_args(p):
-    ''' ctor : ctor_ident LPAREN RPAREN SEMICOLON
+def p_node_item_list_fields(p):
+    ''' node_item_list : node_item_list field_type field_decl_list SEMICOLON
     '''
+    field_type = p[2]
+    for field in p[3]:
+        # the fields declared together all share the type
+        field.type = field_type
+        field_type.parent = field
+        if field.default is None:
+            field.children.append(field_type)
+        else:
+            field.children.extend((field_type, field.default))
+    p[1].extend(p[3])
     p[0] = p[1]
     return p
 
-def p_ctor_with_args(p):
-    ''' ctor : ctor_ident LPAREN arg_list RPAREN SEMICOLON
+def p_node_item_list_ctor(p):
+    ''' node_item_list : node_item_list IDENT LPAREN RPAREN SEMICOLON
     '''
+    ctor = Constructor(p[2], [])
+    ctor.location = location(p, 2)
+    p[1].append(ctor)
     p[0] = p[1]
-    p[0].args = p[3]
-    pop_parent(p)
     return p
 
-def p_node_specifier(p):
-    ''' node_specifier : ABSTRACT
+def p_node_item_list_ctor_args(p):
+    ''' node_item_list : node_item_list IDENT LPAREN arg_list RPAREN SEMICOLON
     '''
+    ctor = Constructor(p[2], p[4])
+    ctor.location = location(p, 2)
+    p[1].append(ctor)
     p[0] = p[1]
     return p
 
 def p_node_specifier_list_first(p):
-    ''' node_specifier_list : node_specifier
+    ''' node_specifier_list : ABSTRACT
     '''
     p[0] = [p[1]]
     return p
 
 def p_node_specifier_list_rest(p):
-    ''' node_specifier_list : node_specifier_list node_specifier
-    '''
-    p[1].append(p[2])
-    return p
-
-def p_node_base(p):
-    ''' node_base : COLON IDENT
-    '''
-    p[0] = add_node(p, UnresolvedType(p[2], is_weak=True), 2)
-    return p
-
-def p_node_item_fields(p):
-    ''' node_item : fields
-    '''
-    p[0] = p[1]
-    return p
-
-def p_node_item_ctor(p):
-    ''' node_item : ctor
-    '''
-    p[0] = p[1]
-    return p
-
-def p_node_item_list_first(p):
-    ''' node_item_list : node_item
-    '''
-    p[0] = [p[1]]
-    return p
-
-def p_node_item_list_rest(p):
-    ''' node_item_list : node_item_list node_item
+    ''' node_specifier_list : node_specifier_list ABSTRACT
     '''
     p[1].append(p[2])
     p[0] = p[1]
@@ -420,94 +371,57 @@ def p_node_type_no_spec(p):
     p[0] = []
     return p
 
-def p_node_declarator(p):
-    ''' node_declarator : node_type IDENT
-    '''
+def make_node(p, base, items):
     abstract = True if "abstract" in p[1] else False
-    p[0] = add_node(p, Node(p[2], None, is_abstract=abstract))
-    push_parent(p, p[0])
-    return p
-
-def p_node_block(p):
-    ''' node_block : LBRACE node_item_list RBRACE
-    '''
-    p[0] = p[2]
-    return p
-
-def p_node_block_empty(p):
-    ''' node_block : LBRACE RBRACE
-    '''
-    p[0] = []
-    return p
+    node = Node(p[2], base, is_abstract=abstract)
+    node.location = location(p)
+    for item in items:
+        if isinstance(item, Field):
+            node.fields.append(item)
+        else:
+            node.ctrs.append(item)
+    if base is not None:
+        base.parent = node
+        node.children.append(base)
+    return adopt(node, items)
 
 def p_node(p):
-    ''' node : node_declarator node_block
+    ''' node : node_type IDENT LBRACE node_item_list RBRACE
     '''
-    p[0] = p[1]
-    for item in p[2]:
-        if isinstance(item, Field):
-            p[0].fields.append(item)
-        elif isinstance(item, Constructor):
-            p[0].ctrs.append(item)
-        elif all(isinstance(e, Field) for e in item):
-            p[0].fields.extend(item)
-        else: # should be/is disallowed by parsing rules
-            report.error("unexpected item in %s in node " % item.__class__.__name__ +
-                         "definition, only Fields and Constructors are allowed")
-    p[0].base = None
-    pop_parent(p)
+    p[0] = make_node(p, None, p[4])
     return p
 
 def p_node_with_base(p):
-    ''' node : node_declarator node_base node_block
-    '''
-    p[0] = p[1]
-    for item in p[3]:
-        if isinstance(item, Field):
-            p[0].fields.append(item)
-        elif isinstance(item, Constructor):
-            p[0].ctrs.append(item)
-        elif all(isinstance(e, Field) for e in item):
-            p[0].fields.extend(item)
-        else: # should be/is disallowed by parsing rules
-            report.error("unexpected item in %s in node " % item.__class__.__name__ +
-                         "definition, only Fields and Constructors are allowed")
-    p[0].base = p[2]
-    pop_parent(p)
-    return p
-
-def p_spec_file_item_target(p):
-    ''' spec_file_item : target
-    '''
-    p[0] = p[1]
-    return p
-
-def p_spec_file_item_visitor(p):
-    ''' spec_file_item : visitor
+    ''' node : node_type IDENT COLON IDENT LBRACE node_item_list RBRACE
     '''
-    p[0] = p[1]
+    base = UnresolvedType(p[4], is_weak=True)
+    base.location = location(p, 4)
+    p[0] = make_node(p, base, p[6])
     return p
 
-def p_spec_file_item_root(p):
-    ''' spec_file_item : root
+def p_import(p):
+    ''' import : IMPORT STRLIT SEMICOLON
     '''
-    p[0] = p[1]
-    return p
-
-def p_spec_file_item_node_spec(p):
-    ''' spec_file_item : node
-    '''
-    p[0] = p[1]
+    p[0] = Import(p[2][1:-1])
+    p[0].location = location(p, 2)
     return p
 
 def p_spec_file_item_list_first(p):
-    ''' spec_file_item_list : spec_file_item
+    ''' spec_file_item_list : import
+                            | target
+                            | visitor
+                            | root
+                            | node
     '''
     p[0] = [p[1]]
     return p
 
 def p_spec_file_item_list_rest(p):
-    ''' spec_file_item_list : spec_file_item_list spec_file_item
+    ''' spec_file_item_list : spec_file_item_list import
+                            | spec_file_item_list target
+                            | spec_file_item_list visitor
+                            | spec_file_item_list root
+                            | spec_file_item_list node
     '''
     p[1].append(p[2])
     p[0] = p[1]
@@ -533,17 +447,21 @@ def find_node_types(spec, types):
             report.error("duplicate node type %s" % node.name, fatal=False, location=node.location)
             report.note("previous definition was here", fatal=True, location=types[node.name].location)
 
+# Types already resolved are looked up again by name, since modules parsed
+# earlier can refer to nodes of another module that was parsed again.
+resolvable_types = (UnresolvedType, Node, ExternType)
+
 def resolve_node_fields(node, types):
     for field in node.fields:
         tp = field.type.type
-        if isinstance(tp, UnresolvedType):
+        if isinstance(tp, resolvable_types):
             if tp.name in types:
                 field.type.type = types[field.type.type.name]
             else:
                 report.error("unresolved field type %s" % tp.name, field.location)
 
 def resolve_node_base(node, types):
-    if isinstance(node.base, UnresolvedType):
+    if isinstance(node.base, resolvable_types):
         if node.base.name in types:
             node.base = types[node.base.name]
         else:
@@ -555,7 +473,7 @@ def resolve_node_types(spec, types):
         resolve_node_base(node, types)
 
 def resolve_root_spec(spec, types):
-    if spec.root and isinstance(spec.root.type, UnresolvedType):
+    if spec.root and isinstance(spec.root.type, resolvable_types):
         if spec.root.type.name in types:
             spec.root.type = types[spec.root.type.name]
         else:
@@ -565,11 +483,79 @@ def resolve_list_types(spec, types):
     for node in spec.nodes:
         for field in node.fields:
             if isinstance(field.type.type, ListElementType):
-                if isinstance(field.type.type.type, UnresolvedType):
+                if isinstance(field.type.type.type, resolvable_types):
                     if field.type.type.type.name in types:
                         field.type.type.type = types[field.type.type.type.name]
-                else:
-                    report.error("unresolved list node type %s" % field.type.type.name, field.type.location)
+                    else:
+                        report.error("unresolved list node type %s" % field.type.type.type.name,
+                                     field.type.location)
+
+def report_base_cycle(cycle):
+    if len(cycle) == 1:
+        report.error("node type %s is its own base" % cycle[0].name, cycle[0].location)
+    names = ' -> '.join(node.name for node in cycle + cycle[:1])
+    report.error("cyclic base node types %s" % names, fatal=False, location=cycle[0].location)
+    for node in cycle[1:]:
+        report.note("%s derives from %s" % (node.name, node.base.name),
+                    fatal=node is cycle[-1], location=node.location)
+
+def order_node_types(spec):
+    """
+    Sets `spec.order` to the nodes with each one after its base, otherwise
+    in spec order, and `depth` on each node to the number of bases above
+    it. Each node is visited once by following base links up to a node
+    already ordered, so a cycle shows up as a node seen again on the way.
+    """
+    order = []
+    ordered = set()
+    for node in spec.nodes:
+        chain = []
+        on_chain = {}
+        while node is not None and id(node) not in ordered:
+            if not isinstance(node, Node):
+                report.error("base type %s of node type %s is not a node type" %
+                             (node.name, chain[-1].name), chain[-1].location)
+            if id(node) in on_chain:
+                report_base_cycle(chain[on_chain[id(node)]:])
+            on_chain[id(node)] = len(chain)
+            chain.append(node)
+            node = node.base
+        for node in reversed(chain):
+            node.depth = node.base.depth + 1 if node.base is not None else 0
+            ordered.add(id(node))
+            order.append(node)
+    spec.order = order
+
+def index_node_types(spec):
+    """
+    Builds the hierarchy index once the nodes are ordered: `derived` on
+    each node lists the nodes directly deriving from it (in spec order),
+    `spec.root_nodes` the nodes without a base and `spec.preorder` every
+    node depth first, so each node is followed by its descendants. The
+    `enter` and `exit` of a node delimit it and its descendants there.
+    """
+    roots = []
+    for node in spec.nodes:
+        node.derived = []
+    for node in spec.nodes:
+        if node.base is None:
+            roots.append(node)
+        else:
+            node.base.derived.append(node)
+    # bases come before derived nodes in spec.order, so sizes go bottom up
+    sizes = {}
+    for node in reversed(spec.order):
+        sizes[id(node)] = 1 + sum(sizes[id(d)] for d in node.derived)
+    preorder = []
+    todo = roots[::-1]
+    while todo:
+        node = todo.pop()
+        node.enter = len(preorder)
+        node.exit = node.enter + sizes[id(node)]
+        preorder.append(node)
+        todo.extend(reversed(node.derived))
+    spec.root_nodes = roots
+    spec.preorder = preorder
 
 def resolve_types(spec):
     types = {}
@@ -578,12 +564,14 @@ def resolve_types(spec):
     resolve_node_types(spec, types)
     resolve_root_spec(spec, types)
     resolve_list_types(spec, types)
+    order_node_types(spec)
+    index_node_types(spec)
     return types
 
 def p_spec_file(p):
     ''' spec_file : spec_file_item_list
     '''
-    p[0] = getattr(p.parser, "parents")[0]
+    p[0] = adopt(SpecFile(p.lexer.filename), p[1])
     for item in p[1]:
         if isinstance(item, Target):
             p[0].targets.append(item)
@@ -593,29 +581,209 @@ def p_spec_file(p):
             p[0].root = item
         elif isinstance(item, Node):
             p[0].nodes.append(item)
-    p[0].types = resolve_types(p[0])
+        elif isinstance(item, Import):
+            p[0].imports.append(item)
     return p
 
 def p_error(t):
+    if t is None:
+        # ran out of tokens, there's no token to point at
+        report.error('unexpected end of file',
+                     Location(_lexer.filename, _lexer.lineno, 1), show_context_line=False)
     location = Location(t.lexer.filename, t.lexer.lineno, find_column(t.lexer.lexdata, t))
     report.error('invalid syntax', location)
 
-def parse(file, filename, debug=True):
-    lexer = lex.lex(debug=True) if debug \
-                else lex.lex(debug=False, errorlog=lex.NullLogger())
-    if file is not None:
-        lexer.input(file.read())
-    else:
-        with open(filename, 'r') as f:
-            lexer.input(f.read())
+# Building the lexer and the parser tables is expensive, so they're built
+# once and reused by subsequent calls to parse().
+_parsers = {}
+
+def _get_parser(debug):
+    if debug not in _parsers:
+        lexer = lex.lex(debug=True) if debug \
+                    else lex.lex(debug=False, errorlog=lex.NullLogger())
+        parser = yacc.yacc(debug=True) if debug \
+                    else yacc.yacc(debug=False, errorlog=yacc.NullLogger())
+        _parsers[debug] = (lexer, parser)
+    return _parsers[debug]
+
+def build_parser(debug=True):
+    """
+    Build the lexer and the parser tables now instead of on the first call
+    to parse().
+    """
+    _get_parser(debug)
+
+# Modules (single spec files) parsed so far, by absolute filename, along
+# with the modification time and size of the file they were parsed from
+_modules = {}
+
+def file_stamp(filename):
+    """
+    The modification time and size of `filename`, a module is parsed again
+    when its file's stamp changes.
+    """
+    st = os.stat(filename)
+    return (st.st_mtime_ns, st.st_size)
+
+def clear_modules():
+    """
+    Forget the modules parsed so far, so they're parsed again.
+    """
+    _modules.clear()
+
+def _source_path(filename, cwd):
+    return filename if cwd is None else os.path.join(cwd, filename)
+
+def imported_files(spec, cwd=None):
+    """
+    The (absolute filename, stamp) of each file imported by `spec`, with
+    the stamps the files had when they were parsed.
+    """
+    files = []
+    for module in spec.modules[:-1]:
+        path = os.path.abspath(_source_path(module.filename, cwd))
+        files.append((path, _modules[path][0]))
+    return files
+
+# Files at least this big are lexed straight from a memory map rather than
+# being read into one string first
+STREAM_THRESHOLD = 8 << 20
+
+def _is_pipe(file):
+    try:
+        return not file.seekable()
+    except (AttributeError, ValueError):
+        return False
+
+# Lexer of the file being parsed, for p_error() at the end of the file
+_lexer = None
+
+def _run_parser(lexer, parser, filename):
+    global _lexer
     setattr(lexer, "filename", filename)
-    parser = yacc.yacc(debug=True) if debug \
-                else yacc.yacc(debug=False, errorlog=yacc.NullLogger())
-    parents = []
-    spec = SpecFile(filename)
-    spec.parent = None
-    parents.append(spec)
-    setattr(parser, "parents", parents)
-    spec = parser.parse(lexer=lexer, tracking=True)
+    _lexer = lexer
+    try:
+        return parser.parse(lexer=lexer, tracking=True)
+    finally:
+        _lexer = None
+        # don't keep the last input and parse stacks alive, diagnostics
+        # after parsing get the source text from the file itself
+        parser.statestack = parser.symstack = parser.token = None
+
+def _parse_text(text, filename, debug):
+    lexer, parser = _get_parser(debug)
+    lexer.input(text)
+    lexer.lineno = 1
+    try:
+        return _run_parser(lexer, parser, filename)
+    finally:
+        lexer.input('')
+
+def _parse_chunks(chunks, filename, debug):
+    lexer, parser = _get_parser(debug)
+    return _run_parser(StreamLexer(lexer, chunks, filename), parser, filename)
+
+def _file_digest(path, filename):
+    with open(path, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # empty file
+            return snapshot.source_digest(b'', filename)
+        with buf:
+            return snapshot.source_digest(buf, filename)
+
+def parse_module(file, filename, debug=True, cache=None, stream=None, cwd=None):
+    """
+    Parse a single spec file without following its imports or resolving
+    its types. Files (but not `file` objects) that haven't changed since
+    they were last parsed aren't parsed again. A relative `filename` is
+    opened from `cwd` when given, diagnostics still use `filename`.
+
+    Files are lexed from a memory map when `stream` is True, or when it's
+    None and the file is at least STREAM_THRESHOLD bytes. A `file` object
+    is lexed in chunks as it's read when `stream` is True, or when it's
+    None and the file is a pipe (or terminal), unless `cache` is given
+    since the snapshot's digest needs the whole text up front.
+    """
+    key = stamp = text = None
+    path = _source_path(filename, cwd)
+    if file is None:
+        key = os.path.abspath(path)
+        stamp = file_stamp(path)
+        entry = _modules.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        if stream is None:
+            stream = stamp[1] >= STREAM_THRESHOLD
+        if not stream:
+            with open(path, 'r') as f:
+                text = f.read()
+    else:
+        if stream is None:
+            stream = _is_pipe(file)
+        if not stream or cache is not None:
+            text = file.read()
+    module = None
+    if cache is not None:
+        if text is None:
+            digest = _file_digest(path, filename)
+        else:
+            digest = snapshot.source_digest(text, filename)
+        module = snapshot.read(cache, path, digest)
+    if module is None:
+        if text is None:
+            chunks = mmap_chunks(path) if file is None else file_chunks(file)
+            module = _parse_chunks(chunks, filename, debug)
+        else:
+            module = _parse_text(text, filename, debug)
+        text = None
+        if cache is not None:
+            snapshot.write(cache, path, digest, module)
+    if key is not None:
+        _modules[key] = (stamp, module)
+    return module
+
+def _load_modules(module, debug, cache, cwd, modules, seen):
+    # imported modules go before the modules importing them
+    for imp in module.imports:
+        filename = os.path.join(os.path.dirname(module.filename), imp.filename)
+        key = os.path.abspath(_source_path(filename, cwd))
+        if key in seen:
+            continue
+        seen.add(key)
+        try:
+            imported = parse_module(None, filename, debug, cache, cwd=cwd)
+        except OSError as e:
+            report.error("cannot import '%s': %s" % (imp.filename, e.strerror),
+                         imp.location)
+        _load_modules(imported, debug, cache, cwd, modules, seen)
+    modules.append(module)
+
+def parse(file, filename, debug=True, cache=None, stream=None, cwd=None):
+    """
+    Parse a spec file and the files it imports and resolve the types, read
+    from `file` if it's not None. When `cache` is a directory, snapshots of
+    the parsed files are kept there and used instead of parsing while the
+    source text stays the same. Relative filenames are taken from `cwd`
+    instead of the working directory when it's given.
+    """
+    main = parse_module(file, filename, debug, cache, stream, cwd)
+    modules = []
+    seen = set([os.path.abspath(_source_path(filename, cwd))])
+    _load_modules(main, debug, cache, cwd, modules, seen)
+    if len(modules) == 1:
+        spec = main
+    else:
+        spec = SpecFile(filename)
+        spec.parent = None
+        spec.imports = main.imports
+        for module in modules:
+            spec.children.extend(module.children)
+            spec.targets.extend(module.targets)
+            spec.visitors.extend(module.visitors)
+            spec.nodes.extend(module.nodes)
+            if module.root is not None:
+                spec.root = module.root
+    spec.modules = modules
+    spec.types = resolve_types(spec)
     return spec
-
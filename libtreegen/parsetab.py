@@ -0,0 +1,95 @@
+
+# parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'spec_fileABSTRACT BINLIT BOOL BOOLEAN CHRLIT COLON COMMA COMMENT DECLIT EQUAL EXTERN FALSE FLOAT FLOATLIT HEXLIT IDENT IMPORT INT INTEGER LBRACE LBRACKET LIST LPAREN NODE NULL OCTLIT RBRACE RBRACKET ROOT RPAREN SEMICOLON STRING STRLIT TARGET TRUE VISITOR WEAK expr_list : expr\n     expr_list : expr_list COMMA expr\n     expr : LBRACKET expr_list RBRACKET\n     expr : LBRACKET RBRACKET\n     expr : BOOLEAN\n     expr : INTEGER\n     expr : FLOAT\n     expr : CHRLIT\n     expr : STRLIT\n     expr : NULL\n     expr : IDENT LPAREN RPAREN\n     data_type : BOOL\n                  | FLOAT\n                  | INT\n                  | STRING\n     data_type : IDENT\n     option_list : IDENT COLON expr SEMICOLON\n     option_list : option_list IDENT COLON expr SEMICOLON\n     extern : EXTERN IDENT LBRACE option_list RBRACE\n     target_item_list : IDENT COLON expr SEMICOLON\n     target_item_list : extern\n     target_item_list : target_item_list IDENT COLON expr SEMICOLON\n     target_item_list : target_item_list extern\n     target : TARGET IDENT LBRACE target_item_list RBRACE\n     visitor : VISITOR IDENT LBRACE option_list RBRACE\n     visitor : VISITOR IDENT LBRACE RBRACE\n     root : ROOT IDENT SEMICOLON\n     field_specifier_list : WEAK\n                             | LIST\n     field_specifier_list : field_specifier_list WEAK\n                             | field_specifier_list LIST\n     field_type : field_specifier_list data_type\n     field_type : BOOL\n                   | FLOAT\n                   | INT\n                   | STRING\n     field_type : IDENT\n     field_decl_list : IDENT\n     field_decl_list : IDENT EQUAL expr\n     field_decl_list : field_decl_list COMMA IDENT\n     field_decl_list : field_decl_list COMMA IDENT EQUAL expr\n     arg_list : IDENT\n     arg_list : arg_list COMMA IDENT\n     node_item_list :\n     node_item_list : node_item_list field_type field_decl_list SEMICOLON\n     node_item_list : node_item_list IDENT LPAREN RPAREN SEMICOLON\n     node_item_list : node_item_list IDENT LPAREN arg_list RPAREN SEMICOLON\n     node_specifier_list : ABSTRACT\n     node_specifier_list : node_specifier_list ABSTRACT\n     node_type : node_specifier_list NODE\n     node_type : NODE\n     node : node_type IDENT LBRACE node_item_list RBRACE\n     node : node_type IDENT COLON IDENT LBRACE node_item_list RBRACE\n     import : IMPORT STRLIT SEMICOLON\n     spec_file_item_list : import\n                            | target\n                            | visitor\n                            | root\n                            | node\n     spec_file_item_list : spec_file_item_list import\n                            | spec_file_item_list target\n                            | spec_file_item_list visitor\n                            | spec_file_item_list root\n                            | spec_file_item_list node\n     spec_file : spec_file_item_list\n    '
+    
+_lr_action_items = {'IMPORT':([0,2,3,4,5,6,7,16,17,18,19,20,28,31,40,45,50,52,102,],[8,8,-55,-56,-57,-58,-59,-60,-61,-62,-63,-64,-54,-27,-26,-24,-25,-52,-53,]),'TARGET':([0,2,3,4,5,6,7,16,17,18,19,20,28,31,40,45,50,52,102,],[9,9,-55,-56,-57,-58,-59,-60,-61,-62,-63,-64,-54,-27,-26,-24,-25,-52,-53,]),'VISITOR':([0,2,3,4,5,6,7,16,17,18,19,20,28,31,40,45,50,52,102,],[10,10,-55,-56,-57,-58,-59,-60,-61,-62,-63,-64,-54,-27,-26,-24,-25,-52,-53,]),'ROOT':([0,2,3,4,5,6,7,16,17,18,19,20,28,31,40,45,50,52,102,],[11,11,-55,-56,-57,-58,-59,-60,-61,-62,-63,-64,-54,-27,-26,-24,-25,-52,-53,]),'NODE':([0,2,3,4,5,6,7,13,15,16,17,18,19,20,27,28,31,40,45,50,52,102,],[14,14,-55,-56,-57,-58,-59,26,-48,-60,-61,-62,-63,-64,-49,-54,-27,-26,-24,-25,-52,-53,]),'ABSTRACT':([0,2,3,4,5,6,7,13,15,16,17,18,19,20,27,28,31,40,45,50,52,102,],[15,15,-55,-56,-57,-58,-59,27,-48,-60,-61,-62,-63,-64,-49,-54,-27,-26,-24,-25,-52,-53,]),'$end':([1,2,3,4,5,6,7,16,17,18,19,20,28,31,40,45,50,52,102,],[0,-65,-55,-56,-57,-58,-59,-60,-61,-62,-63,-64,-54,-27,-26,-24,-25,-52,-53,]),'STRLIT':([8,43,48,64,71,74,101,105,117,],[21,69,69,69,69,69,69,69,69,]),'IDENT':([9,10,11,12,14,26,29,30,32,33,35,36,37,39,41,43,46,48,51,53,54,55,56,57,58,59,60,61,64,71,72,74,75,78,79,80,81,82,83,84,85,86,88,93,94,99,100,101,105,106,107,108,109,111,115,117,],[22,23,24,25,-51,-50,34,38,-44,42,44,-21,47,49,51,62,-23,62,-37,77,85,-33,-34,-35,-36,-28,-29,-44,62,62,38,62,96,-32,-30,-31,-12,-13,-14,-15,-16,51,-20,49,-17,-45,112,62,62,-22,-19,-18,-46,116,-47,62,]),'SEMICOLON':([21,24,63,65,66,67,68,69,70,73,76,77,90,92,95,97,103,104,110,112,113,118,],[28,31,88,-5,-6,-7,-8,-9,-10,94,99,-38,-4,106,108,109,-11,-3,115,-40,-39,-41,]),'LBRACE':([22,23,25,42,47,],[29,30,32,61,72,]),'COLON':([25,34,38,44,49,],[33,43,48,71,74,]),'EXTERN':([29,35,36,46,88,106,107,],[37,37,-21,-23,-20,-22,-19,]),'RBRACE':([30,32,35,36,39,41,46,61,86,88,93,94,99,106,107,108,109,115,],[40,-44,45,-21,50,52,-23,-44,102,-20,107,-17,-45,-22,-19,-18,-46,-47,]),'BOOL':([32,41,54,59,60,61,79,80,86,99,109,115,],[-44,55,81,-28,-29,-44,-30,-31,55,-45,-46,-47,]),'FLOAT':([32,41,43,48,54,59,60,61,64,71,74,79,80,86,99,101,105,109,115,117,],[-44,56,67,67,82,-28,-29,-44,67,67,67,-30,-31,56,-45,67,67,-46,-47,67,]),'INT':([32,41,54,59,60,61,79,80,86,99,109,115,],[-44,57,83,-28,-29,-44,-30,-31,57,-45,-46,-47,]),'STRING':([32,41,54,59,60,61,79,80,86,99,109,115,],[-44,58,84,-28,-29,-44,-30,-31,58,-45,-46,-47,]),'WEAK':([32,41,54,59,60,61,79,80,86,99,109,115,],[-44,59,79,-28,-29,-44,-30,-31,59,-45,-46,-47,]),'LIST':([32,41,54,59,60,61,79,80,86,99,109,115,],[-44,60,80,-28,-29,-44,-30,-31,60,-45,-46,-47,]),'LBRACKET':([43,48,64,71,74,101,105,117,],[64,64,64,64,64,64,64,64,]),'BOOLEAN':([43,48,64,71,74,101,105,117,],[65,65,65,65,65,65,65,65,]),'INTEGER':([43,48,64,71,74,101,105,117,],[66,66,66,66,66,66,66,66,]),'CHRLIT':([43,48,64,71,74,101,105,117,],[68,68,68,68,68,68,68,68,]),'NULL':([43,48,64,71,74,101,105,117,],[70,70,70,70,70,70,70,70,]),'LPAREN':([51,62,],[75,87,]),'RBRACKET':([64,65,66,67,68,69,70,89,90,91,103,104,114,],[90,-5,-6,-7,-8,-9,-10,104,-4,-1,-11,-3,-2,]),'COMMA':([65,66,67,68,69,70,76,77,89,90,91,96,98,103,104,112,113,114,116,118,],[-5,-6,-7,-8,-9,-10,100,-38,105,-4,-1,-42,111,-11,-3,-40,-39,-2,-43,-41,]),'RPAREN':([75,87,96,98,116,],[97,103,-42,110,-43,]),'EQUAL':([77,112,],[101,117,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'spec_file':([0,],[1,]),'spec_file_item_list':([0,],[2,]),'import':([0,2,],[3,16,]),'target':([0,2,],[4,17,]),'visitor':([0,2,],[5,18,]),'root':([0,2,],[6,19,]),'node':([0,2,],[7,20,]),'node_type':([0,2,],[12,12,]),'node_specifier_list':([0,2,],[13,13,]),'target_item_list':([29,],[35,]),'extern':([29,35,],[36,46,]),'option_list':([30,72,],[39,93,]),'node_item_list':([32,61,],[41,86,]),'field_type':([41,86,],[53,53,]),'field_specifier_list':([41,86,],[54,54,]),'expr':([43,48,64,71,74,101,105,117,],[63,73,91,92,95,113,114,118,]),'field_decl_list':([53,],[76,]),'data_type':([54,],[78,]),'expr_list':([64,],[89,]),'arg_list':([75,],[98,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> spec_file","S'",1,None,None,None),
+  ('expr_list -> expr','expr_list',1,'p_expr_list_first','parser.py',25),
+  ('expr_list -> expr_list COMMA expr','expr_list',3,'p_expr_list_rest','parser.py',31),
+  ('expr -> LBRACKET expr_list RBRACKET','expr',3,'p_expr_list_literal','parser.py',38),
+  ('expr -> LBRACKET RBRACKET','expr',2,'p_expr_list_literal_empty','parser.py',45),
+  ('expr -> BOOLEAN','expr',1,'p_expr_bool','parser.py',52),
+  ('expr -> INTEGER','expr',1,'p_expr_int','parser.py',59),
+  ('expr -> FLOAT','expr',1,'p_expr_float','parser.py',66),
+  ('expr -> CHRLIT','expr',1,'p_expr_chr','parser.py',73),
+  ('expr -> STRLIT','expr',1,'p_expr_str','parser.py',80),
+  ('expr -> NULL','expr',1,'p_expr_null','parser.py',87),
+  ('expr -> IDENT LPAREN RPAREN','expr',3,'p_expr_call','parser.py',94),
+  ('data_type -> BOOL','data_type',1,'p_data_type_prim','parser.py',101),
+  ('data_type -> FLOAT','data_type',1,'p_data_type_prim','parser.py',102),
+  ('data_type -> INT','data_type',1,'p_data_type_prim','parser.py',103),
+  ('data_type -> STRING','data_type',1,'p_data_type_prim','parser.py',104),
+  ('data_type -> IDENT','data_type',1,'p_data_type_unresolved','parser.py',111),
+  ('option_list -> IDENT COLON expr SEMICOLON','option_list',4,'p_option_list_first','parser.py',125),
+  ('option_list -> option_list IDENT COLON expr SEMICOLON','option_list',5,'p_option_list_rest','parser.py',131),
+  ('extern -> EXTERN IDENT LBRACE option_list RBRACE','extern',5,'p_extern','parser.py',138),
+  ('target_item_list -> IDENT COLON expr SEMICOLON','target_item_list',4,'p_target_item_list_option','parser.py',145),
+  ('target_item_list -> extern','target_item_list',1,'p_target_item_list_extern','parser.py',151),
+  ('target_item_list -> target_item_list IDENT COLON expr SEMICOLON','target_item_list',5,'p_target_item_list_rest_option','parser.py',157),
+  ('target_item_list -> target_item_list extern','target_item_list',2,'p_target_item_list_rest_extern','parser.py',164),
+  ('target -> TARGET IDENT LBRACE target_item_list RBRACE','target',5,'p_target','parser.py',171),
+  ('visitor -> VISITOR IDENT LBRACE option_list RBRACE','visitor',5,'p_visitor','parser.py',183),
+  ('visitor -> VISITOR IDENT LBRACE RBRACE','visitor',4,'p_visitor_empty','parser.py',190),
+  ('root -> ROOT IDENT SEMICOLON','root',3,'p_root','parser.py',197),
+  ('field_specifier_list -> WEAK','field_specifier_list',1,'p_field_specifier_list_first','parser.py',206),
+  ('field_specifier_list -> LIST','field_specifier_list',1,'p_field_specifier_list_first','parser.py',207),
+  ('field_specifier_list -> field_specifier_list WEAK','field_specifier_list',2,'p_field_specifier_list_rest','parser.py',213),
+  ('field_specifier_list -> field_specifier_list LIST','field_specifier_list',2,'p_field_specifier_list_rest','parser.py',214),
+  ('field_type -> field_specifier_list data_type','field_type',2,'p_field_type','parser.py',221),
+  ('field_type -> BOOL','field_type',1,'p_field_type_prim','parser.py',235),
+  ('field_type -> FLOAT','field_type',1,'p_field_type_prim','parser.py',236),
+  ('field_type -> INT','field_type',1,'p_field_type_prim','parser.py',237),
+  ('field_type -> STRING','field_type',1,'p_field_type_prim','parser.py',238),
+  ('field_type -> IDENT','field_type',1,'p_field_type_unresolved','parser.py',249),
+  ('field_decl_list -> IDENT','field_decl_list',1,'p_field_decl_list_first','parser.py',271),
+  ('field_decl_list -> IDENT EQUAL expr','field_decl_list',3,'p_field_decl_list_first_init','parser.py',277),
+  ('field_decl_list -> field_decl_list COMMA IDENT','field_decl_list',3,'p_field_decl_list_rest','parser.py',283),
+  ('field_decl_list -> field_decl_list COMMA IDENT EQUAL expr','field_decl_list',5,'p_field_decl_list_rest_init','parser.py',290),
+  ('arg_list -> IDENT','arg_list',1,'p_arg_list_first','parser.py',297),
+  ('arg_list -> arg_list COMMA IDENT','arg_list',3,'p_arg_list_rest','parser.py',303),
+  ('node_item_list -> <empty>','node_item_list',0,'p_node_item_list_empty','parser.py',310),
+  ('node_item_list -> node_item_list field_type field_decl_list SEMICOLON','node_item_list',4,'p_node_item_list_fields','parser.py',316),
+  ('node_item_list -> node_item_list IDENT LPAREN RPAREN SEMICOLON','node_item_list',5,'p_node_item_list_ctor','parser.py',332),
+  ('node_item_list -> node_item_list IDENT LPAREN arg_list RPAREN SEMICOLON','node_item_list',6,'p_node_item_list_ctor_args','parser.py',341),
+  ('node_specifier_list -> ABSTRACT','node_specifier_list',1,'p_node_specifier_list_first','parser.py',350),
+  ('node_specifier_list -> node_specifier_list ABSTRACT','node_specifier_list',2,'p_node_specifier_list_rest','parser.py',356),
+  ('node_type -> node_specifier_list NODE','node_type',2,'p_node_type','parser.py',363),
+  ('node_type -> NODE','node_type',1,'p_node_type_no_spec','parser.py',369),
+  ('node -> node_type IDENT LBRACE node_item_list RBRACE','node',5,'p_node','parser.py',389),
+  ('node -> node_type IDENT COLON IDENT LBRACE node_item_list RBRACE','node',7,'p_node_with_base','parser.py',395),
+  ('import -> IMPORT STRLIT SEMICOLON','import',3,'p_import','parser.py',403),
+  ('spec_file_item_list -> import','spec_file_item_list',1,'p_spec_file_item_list_first','parser.py',410),
+  ('spec_file_item_list -> target','spec_file_item_list',1,'p_spec_file_item_list_first','parser.py',411),
+  ('spec_file_item_list -> visitor','spec_file_item_list',1,'p_spec_file_item_list_first','parser.py',412),
+  ('spec_file_item_list -> root','spec_file_item_list',1,'p_spec_file_item_list_first','parser.py',413),
+  ('spec_file_item_list -> node','spec_file_item_list',1,'p_spec_file_item_list_first','parser.py',414),
+  ('spec_file_item_list -> spec_file_item_list import','spec_file_item_list',2,'p_spec_file_item_list_rest','parser.py',420),
+  ('spec_file_item_list -> spec_file_item_list target','spec_file_item_list',2,'p_spec_file_item_list_rest','parser.py',421),
+  ('spec_file_item_list -> spec_file_item_list visitor','spec_file_item_list',2,'p_spec_file_item_list_rest','parser.py',422),
+  ('spec_file_item_list -> spec_file_item_list root','spec_file_item_list',2,'p_spec_file_item_list_rest','parser.py',423),
+  ('spec_file_item_list -> spec_file_item_list node','spec_file_item_list',2,'p_spec_file_item_list_rest','parser.py',424),
+  ('spec_file -> spec_file_item_list','spec_file',1,'p_spec_file','parser.py',503),
+]
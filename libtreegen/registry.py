@@ -0,0 +1,89 @@
+"""
+Registry of the available codegen targets.
+
+The built-in targets are listed by "module:Class" name and other packages
+can provide targets through the `treegen.targets` entry point group, ex.
+in their setup.py:
+
+    entry_points={
+        "treegen.targets": [
+            "MyLang = mypackage.mytarget:MyLangTarget",
+        ],
+    }
+
+Target modules are only imported when the target is looked up, and the
+entry points are only scanned if a target isn't found in the registry.
+"""
+
+import importlib
+
+ENTRY_POINT_GROUP = "treegen.targets"
+
+def _load_class(ref):
+    module, _, name = ref.partition(':')
+    return getattr(importlib.import_module(module, __package__), name)
+
+class TargetRegistry(object):
+    """
+    Maps target names to target classes.
+    """
+    def __init__(self, builtins=None):
+        # values are target classes, "module:Class" strings or EntryPoints
+        self._targets = {} if builtins is None else dict(builtins)
+        self._discovered = False
+
+    def register(self, name, target):
+        """
+        Add a target, `target` is either a class or a "module:Class" string
+        to import when the target is first used.
+        """
+        self._targets[name] = target
+
+    def discover(self):
+        """
+        Add the targets advertised by installed packages' entry points,
+        targets already in the registry take precedence.
+        """
+        if self._discovered:
+            return
+        self._discovered = True
+        try:
+            from importlib.metadata import entry_points
+        except ImportError:
+            return
+        eps = entry_points()
+        if hasattr(eps, "select"):
+            eps = eps.select(group=ENTRY_POINT_GROUP)
+        else:
+            eps = eps.get(ENTRY_POINT_GROUP, [])
+        for ep in eps:
+            self._targets.setdefault(ep.name, ep)
+
+    def __contains__(self, name):
+        if name not in self._targets:
+            self.discover()
+        return name in self._targets
+
+    def __getitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        target = self._targets[name]
+        if isinstance(target, str):
+            target = _load_class(target)
+            self._targets[name] = target
+        elif not isinstance(target, type):
+            target = target.load() # entry point
+            self._targets[name] = target
+        return target
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def names(self):
+        self.discover()
+        return sorted(self._targets)
+
+# Built-in codegen targets, update when adding new targets
+targets = TargetRegistry({
+    "CPlusPlus": ".cplusplus:CPlusPlusTarget",
+})
@@ -1,11 +1,12 @@
 import os
 import sys
 
-__all__ = [ "set_error_stream", "error", "warning", "note" ]
+__all__ = [ "set_error_stream", "set_source_dir", "error", "warning", "note" ]
 
 error_stream  = sys.stderr
 terminal_out  = error_stream.isatty() if hasattr(error_stream, "isatty") else False
 show_context  = True
+source_dir    = None
 
 BLACK   = '\x1B[30m'
 RED     = '\x1B[31m'
@@ -39,13 +40,29 @@ def set_error_stream(stream=sys.stderr, use_colors=True, show_context_text=True)
     show_context = show_context_text
     return old_error_stream
 
+def set_source_dir(path):
+    """
+    Read the context lines of relative filenames from `path` instead of the
+    working directory (None), returns the previous directory.
+    """
+    global source_dir
+    old_source_dir = source_dir
+    source_dir = path
+    return old_source_dir
+
 def _get_context(filename, line, column):
     line_text = ''
-    with open(filename, 'r') as file:
-        for num, text in enumerate(file, 1):
-            if num == line:
-                line_text = text.rstrip()
-                break
+    if source_dir is not None:
+        filename = os.path.join(source_dir, filename)
+    try:
+        with open(filename, 'r') as file:
+            for num, text in enumerate(file, 1):
+                if num == line:
+                    line_text = text.rstrip()
+                    break
+    except OSError:
+        # spec didn't come from a file (ex. stdin or a server request)
+        return ''
     if line_text:
         line_text = '\t' + line_text + '\n\t'
         for i in range(column-2): # WTF!? why 2? should be 1 at most
@@ -64,7 +81,7 @@ def _log_msg(stream, prefix, message, loc, fatal, show_context_line=True):
         if terminal_out:
             stream.write(BOLD + location_str + RESET + ': ')
         else:
-            stream.write(location_str + ': ' % location)
+            stream.write(location_str + ': ')
     stream.write(message + '\n')
     if loc and show_context and show_context_line:
         context = _get_context(*loc)
@@ -0,0 +1,223 @@
+"""
+Code generation server, lets build tools avoid paying the interpreter
+startup and parser construction costs on every invocation.
+
+The protocol is one JSON object per line in each direction over a Unix
+domain socket. A request looks like:
+
+    { "spec": "/abs/path/to/spec.ast",   // or "text": "<spec source>"
+      "filename": "spec.ast",            // name used in diagnostics
+      "cwd": "/abs/path",                // where relative names are from
+      "target": "CPlusPlus",             // optional, first in spec otherwise
+      "output": "out.h",                 // name used for header guards, etc
+      "indent": "    " }
+
+And the response is either:
+
+    { "ok": true, "code": "<generated code>", "errors": "<warnings>" }
+    { "ok": false, "errors": "<diagnostics>" }
+
+Several requests can be sent over the same connection.
+"""
+
+import collections
+import hashlib
+import io
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from . import report
+from .parser import parse, build_parser, file_stamp, imported_files
+from .codegen import codegen
+
+class ServerError(Exception):
+    pass
+
+class CodegenServer(object):
+    """
+    Serves code generation requests using a pool of worker threads.
+
+    The parser and the targets aren't thread-safe so the actual generation
+    is serialized, but reading requests, hashing specs and serving results
+    from the cache of recent outputs happen concurrently. Cached outputs
+    are only served while the files the spec imports keep the same
+    modification times and sizes.
+    """
+    def __init__(self, path, workers=4, cache_size=64, log=sys.stderr):
+        self.path = path
+        self.workers = workers
+        self.cache_size = cache_size
+        self.log = log
+        self.cache = collections.OrderedDict()
+        self.cache_lock = threading.Lock()
+        self.gen_lock = threading.Lock()
+        self.sock = None
+
+    def _cache_get(self, key):
+        with self.cache_lock:
+            entry = self.cache.get(key)
+            if entry is None:
+                return None
+            self.cache.move_to_end(key)
+        result, imports = entry
+        try:
+            for filename, stamp in imports:
+                if file_stamp(filename) != stamp:
+                    return None
+        except OSError:
+            return None
+        return result
+
+    def _cache_put(self, key, result, imports):
+        with self.cache_lock:
+            self.cache[key] = (result, imports)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def _generate(self, text, filename, cwd, target, output, indent):
+        """
+        Returns the response and the (path, stamp) of every file the spec
+        imports, taken before they're parsed. Imports are found relative
+        to `filename` in the client's working directory `cwd`.
+        """
+        errors = io.StringIO()
+        with self.gen_lock:
+            old_stream = report.set_error_stream(errors, use_colors=False)
+            old_dir = report.set_source_dir(cwd)
+            try:
+                spec = parse(io.StringIO(text), filename, debug=False, cwd=cwd)
+                # the spec itself is keyed by its text
+                imports = imported_files(spec, cwd)
+                if target is None:
+                    if len(spec.targets) == 0:
+                        report.error("no code generation target specified " +
+                                     "and no target in spec file")
+                    target = spec.targets[0].name
+                code = codegen(spec, target, None, output, indent)
+            except SystemExit:
+                return { "ok": False, "errors": errors.getvalue() }, None
+            except OSError as e:
+                return { "ok": False, "errors": "error: %s\n" % e }, None
+            except Exception as e:
+                # a bug rather than a bad spec, report it instead of dropping
+                # the connection
+                self.log.write("error: generating '%s' failed: %r\n" % (filename, e))
+                self.log.flush()
+                return { "ok": False, "errors": errors.getvalue() +
+                         "error: internal error: %r\n" % e }, None
+            finally:
+                report.set_source_dir(old_dir)
+                report.set_error_stream(old_stream)
+        return { "ok": True, "code": code, "errors": errors.getvalue() }, tuple(imports)
+
+    def handle_request(self, request):
+        cwd = request.get("cwd")
+        if "text" in request:
+            text = request["text"]
+            filename = request.get("filename", "<request>")
+        elif "spec" in request:
+            filename = request["spec"]
+            if cwd is not None:
+                filename = os.path.join(cwd, filename)
+            try:
+                with open(filename, 'r') as f:
+                    text = f.read()
+            except OSError as e:
+                return { "ok": False, "errors": "error: %s\n" % e }
+            filename = request.get("filename", filename)
+        else:
+            return { "ok": False, "errors": "error: request has no spec\n" }
+        target = request.get("target")
+        output = request.get("output", "<stdout>")
+        indent = request.get("indent", "    ")
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        key = (digest, filename, cwd, target, output, indent)
+        result = self._cache_get(key)
+        if result is None:
+            result, imports = self._generate(text, filename, cwd, target, output, indent)
+            if result["ok"]:
+                self._cache_put(key, result, imports)
+        return result
+
+    def handle_connection(self, conn):
+        with conn, conn.makefile('rwb') as stream:
+            for line in stream:
+                try:
+                    request = json.loads(line.decode('utf-8'))
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be an object")
+                    response = self.handle_request(request)
+                except ValueError as e:
+                    response = { "ok": False, "errors": "error: bad request: %s\n" % e }
+                except Exception as e:
+                    # keep serving the connection's other requests
+                    self.log.write("error: request failed: %r\n" % e)
+                    self.log.flush()
+                    response = { "ok": False, "errors": "error: internal error: %r\n" % e }
+                stream.write(json.dumps(response).encode('utf-8') + b'\n')
+                stream.flush()
+
+    def bind(self):
+        if os.path.exists(self.path):
+            # only remove stale sockets, not a server that's still running
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                    s.connect(self.path)
+                raise ServerError("server already running on '%s'" % self.path)
+            except ConnectionRefusedError:
+                os.unlink(self.path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(self.path)
+        self.sock.listen(128)
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def serve_forever(self):
+        if self.sock is None:
+            self.bind()
+        # build the parser tables before the first request comes in
+        build_parser(False)
+        self.log.write("status: serving on '%s'\n" % self.path)
+        self.log.flush()
+        # exit cleanly (removing the socket) when killed
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while True:
+                conn, addr = self.sock.accept()
+                pool.submit(self.handle_connection, conn)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+            pool.shutdown(wait=False)
+        return 0
+
+def request(path, request, timeout=None):
+    """
+    Send a single request to the server listening on `path`, raises
+    OSError if no server is running.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(path)
+        with s.makefile('rwb') as stream:
+            stream.write(json.dumps(request).encode('utf-8') + b'\n')
+            stream.flush()
+            s.shutdown(socket.SHUT_WR)
+            line = stream.readline()
+    if not line:
+        raise ConnectionError("server closed the connection")
+    return json.loads(line.decode('utf-8'))
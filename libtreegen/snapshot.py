@@ -0,0 +1,231 @@
+"""
+Binary snapshots of parsed spec files.
+
+A snapshot stores the whole object graph reachable from a SpecFile (the
+nodes, their fields, types, base links and locations) so that it can be
+loaded again without lexing or parsing. The graph is flattened into tables
+of plain values, serialized with the `marshal` module, which loads much
+faster than re-running the parser, and compressed with zlib's fastest
+level, which makes the snapshot a fraction of the spec's size for a few
+percent of the loading time. Each spec file (module) gets its own
+snapshot; the modules are resolved together after loading.
+
+Snapshots are only used when the digest of the spec's source text (and
+filename, which ends up in the locations) matches the one stored in it.
+"""
+
+import contextlib
+import gc
+import hashlib
+import marshal
+import os
+import zlib
+from . import nodes
+
+MAGIC = b'TGSNAP'
+
+# Bump whenever the node classes or the parser change what's produced
+FORMAT_VERSION = 6
+
+class SnapshotError(Exception):
+    pass
+
+def source_digest(source, filename):
+    """
+    Digest of the spec's source, either its text or its raw bytes.
+    """
+    digest = hashlib.sha1()
+    digest.update(('%d\0%s\0' % (FORMAT_VERSION, filename)).encode('utf-8'))
+    digest.update(source.encode('utf-8') if isinstance(source, str) else source)
+    return digest.hexdigest()
+
+def dumps(spec, digest):
+    """
+    Serialize the object graph of `spec` into a bytes object.
+    """
+    index = { id(spec): 0 }
+    objects = [ spec ]
+    classes = {}
+    shapes = {}
+    files = {}
+    records = []
+
+    def encode(value):
+        if isinstance(value, nodes.BaseNode):
+            num = index.get(id(value))
+            if num is None:
+                num = index[id(value)] = len(objects)
+                objects.append(value)
+            return (num,)
+        elif isinstance(value, nodes.Location):
+            return (files.setdefault(value.file, len(files)), value.line, value.column)
+        elif type(value) is list:
+            return [encode(v) for v in value]
+        elif type(value) is dict:
+            return dict((k, encode(v)) for k, v in value.items())
+        elif value is None or type(value) in (bool, int, float, str):
+            return value
+        raise SnapshotError("can't snapshot a '%s' value" % type(value).__name__)
+
+    # Each attribute value is stored by kind so loading can mostly avoid
+    # the generic (and slow) decode(): 'p'lain value, 'r'eference to an
+    # object, 'R' list of references, 'l'ocation or 'o'ther (generic).
+    def encode_attr(value):
+        if isinstance(value, nodes.BaseNode):
+            return 'r', encode(value)[0]
+        elif isinstance(value, nodes.Location):
+            return 'l', encode(value)
+        elif type(value) is list and all(isinstance(v, nodes.BaseNode) for v in value):
+            return 'R', [encode(v)[0] for v in value]
+        elif value is None or type(value) in (bool, int, float, str):
+            return 'p', value
+        return 'o', encode(value)
+
+    # an object's parent isn't stored when the object is in the children of
+    # the parent and was found after it, it's set again from the children
+    # lists when loading
+    owners = {}
+
+    # objects are appended to as they're found, so this walks the whole graph
+    num = 0
+    while num < len(objects):
+        obj = objects[num]
+        num += 1
+        attrs = obj.__dict__
+        keys = tuple(attrs)
+        values = attrs.values()
+        parent = attrs.get('parent')
+        if parent is not None and parent is owners.get(id(obj)):
+            keys = tuple(key for key in keys if key != 'parent')
+            values = [attrs[key] for key in keys]
+        for child in attrs.get('children', ()):
+            owners.setdefault(id(child), obj)
+        kinds, values = zip(*map(encode_attr, values)) if keys else ((), ())
+        cls = classes.setdefault(obj.__class__.__name__, len(classes))
+        shape = shapes.setdefault((keys, ''.join(kinds)), len(shapes))
+        records.append((cls, shape, list(values)))
+
+    tables = (digest,
+              sorted(files, key=files.get),
+              sorted(classes, key=classes.get),
+              sorted(shapes, key=shapes.get),
+              records)
+    return MAGIC + FORMAT_VERSION.to_bytes(4, 'little') + \
+        zlib.compress(marshal.dumps(tables), 1)
+
+@contextlib.contextmanager
+def no_gc():
+    """
+    Pause the garbage collector while building a large graph of objects
+    that all stay alive, where collecting would only keep traversing it.
+    """
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+def loads(data, digest):
+    """
+    Rebuild a SpecFile from `data`, returns None if the snapshot is for
+    another source, another format version or is otherwise unusable.
+    """
+    header = len(MAGIC) + 4
+    if data[:len(MAGIC)] != MAGIC or \
+            int.from_bytes(data[len(MAGIC):header], 'little') != FORMAT_VERSION:
+        return None
+    with no_gc():
+        try:
+            tables = marshal.loads(zlib.decompress(data[header:]))
+            snap_digest, files, class_names, shapes, records = tables
+        except (EOFError, ValueError, TypeError, zlib.error):
+            return None
+        if snap_digest != digest:
+            return None
+        classes = []
+        for name in class_names:
+            cls = getattr(nodes, name, None)
+            if not isinstance(cls, type) or not issubclass(cls, nodes.BaseNode):
+                return None
+            classes.append(cls)
+        return _build(files, classes, shapes, records)
+
+def _build(files, classes, shapes, records):
+    objects = [classes[cls].__new__(classes[cls]) for cls, shape, values in records]
+    Location = nodes.Location
+
+    def decode(value):
+        tp = type(value)
+        if tp is tuple:
+            if len(value) == 1:
+                return objects[value[0]]
+            return Location(files[value[0]], value[1], value[2])
+        elif tp is list:
+            return [decode(v) for v in value]
+        elif tp is dict:
+            return dict((k, decode(v)) for k, v in value.items())
+        return value
+
+    make_location = tuple.__new__
+    for obj, (cls, shape, values) in zip(objects, records):
+        keys, kinds = shapes[shape]
+        attrs = obj.__dict__
+        for key, kind, value in zip(keys, kinds, values):
+            if kind == 'p':
+                attrs[key] = value
+            elif kind == 'r':
+                attrs[key] = objects[value]
+            elif kind == 'R':
+                attrs[key] = [objects[v] for v in value]
+            elif kind == 'l':
+                attrs[key] = make_location(Location, (files[value[0]], value[1], value[2]))
+            else:
+                attrs[key] = decode(value)
+    for obj in objects:
+        for child in obj.__dict__.get('children', ()):
+            if 'parent' not in child.__dict__:
+                child.parent = obj
+    return objects[0]
+
+def cache_path(cache_dir, filename):
+    name = hashlib.sha1(os.path.abspath(filename).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, name + '.tgsnap')
+
+def read(cache_dir, filename, digest):
+    """
+    Load the cached snapshot for `filename`, or None if there's no usable
+    one.
+    """
+    try:
+        with open(cache_path(cache_dir, filename), 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    return loads(data, digest)
+
+def write(cache_dir, filename, digest, spec):
+    """
+    Store a snapshot of `spec` in the cache, failures are ignored since the
+    cache is only an optimization.
+    """
+    try:
+        with no_gc():
+            data = dumps(spec, digest)
+    except SnapshotError:
+        return False
+    path = cache_path(cache_dir, filename)
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return False
+    return True
@@ -1,16 +1,40 @@
+import keyword
 from collections import namedtuple
+from . import nodes
 from . import report
 
 OptionInfoT = namedtuple('OptionInfo', "type default required")
 def OptionInfo(type, default, required=False):
     return OptionInfoT(type, default, required)
 
+def plain_value(value):
+    " Python value of an option's literal, lists become tuples. "
+    if isinstance(value, nodes.ListLiteral):
+        return tuple(plain_value(v) for v in value.value)
+    elif isinstance(value, nodes.Literal):
+        return value.value
+    return value
+
 class CodegenTarget(object):
     """
     Base class for codegen targets (ex. CPlusPlusTarget).
     """
 
-    def __init__(self, opts=None, externs=None):
+    # Number of processes the target may use to render the code, set by
+    # codegen(), targets which don't render in parallel ignore it
+    render_jobs = 1
+
+    # Code rendered for each node by earlier runs, reused for the nodes
+    # which haven't changed, set by codegen() in watch mode, targets which
+    # don't cache their code ignore it
+    render_cache = None
+
+    # File to write the code to as it's rendered instead of returning it,
+    # set by codegen() for outputs that aren't compared with what's there,
+    # targets which don't stream their code ignore it
+    out_stream = None
+
+    def __init__(self, opts=None, externs=None, visitors=None):
 
         if not hasattr(self.__class__, "name"):
             raise ValueError("The codegen target class does not contain a 'name' variable")
@@ -23,6 +47,7 @@ class CodegenTarget(object):
             self.opts = dict((o.name, o.value) for o in opts)
         else:
             self.opts = {}
+        self.given_opts = set(self.opts)
         self._validate_opts()
 
         if externs is not None:
@@ -38,6 +63,19 @@ class CodegenTarget(object):
             self.externs = {}
         self._validate_externs()
 
+        if visitors is not None:
+            if not hasattr(self.__class__, "visitor_options"):
+                raise ValueError("The codegen target %s class " % self.name +
+                                 "does not contain a 'visitor_options' " +
+                                 "variable")
+            self.visitors = {}
+            for visitor in visitors:
+                self._dupe_check_visitor_options(visitor.options, visitor.name)
+                self.visitors[visitor.name] = dict((o.name, o.value) for o in visitor.options)
+        else:
+            self.visitors = {}
+        self._validate_visitors()
+
     def _dupe_check_options(self, options):
         optset = set()
         for opt in options:
@@ -55,6 +93,14 @@ class CodegenTarget(object):
                              opt.location)
             optset.add(opt.name)
 
+    def _dupe_check_visitor_options(self, options, name):
+        optset = set()
+        for opt in options:
+            if opt.name in optset:
+                report.error("duplicate option '%s' in visitor '%s'" % (opt.name, name),
+                             opt.location)
+            optset.add(opt.name)
+
     def _validate_opts(self):
         # First validate the existence and types of the options supplied
         for name, value in self.opts.items():
@@ -78,6 +124,24 @@ class CodegenTarget(object):
                     self.opts[name] = list(info.default)
                 else:
                     self.opts[name] = info.default
+        self.config = self._compile_opts()
+
+    def _compile_opts(self):
+        """
+        Snapshot of the validated options as plain Python values, read as
+        attributes (ex. `self.config.use_line_directives`) by targets.
+        """
+        cls = self.__class__
+        names = tuple(sorted(self.options))
+        config_type = cls.__dict__.get("_config_type")
+        if config_type is None or config_type._fields != names:
+            for name in names:
+                if not name.isidentifier() or keyword.iskeyword(name) or name.startswith('_'):
+                    raise ValueError("The codegen target %s option name " % self.name +
+                                     "'%s' can't be used as an attribute name" % name)
+            config_type = namedtuple(cls.__name__ + "Config", names)
+            cls._config_type = config_type
+        return config_type(*(plain_value(self.opts[name]) for name in names))
 
     def _validate_externs(self):
         # First validate the existence and types of the options supplied to each extern
@@ -104,10 +168,42 @@ class CodegenTarget(object):
                                      "extern type '%s'" % type_name)
                     options[name] = info.default
 
+    def _validate_visitors(self):
+        # First validate the existence and types of the options supplied to each visitor
+        for visitor_name, options in self.visitors.items():
+            for name, value in options.items():
+                if not name in self.visitor_options:
+                    report.error("unexpected option '%s' in visitor " % name +
+                                 "'%s' for codegen target '%s'" % (visitor_name, self.name),
+                                 options[name].location)
+                elif not isinstance(value, self.visitor_options[name].type):
+                    report.error("wrong data type for option '%s' of visitor " % name +
+                                 "'%s', expected a '%s' but a '%s' was used" % (
+                                    visitor_name,
+                                    self.visitor_options[name].type.__name__,
+                                    value.__class__.__name__),
+                                 options[name].location)
+        # Then fill in the default values for each visitor where one wasn't specified
+        for visitor_name, options in self.visitors.items():
+            for name, info in self.visitor_options.items():
+                if name not in options:
+                    if info.required:
+                        report.error("required option '%s' was " % name +
+                                     "missing for visitor '%s'" % visitor_name)
+                    options[name] = info.default
+
     def get_opt(self, name, default=None):
         return self.opts.get(name, default)
 
+    def has_opt(self, name):
+        " Whether the option was given in the spec file rather than defaulted. "
+        return name in self.given_opts
+
     def get_ext_opt(self, type, name, default=None):
         options = self.externs.get(type, {})
         return options.get(name, default)
 
+    def get_visitor_opt(self, visitor, name, default=None):
+        options = self.visitors.get(visitor, {})
+        return options.get(name, default)
+
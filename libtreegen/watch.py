@@ -0,0 +1,131 @@
+"""
+Watch mode, keeps the parsed spec and the generated code in memory and
+regenerates the output whenever one of the spec files changes.
+"""
+
+import os
+import sys
+import time
+from .parser import parse
+from .codegen import codegen
+from .snapshot import no_gc
+
+def _stamp(fn):
+    try:
+        st = os.stat(fn)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _read_file(fn):
+    try:
+        with open(fn, 'r') as f:
+            return f.read()
+    except OSError:
+        return None
+
+class Watcher(object):
+    """
+    Polls the spec file(s) every `interval` seconds and, when changed,
+    reparses and regenerates the code. The code of the nodes which didn't
+    change is kept from the last run rather than rendered again (see
+    CodegenTarget.render_cache), but the changed spec files are parsed
+    again in full. The output file is only re-written when the generated
+    code actually differs from what's already there.
+    """
+    def __init__(self, filename, out_filename, target=None, indent='  ',
+                 debug=False, interval=0.05, log=sys.stderr):
+        self.filename = filename
+        self.out_filename = out_filename
+        self.target = target
+        self.indent = indent
+        self.debug = debug
+        self.interval = interval
+        self.log = log
+        self.spec = None
+        self.content = _read_file(out_filename)
+        self.stamps = {}
+        self.sources = {}
+        self.render_cache = {}
+
+    def spec_files(self):
+        if self.spec is None:
+            return [self.filename]
+        return [module.filename for module in self.spec.modules]
+
+    def changed_files(self):
+        """
+        Files whose stamp changed and whose contents actually differ,
+        editors often re-save or touch files without changing them.
+        """
+        changed = []
+        for fn, stamp in self.stamps.items():
+            new_stamp = _stamp(fn)
+            if new_stamp == stamp:
+                continue
+            self.stamps[fn] = new_stamp
+            if _read_file(fn) != self.sources.get(fn):
+                changed.append(fn)
+        return changed
+
+    def regenerate(self):
+        """
+        Reparse and regenerate, returns True if the output file was
+        written or False if it was unchanged or there was an error.
+        """
+        start = time.perf_counter()
+        # take the stamps before parsing so that edits made while
+        # generating are picked up on the next poll
+        self.stamps = {fn: _stamp(fn) for fn in self.spec_files()}
+        self.sources = {fn: _read_file(fn) for fn in self.spec_files()}
+        # what's allocated while generating mostly stays alive until the
+        # next change
+        try:
+            with no_gc():
+                spec = parse(None, self.filename, debug=self.debug)
+                target = self.target
+                if target is None:
+                    if len(spec.targets) == 0:
+                        self.log.write("error: no code generation target specified " +
+                                       "and no target in spec file\n")
+                        return False
+                    target = spec.targets[0].name
+                content = codegen(spec, target, None, self.out_filename, self.indent,
+                                  render_cache=self.render_cache)
+        except SystemExit:
+            # the error was already reported, keep the last good output
+            return False
+        self.spec = spec
+        # start watching newly imported files
+        for fn in self.spec_files():
+            if fn not in self.stamps:
+                self.stamps[fn] = _stamp(fn)
+                self.sources[fn] = _read_file(fn)
+        written = content != self.content
+        if written:
+            with open(self.out_filename, 'w') as f:
+                f.write(content)
+            self.content = content
+        self.log.write("status: %s '%s' in %.1fms\n" % (
+            "wrote" if written else "unchanged", self.out_filename,
+            (time.perf_counter() - start) * 1000.0))
+        self.log.flush()
+        return written
+
+    def poll(self):
+        """
+        Check for changes once, regenerating if needed.
+        """
+        if self.changed_files():
+            return self.regenerate()
+        return False
+
+    def run(self):
+        self.regenerate()
+        try:
+            while True:
+                time.sleep(self.interval)
+                self.poll()
+        except KeyboardInterrupt:
+            pass
+        return 0
@@ -0,0 +1,236 @@
+// This file is auto-generated, do not edit.
+#ifndef ARENA_H
+# define ARENA_H 1
+
+# include <string>
+# include <vector>
+# include <utility>
+# include <cstddef>
+# include <cstdint>
+# include <new>
+# include <type_traits>
+
+namespace  {
+# line 15 "arena.h"
+    
+    struct Stmt;
+    struct Block;
+    struct Assign;
+    struct If;
+    
+    struct NodeArena {
+        struct DtorRecord {
+            void (*destroy)(void* object);
+            void* object;
+            DtorRecord* next;
+        };
+        std::size_t block_size;
+        char* next;
+        std::size_t left;
+        DtorRecord* dtors;
+        std::vector<char*> blocks;
+        NodeArena(std::size_t block_size = 65536)
+                : block_size(block_size), 
+                  next(nullptr), 
+                  left(0), 
+                  dtors(nullptr) {}
+        NodeArena(const NodeArena&) = delete;
+        NodeArena& operator=(const NodeArena&) = delete;
+        ~NodeArena();
+        void* allocate(std::size_t size, std::size_t align) {
+            std::size_t pad = (align - reinterpret_cast<std::uintptr_t>(next) % align) % align;
+            if (pad + size > left) {
+                std::size_t bytes = size + align > block_size ? size + align : block_size;
+                next = static_cast<char*>(::operator new(bytes));
+                blocks.push_back(next);
+                left = bytes;
+                pad = (align - reinterpret_cast<std::uintptr_t>(next) % align) % align;
+            }
+            void* ptr = next + pad;
+            next += pad + size;
+            left -= pad + size;
+            return ptr;
+        }
+        template <typename T, typename... Args>
+        T* make(Args&&... args) {
+            T* object = new (allocate(sizeof(T), alignof(T))) T(std::forward<Args>(args)...);
+            if (!std::is_trivially_destructible<T>::value) {
+                void* rec = allocate(sizeof(DtorRecord), alignof(DtorRecord));
+                dtors = new (rec) DtorRecord{&destroy<T>, object, dtors};
+            }
+            return object;
+        }
+        template <typename T>
+        static void destroy(void* object) {
+            static_cast<T*>(object)->~T();
+        }
+    };
+    
+    inline NodeArena::~NodeArena() {
+        for (DtorRecord* rec = dtors; rec; rec = rec->next) rec->destroy(rec->object);
+        for (char* block : blocks) ::operator delete(block);
+    }
+    
+# line 15 "arena.ast"
+    struct Visitor {
+# line 77 "arena.h"
+        enum { WALK_PREORDER = 1, WALK_INORDER = 2, WALK_POSTORDER = 4 };
+        struct WalkFrame {
+            void (*step)(Visitor& visitor, void* node, int stage);
+            void* node;
+            int stage;
+        };
+        int walk_order = WALK_PREORDER;
+        std::vector<WalkFrame> walk_stack;
+        virtual void visit(Stmt& node) {}
+        virtual void visit(Block& node) {}
+        virtual void visit(Assign& node) {}
+        virtual void visit(If& node) {}
+        template <typename T>
+        void walk(T& node) {
+            std::size_t base = walk_stack.size();
+            walk_push(&node);
+            while (walk_stack.size() > base) {
+                WalkFrame frame = walk_stack.back();
+                walk_stack.pop_back();
+                frame.step(*this, frame.node, frame.stage);
+            }
+        }
+        template <typename T>
+        void walk_push(T* node) {
+            if (node) walk_stack.push_back(WalkFrame{&walk_thunk<T>, node, 0});
+        }
+        template <typename T>
+        static void walk_thunk(Visitor& visitor, void* node, int stage) {
+            static_cast<T*>(node)->walk_step(visitor, stage);
+        }
+        template <typename T>
+        void walk_node(T& node, int stage) {
+            if (stage != 0) {
+                visit(node);
+                return;
+            }
+            if (walk_order & WALK_PREORDER) visit(node);
+            if (walk_order & WALK_POSTORDER) walk_stack.push_back(WalkFrame{&walk_thunk<T>, &node, WALK_POSTORDER});
+            std::size_t mark = walk_stack.size();
+            node.walk_children(*this);
+            if (walk_order & WALK_INORDER) walk_stack.insert(walk_stack.end() - (walk_stack.size() > mark ? 1 : 0), WalkFrame{&walk_thunk<T>, &node, WALK_INORDER});
+        }
+    };
+    
+# line 19 "arena.ast"
+    struct Stmt {
+# line 124 "arena.h"
+# line 20 "arena.ast"
+        int line;
+# line 127 "arena.h"
+        void accept(Visitor& visitor) {
+            visitor.visit(*this);
+        }
+        virtual void walk_step(Visitor& visitor, int stage) {
+            visitor.walk_node(*this, stage);
+        }
+        template <typename W>
+        void walk_children(W& walker) {}
+# line 136 "arena.h"
+    };
+    
+# line 23 "arena.ast"
+    struct Block : public Stmt {
+# line 141 "arena.h"
+# line 24 "arena.ast"
+        std::vector<Stmt*> stmts;
+# line 144 "arena.h"
+# line 25 "arena.ast"
+        Block(std::vector<Stmt*> stmts)
+                : Stmt(), 
+                  stmts(std::move(stmts)) {}
+# line 149 "arena.h"
+        static Block* create(NodeArena& arena, std::vector<Stmt*> stmts) {
+            return arena.make<Block>(std::move(stmts));
+        }
+        void accept(Visitor& visitor) {
+            visitor.visit(*this);
+        }
+        virtual void walk_step(Visitor& visitor, int stage) {
+            visitor.walk_node(*this, stage);
+        }
+        template <typename W>
+        void walk_children(W& walker) {
+            for (auto i = this->stmts.rbegin(); i != this->stmts.rend(); ++i) walker.walk_push((*i));
+            Stmt::walk_children(walker);
+        }
+# line 164 "arena.h"
+    };
+    
+# line 28 "arena.ast"
+    struct Assign : public Stmt {
+# line 169 "arena.h"
+# line 29 "arena.ast"
+        const char* name;
+# line 172 "arena.h"
+# line 30 "arena.ast"
+        float value;
+# line 175 "arena.h"
+# line 31 "arena.ast"
+        Assign(const char* name, float value)
+                : Stmt(), 
+                  name(name), 
+                  value(value) {}
+# line 181 "arena.h"
+        static Assign* create(NodeArena& arena, const char* name, float value) {
+            return arena.make<Assign>(name, value);
+        }
+        void accept(Visitor& visitor) {
+            visitor.visit(*this);
+        }
+        virtual void walk_step(Visitor& visitor, int stage) {
+            visitor.walk_node(*this, stage);
+        }
+        template <typename W>
+        void walk_children(W& walker) {
+            Stmt::walk_children(walker);
+        }
+# line 195 "arena.h"
+    };
+    
+# line 34 "arena.ast"
+    struct If : public Stmt {
+# line 200 "arena.h"
+# line 35 "arena.ast"
+        bool negate;
+# line 203 "arena.h"
+# line 36 "arena.ast"
+        Stmt* then;
+# line 206 "arena.h"
+# line 37 "arena.ast"
+        Stmt* otherwise;
+# line 209 "arena.h"
+# line 38 "arena.ast"
+        If(bool negate, Stmt* then, Stmt* otherwise)
+                : Stmt(), 
+                  negate(negate), 
+                  then(then), 
+                  otherwise(otherwise) {}
+# line 216 "arena.h"
+        static If* create(NodeArena& arena, bool negate, Stmt* then, Stmt* otherwise) {
+            return arena.make<If>(negate, then, otherwise);
+        }
+        void accept(Visitor& visitor) {
+            visitor.visit(*this);
+        }
+        virtual void walk_step(Visitor& visitor, int stage) {
+            visitor.walk_node(*this, stage);
+        }
+        template <typename W>
+        void walk_children(W& walker) {
+            walker.walk_push(this->otherwise);
+            walker.walk_push(this->then);
+            Stmt::walk_children(walker);
+        }
+# line 232 "arena.h"
+    };
+    
+}
+
+#endif
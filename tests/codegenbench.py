@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Times generating the code for a `specgen.py' spec and the peak memory it
+takes. Run with `-h' for the options.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import specgen
+import libtreegen
+
+def parse_args(args):
+    par = argparse.ArgumentParser(
+        description='Measure the time and memory taken to generate code.')
+    par.add_argument('-n', '--nodes', metavar='N', type=int, default=10000,
+                     help='number of nodes in the generated spec (default 10000)')
+    par.add_argument('-f', '--fields', metavar='N', type=int, default=5,
+                     help='number of primitive fields per node (default 5)')
+    par.add_argument('-c', '--node-fields', metavar='N', type=int, default=1,
+                     help='number of node pointer fields per node (default 1)')
+    par.add_argument('-d', '--depth', metavar='N', type=int, default=4,
+                     help='length of the inheritance chains (default 4)')
+    par.add_argument('-v', '--visitors', metavar='N', type=int, default=1,
+                     help='number of visitors (default 1)')
+    par.add_argument('-j', '--render-jobs', metavar='N', type=int, default=1,
+                     help='number of processes rendering the code (default 1)')
+    par.add_argument('-r', '--repeat', metavar='N', type=int, default=3,
+                     help='number of times to generate the code (default 3)')
+    return par.parse_args(args[1:])
+
+def main(args):
+    args = parse_args(args)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        spec_fn = os.path.join(tmpdir, 'bench.ast')
+        with open(spec_fn, 'w') as f:
+            specgen.write_spec(f, nodes=args.nodes, fields=args.fields,
+                               node_fields=args.node_fields, depth=args.depth,
+                               visitors=args.visitors)
+        spec = libtreegen.parse(None, spec_fn, debug=False)
+    target = spec.targets[0].name
+    best = None
+    for i in range(args.repeat):
+        start = time.perf_counter()
+        code = libtreegen.codegen(spec, target, None, 'bench.h',
+                                  render_jobs=args.render_jobs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print('codegen:  %8.3fs (best of %d), %.1fMB of code' % (best, args.repeat,
+                                                            len(code) / 1e6))
+    del code
+    tracemalloc.start()
+    code = libtreegen.codegen(spec, target, None, 'bench.h',
+                              render_jobs=args.render_jobs)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('memory:   peak %.1fMB, %.1fMB over the code itself' % (peak / 1e6,
+                                                                (peak - len(code)) / 1e6))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
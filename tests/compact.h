@@ -0,0 +1,265 @@
+// This file is auto-generated, do not edit.
+#ifndef COMPACT_H
+# define COMPACT_H 1
+
+# include <string>
+# include <vector>
+# include <utility>
+
+namespace  {
+# line 11 "compact.h"
+    
+    struct Expr;
+    struct Literal;
+    struct Binary;
+    struct Call;
+    
+    struct TreeVisitor {
+        enum { WALK_PREORDER = 1, WALK_INORDER = 2, WALK_POSTORDER = 4 };
+        struct WalkFrame {
+            void (*step)(TreeVisitor& visitor, void* node, int stage);
+            void* node;
+            int stage;
+        };
+        int walk_order = WALK_PREORDER;
+        std::vector<WalkFrame> walk_stack;
+        virtual ~TreeVisitor();
+        virtual void visit(Expr& node) {}
+        virtual void visit(Literal& node) {}
+        virtual void visit(Binary& node) {}
+        virtual void visit(Call& node) {}
+        template <typename T>
+        void walk(T& node) {
+            std::size_t base = walk_stack.size();
+            walk_push(&node);
+            while (walk_stack.size() > base) {
+                WalkFrame frame = walk_stack.back();
+                walk_stack.pop_back();
+                frame.step(*this, frame.node, frame.stage);
+            }
+        }
+        template <typename T>
+        void walk_push(T* node) {
+            if (node) walk_stack.push_back(WalkFrame{&walk_thunk<T>, node, 0});
+        }
+        template <typename T>
+        static void walk_thunk(TreeVisitor& visitor, void* node, int stage) {
+            static_cast<T*>(node)->walk_step(visitor, stage);
+        }
+        template <typename T>
+        void walk_node(T& node, int stage) {
+            if (stage != 0) {
+                visit(node);
+                return;
+            }
+            if (walk_order & WALK_PREORDER) visit(node);
+            if (walk_order & WALK_POSTORDER) walk_stack.push_back(WalkFrame{&walk_thunk<T>, &node, WALK_POSTORDER});
+            std::size_t mark = walk_stack.size();
+            node.walk_children(*this);
+            if (walk_order & WALK_INORDER) walk_stack.insert(walk_stack.end() - (walk_stack.size() > mark ? 1 : 0), WalkFrame{&walk_thunk<T>, &node, WALK_INORDER});
+        }
+    };
+    
+# line 12 "compact.ast"
+    struct Printer : public TreeVisitor {
+# line 66 "compact.h"
+    };
+# line 15 "compact.ast"
+    struct Walker : public TreeVisitor {
+# line 70 "compact.h"
+        Walker() {
+            walk_order = WALK_POSTORDER;
+        }
+    };
+    
+    inline TreeVisitor::~TreeVisitor() {}
+    
+# line 20 "compact.ast"
+    struct Expr {
+# line 80 "compact.h"
+# line 21 "compact.ast"
+        int line;
+# line 83 "compact.h"
+# line 22 "compact.ast"
+        Expr(int line)
+                : line(line) {}
+# line 87 "compact.h"
+        virtual ~Expr();
+        int get_line() const;
+        void set_line(int value);
+        template <typename V>
+        void accept(V& visitor) {
+            visitor.visit(*this);
+        }
+        virtual void walk_step(TreeVisitor& visitor, int stage) {
+            visitor.walk_node(*this, stage);
+        }
+        template <typename W>
+        void walk_children(W& walker) {}
+# line 100 "compact.h"
+    };
+    
+# line 25 "compact.ast"
+    struct Literal : public Expr {
+# line 105 "compact.h"
+# line 26 "compact.ast"
+        std::string text;
+# line 108 "compact.h"
+# line 27 "compact.ast"
+        Literal(int line, std::string text)
+                : Expr(line), 
+                  text(std::move(text)) {}
+# line 113 "compact.h"
+        virtual ~Literal();
+        std::string get_text() const;
+        void set_text(std::string value);
+        template <typename V>
+        void accept(V& visitor) {
+            visitor.visit(*this);
+        }
+        virtual void walk_step(TreeVisitor& visitor, int stage) {
+            visitor.walk_node(*this, stage);
+        }
+        template <typename W>
+        void walk_children(W& walker) {
+            Expr::walk_children(walker);
+        }
+# line 128 "compact.h"
+    };
+    
+# line 30 "compact.ast"
+    struct Binary : public Expr {
+# line 133 "compact.h"
+# line 31 "compact.ast"
+        Expr* lhs;
+# line 136 "compact.h"
+# line 32 "compact.ast"
+        Expr* rhs;
+# line 139 "compact.h"
+# line 33 "compact.ast"
+        Expr* parent;
+# line 142 "compact.h"
+# line 34 "compact.ast"
+        Binary(int line, Expr* lhs, Expr* rhs)
+                : Expr(line), 
+                  lhs(lhs), 
+                  rhs(rhs) {}
+# line 148 "compact.h"
+        virtual ~Binary();
+        Expr* get_lhs() const;
+        void set_lhs(Expr* value);
+        Expr* get_rhs() const;
+        void set_rhs(Expr* value);
+        Expr* get_parent() const;
+        void set_parent(Expr* value);
+        template <typename V>
+        void accept(V& visitor) {
+            visitor.visit(*this);
+        }
+        virtual void walk_step(TreeVisitor& visitor, int stage) {
+            visitor.walk_node(*this, stage);
+        }
+        template <typename W>
+        void walk_children(W& walker) {
+            walker.walk_push(this->rhs);
+            walker.walk_push(this->lhs);
+            Expr::walk_children(walker);
+        }
+# line 169 "compact.h"
+    };
+    
+# line 37 "compact.ast"
+    struct Call : public Expr {
+# line 174 "compact.h"
+# line 38 "compact.ast"
+        std::string name;
+# line 177 "compact.h"
+# line 39 "compact.ast"
+        std::vector<Expr*> args;
+# line 180 "compact.h"
+# line 40 "compact.ast"
+        Call(int line, std::string name, std::vector<Expr*> args)
+                : Expr(line), 
+                  name(std::move(name)), 
+                  args(std::move(args)) {}
+# line 186 "compact.h"
+        virtual ~Call();
+        std::string get_name() const;
+        void set_name(std::string value);
+        std::vector<Expr*> get_args() const;
+        void set_args(std::vector<Expr*> value);
+        template <typename V>
+        void accept(V& visitor) {
+            visitor.visit(*this);
+        }
+        virtual void walk_step(TreeVisitor& visitor, int stage) {
+            visitor.walk_node(*this, stage);
+        }
+        template <typename W>
+        void walk_children(W& walker) {
+            for (auto i = this->args.rbegin(); i != this->args.rend(); ++i) walker.walk_push((*i));
+            Expr::walk_children(walker);
+        }
+# line 204 "compact.h"
+    };
+    
+    int Expr::get_line() const {
+        return line;
+    }
+    void Expr::set_line(int value) {
+        line = value;
+    }
+    inline Expr::~Expr() {}
+    
+    std::string Literal::get_text() const {
+        return text;
+    }
+    void Literal::set_text(std::string value) {
+        text = std::move(value);
+    }
+    inline Literal::~Literal() {}
+    
+    Expr* Binary::get_lhs() const {
+        return lhs;
+    }
+    void Binary::set_lhs(Expr* value) {
+        delete lhs;
+        lhs = value;
+    }
+    Expr* Binary::get_rhs() const {
+        return rhs;
+    }
+    void Binary::set_rhs(Expr* value) {
+        delete rhs;
+        rhs = value;
+    }
+    Expr* Binary::get_parent() const {
+        return parent;
+    }
+    void Binary::set_parent(Expr* value) {
+        parent = value;
+    }
+    inline Binary::~Binary() {
+        delete lhs;
+        delete rhs;
+    }
+    
+    std::string Call::get_name() const {
+        return name;
+    }
+    void Call::set_name(std::string value) {
+        name = std::move(value);
+    }
+    std::vector<Expr*> Call::get_args() const {
+        return args;
+    }
+    void Call::set_args(std::vector<Expr*> value) {
+        args = std::move(value);
+    }
+    inline Call::~Call() {
+        for (auto i : args) { delete i; };
+    }
+    
+}
+
+#endif
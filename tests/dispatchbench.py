@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Times visiting nodes through the `use_dispatch' dispatcher against
+virtual accept methods. Needs a C++ compiler, run with `-h' for the options.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import specgen
+
+DRIVER = r'''
+#include "bench.h"
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <vector>
+
+struct Counter final : Visitor_0 {
+    long total = 0;
+%(visits)s
+};
+
+template <typename F>
+static void run(const char* name, const std::vector<Node_0*>& objects, int repeat, F visit) {
+    Counter counter;
+    auto start = std::chrono::steady_clock::now();
+    for (int i = 0; i < repeat; i++)
+        for (Node_0* node : objects)
+            visit(*node, counter);
+    std::chrono::duration<double> elapsed = std::chrono::steady_clock::now() - start;
+    std::printf("%%-10s %%7.2fns per visit (total %%ld)\n", name,
+                elapsed.count() * 1e9 / (double(repeat) * objects.size()), counter.total);
+}
+
+int main() {
+    std::vector<Node_0*> objects;
+    std::srand(42);
+    for (int i = 0; i < %(objects)d; i++) {
+        switch (std::rand() %% %(depth)d) {
+%(cases)s
+        }
+    }
+    run("accept:", objects, %(repeat)d,
+        [](Node_0& node, Counter& counter) { node.virtual_accept(counter); });
+    run("dispatch:", objects, %(repeat)d,
+        [](Node_0& node, Counter& counter) { dispatch(node, counter); });
+    return 0;
+}
+'''
+
+ACCEPT = '[ "virtual void virtual_accept(Visitor_0& visitor) { visitor.visit(*this); }" ]'
+
+def parse_args(args):
+    par = argparse.ArgumentParser(
+        description='Time the use_dispatch dispatcher against virtual accept methods.')
+    par.add_argument('-d', '--depth', metavar='N', type=int, default=16,
+                     help='length of the inheritance chain (default 16)')
+    par.add_argument('-n', '--objects', metavar='N', type=int, default=100000,
+                     help='number of nodes to visit (default 100000)')
+    par.add_argument('-r', '--repeat', metavar='N', type=int, default=100,
+                     help='number of times to visit every node (default 100)')
+    par.add_argument('--cxx', metavar='PROG', default=os.environ.get('CXX', 'g++'),
+                     help='C++ compiler to use (default $CXX or g++)')
+    return par.parse_args(args[1:])
+
+def main(args):
+    args = parse_args(args)
+    if shutil.which(args.cxx) is None:
+        sys.stderr.write('error: %s not found\n' % args.cxx)
+        return 1
+    treegen = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'treegen')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        spec_fn = os.path.join(tmpdir, 'bench.ast')
+        with open(spec_fn, 'w') as f:
+            # visitors which visit children have virtual visit methods
+            specgen.write_spec(f, nodes=args.depth, depth=args.depth, ctors=False,
+                               visitors=1, line_directives=False,
+                               target_options=[('use_kinds', 'true'),
+                                               ('use_dispatch', 'true'),
+                                               ('class_extra', ACCEPT)],
+                               visitor_options=[('visit_children', 'true')])
+        header_fn = os.path.join(tmpdir, 'bench.h')
+        subprocess.check_call([sys.executable, treegen, '-o', header_fn, spec_fn])
+        visits = '\n'.join('    void visit(Node_%d&) override { total += %d; }' % (index, index)
+                           for index in range(args.depth))
+        cases = '\n'.join('            case %d: objects.push_back(new Node_%d()); break;' %
+                          (index, index) for index in range(args.depth))
+        driver_fn = os.path.join(tmpdir, 'driver.cpp')
+        with open(driver_fn, 'w') as f:
+            f.write(DRIVER % dict(objects=args.objects, depth=args.depth, cases=cases,
+                                  visits=visits, repeat=args.repeat))
+        prog = os.path.join(tmpdir, 'driver')
+        subprocess.check_call([args.cxx, '-std=c++11', '-O2', '-o', prog, driver_fn])
+        subprocess.check_call([prog])
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Times the `use_kinds' type tests against dynamic_cast. Needs a C++
+compiler, run with `-h' for the options.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import specgen
+
+DRIVER = r'''
+#include "bench.h"
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <vector>
+
+template <typename F>
+static void run(const char* name, const std::vector<Node_0*>& objects, int repeat, F test) {
+    auto start = std::chrono::steady_clock::now();
+    long hits = 0;
+    for (int i = 0; i < repeat; i++)
+        for (Node_0* node : objects)
+            hits += test(node) ? 1 : 0;
+    std::chrono::duration<double> elapsed = std::chrono::steady_clock::now() - start;
+    std::printf("%%-13s %%7.2fns per test (%%ld hits)\n", name,
+                elapsed.count() * 1e9 / (double(repeat) * objects.size()), hits);
+}
+
+int main() {
+    std::vector<Node_0*> objects;
+    std::srand(42);
+    for (int i = 0; i < %(objects)d; i++) {
+        switch (std::rand() %% %(depth)d) {
+%(cases)s
+        }
+    }
+    run("dynamic_cast:", objects, %(repeat)d,
+        [](Node_0* node) { return dynamic_cast<Node_%(middle)d*>(node) != nullptr; });
+    run("dyn_cast:", objects, %(repeat)d,
+        [](Node_0* node) { return dyn_cast<Node_%(middle)d>(node) != nullptr; });
+    return 0;
+}
+'''
+
+def parse_args(args):
+    par = argparse.ArgumentParser(
+        description='Time the use_kinds type tests against dynamic_cast.')
+    par.add_argument('-d', '--depth', metavar='N', type=int, default=8,
+                     help='length of the inheritance chain (default 8)')
+    par.add_argument('-n', '--objects', metavar='N', type=int, default=100000,
+                     help='number of nodes to test (default 100000)')
+    par.add_argument('-r', '--repeat', metavar='N', type=int, default=100,
+                     help='number of times to test every node (default 100)')
+    par.add_argument('--cxx', metavar='PROG', default=os.environ.get('CXX', 'g++'),
+                     help='C++ compiler to use (default $CXX or g++)')
+    return par.parse_args(args[1:])
+
+def main(args):
+    args = parse_args(args)
+    if shutil.which(args.cxx) is None:
+        sys.stderr.write('error: %s not found\n' % args.cxx)
+        return 1
+    treegen = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'treegen')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        spec_fn = os.path.join(tmpdir, 'bench.ast')
+        with open(spec_fn, 'w') as f:
+            specgen.write_spec(f, nodes=args.depth, depth=args.depth, ctors=False,
+                               line_directives=False,
+                               target_options=[('use_kinds', 'true')])
+        header_fn = os.path.join(tmpdir, 'bench.h')
+        subprocess.check_call([sys.executable, treegen, '-o', header_fn, spec_fn])
+        cases = '\n'.join('            case %d: objects.push_back(new Node_%d()); break;' %
+                          (index, index) for index in range(args.depth))
+        driver_fn = os.path.join(tmpdir, 'driver.cpp')
+        with open(driver_fn, 'w') as f:
+            f.write(DRIVER % dict(objects=args.objects, depth=args.depth, cases=cases,
+                                  repeat=args.repeat, middle=args.depth // 2))
+        prog = os.path.join(tmpdir, 'driver')
+        subprocess.check_call([args.cxx, '-std=c++11', '-O2', '-o', prog, driver_fn])
+        subprocess.check_call([prog])
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,179 @@
+// This file is auto-generated, do not edit.
+#ifndef KINDS_H
+# define KINDS_H 1
+
+# include <string>
+# include <utility>
+# include <cassert>
+# line 11 "kinds.ast"
+# include <vector>
+# line 11 "kinds.h"
+
+# line 7 "kinds.ast"
+namespace Ast {
+# line 15 "kinds.h"
+    
+    struct Node;
+    struct Decl;
+    struct VarDecl;
+    struct FuncDecl;
+    struct Type;
+    
+    enum class NodeKind : unsigned char {
+        Node,
+        Decl,
+        VarDecl,
+        FuncDecl,
+        Type,
+    };
+    
+    template <typename T, typename U>
+    inline bool isa(const U* node) {
+        return T::classof(node);
+    }
+    template <typename T, typename U>
+    inline T* cast(U* node) {
+        assert(isa<T>(node) && "cast<T>() of the wrong kind of node");
+        return static_cast<T*>(node);
+    }
+    template <typename T, typename U>
+    inline T* dyn_cast(U* node) {
+        return node && isa<T>(node) ? static_cast<T*>(node) : nullptr;
+    }
+    template <typename T, typename U>
+    inline const T* cast(const U* node) {
+        assert(isa<T>(node) && "cast<T>() of the wrong kind of node");
+        return static_cast<const T*>(node);
+    }
+    template <typename T, typename U>
+    inline const T* dyn_cast(const U* node) {
+        return node && isa<T>(node) ? static_cast<const T*>(node) : nullptr;
+    }
+    
+# line 14 "kinds.ast"
+    struct Visitor {
+# line 56 "kinds.h"
+        void visit(Node& node) {}
+        void visit(Decl& node) {}
+        void visit(VarDecl& node) {}
+        void visit(FuncDecl& node) {}
+        void visit(Type& node) {}
+    };
+    
+# line 17 "kinds.ast"
+    struct Node {
+# line 66 "kinds.h"
+        NodeKind kind_;
+# line 18 "kinds.ast"
+        int line;
+# line 70 "kinds.h"
+        Node() {
+            this->kind_ = NodeKind::Node;
+        }
+        virtual ~Node();
+        static bool classof(const Node* node) {
+            return node->kind_ >= NodeKind::Node && node->kind_ <= NodeKind::Type;
+        }
+# line 78 "kinds.h"
+    };
+    
+# line 21 "kinds.ast"
+    struct Decl : public Node {
+# line 83 "kinds.h"
+# line 22 "kinds.ast"
+        std::string name;
+# line 86 "kinds.h"
+        Decl() {
+            this->kind_ = NodeKind::Decl;
+        }
+        virtual ~Decl();
+        static bool classof(const Node* node) {
+            return node->kind_ >= NodeKind::Decl && node->kind_ <= NodeKind::FuncDecl;
+        }
+# line 94 "kinds.h"
+    };
+    
+# line 25 "kinds.ast"
+    struct VarDecl : public Decl {
+# line 99 "kinds.h"
+# line 26 "kinds.ast"
+        Node* init;
+# line 102 "kinds.h"
+# line 27 "kinds.ast"
+        VarDecl(Node* init)
+                : Decl(), 
+                  init(init) {
+            this->kind_ = NodeKind::VarDecl;
+        }
+# line 109 "kinds.h"
+        virtual ~VarDecl();
+        static bool classof(const Node* node) {
+            return node->kind_ == NodeKind::VarDecl;
+        }
+# line 114 "kinds.h"
+    };
+    
+# line 30 "kinds.ast"
+    struct FuncDecl : public Decl {
+# line 119 "kinds.h"
+# line 31 "kinds.ast"
+        std::vector<Decl*> params;
+# line 122 "kinds.h"
+# line 32 "kinds.ast"
+        FuncDecl(std::vector<Decl*> params)
+                : Decl(), 
+                  params(std::move(params)) {
+            this->kind_ = NodeKind::FuncDecl;
+        }
+# line 129 "kinds.h"
+        virtual ~FuncDecl();
+        static bool classof(const Node* node) {
+            return node->kind_ == NodeKind::FuncDecl;
+        }
+# line 134 "kinds.h"
+    };
+    
+# line 35 "kinds.ast"
+    struct Type : public Node {
+# line 139 "kinds.h"
+# line 36 "kinds.ast"
+        bool is_const;
+# line 142 "kinds.h"
+        Type() {
+            this->kind_ = NodeKind::Type;
+        }
+        virtual ~Type();
+        static bool classof(const Node* node) {
+            return node->kind_ == NodeKind::Type;
+        }
+# line 150 "kinds.h"
+    };
+    
+    inline Node::~Node() {}
+    
+    inline Decl::~Decl() {}
+    
+    inline VarDecl::~VarDecl() {
+        delete init;
+    }
+    
+    inline FuncDecl::~FuncDecl() {
+        for (auto i : params) { delete i; };
+    }
+    
+    inline Type::~Type() {}
+    
+    template <typename V>
+    inline void dispatch(Node& node, V& visitor) {
+        switch (node.kind_) {
+            case NodeKind::Node: visitor.visit(static_cast<Node&>(node)); break;
+            case NodeKind::Decl: visitor.visit(static_cast<Decl&>(node)); break;
+            case NodeKind::VarDecl: visitor.visit(static_cast<VarDecl&>(node)); break;
+            case NodeKind::FuncDecl: visitor.visit(static_cast<FuncDecl&>(node)); break;
+            case NodeKind::Type: visitor.visit(static_cast<Type&>(node)); break;
+        }
+    }
+    
+}
+
+#endif
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Compares the size of the node classes with and without `reorder_fields'.
+Needs a C++ compiler, run with `-h' for the options.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import specgen
+
+def parse_args(args):
+    par = argparse.ArgumentParser(
+        description='Measure the space reorder_fields saves in the generated classes.')
+    par.add_argument('-n', '--nodes', metavar='N', type=int, default=200,
+                     help='number of nodes in the generated spec (default 200)')
+    par.add_argument('-f', '--fields', metavar='N', type=int, default=5,
+                     help='number of primitive fields per node (default 5)')
+    par.add_argument('-c', '--node-fields', metavar='N', type=int, default=1,
+                     help='number of node pointer fields per node (default 1)')
+    par.add_argument('-l', '--lists', metavar='N', type=int, default=1,
+                     help='number of list fields per node (default 1)')
+    par.add_argument('-d', '--depth', metavar='N', type=int, default=4,
+                     help='length of the inheritance chains (default 4)')
+    par.add_argument('--cxx', metavar='PROG', default=os.environ.get('CXX', 'g++'),
+                     help='C++ compiler to use (default $CXX or g++)')
+    return par.parse_args(args[1:])
+
+def class_sizes(args, tmpdir, reorder):
+    name = 'reordered' if reorder else 'declared'
+    spec_fn = os.path.join(tmpdir, name + '.ast')
+    with open(spec_fn, 'w') as f:
+        specgen.write_spec(f, nodes=args.nodes, fields=args.fields,
+                           node_fields=args.node_fields, lists=args.lists,
+                           depth=args.depth, line_directives=False,
+                           target_options=[('reorder_fields', 'true' if reorder else 'false')])
+    header_fn = os.path.join(tmpdir, name + '.h')
+    treegen = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'treegen')
+    subprocess.check_call([sys.executable, treegen, '-o', header_fn, spec_fn])
+    driver_fn = os.path.join(tmpdir, name + '.cpp')
+    with open(driver_fn, 'w') as f:
+        f.write('#include "%s.h"\n#include <cstdio>\n' % name)
+        f.write('int main() {\n    unsigned long total = 0;\n')
+        for index in range(args.nodes):
+            f.write('    total += sizeof(%s);\n' % specgen.node_name(index))
+        f.write('    std::printf("%lu\\n", total);\n    return 0;\n}\n')
+    prog = os.path.join(tmpdir, name)
+    subprocess.check_call([args.cxx, '-std=c++11', '-o', prog, driver_fn])
+    return int(subprocess.check_output([prog]))
+
+def main(args):
+    args = parse_args(args)
+    if shutil.which(args.cxx) is None:
+        sys.stderr.write('error: %s not found\n' % args.cxx)
+        return 1
+    with tempfile.TemporaryDirectory() as tmpdir:
+        declared = class_sizes(args, tmpdir, False)
+        reordered = class_sizes(args, tmpdir, True)
+    print('declared:  %8d bytes for one of each node class' % declared)
+    print('reordered: %8d bytes, %.1f%% smaller' % (reordered,
+                                                    100.0 * (declared - reordered) / declared))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
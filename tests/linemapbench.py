@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Compares the size of the code and the time to generate and compile it
+with and without `line_map'. Run with `-h' for the options.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, os.path.join(TESTS_DIR, '..'))
+
+import libtreegen
+from libtreegen import nodes
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def generate(spec_fn, out_fn, line_map, repeat):
+    spec = libtreegen.parse(None, spec_fn, debug=False)
+    target = spec.targets[0]
+    target.options = [opt for opt in target.options
+                      if opt.name not in ('line_map', 'use_line_directives')]
+    target.options.append(nodes.Option('use_line_directives', nodes.BoolLiteral(True)))
+    target.options.append(nodes.Option('line_map', nodes.BoolLiteral(line_map)))
+    best = None
+    for i in range(repeat):
+        code, elapsed = timed(libtreegen.codegen, spec, target.name, None, out_fn)
+        best = elapsed if best is None else min(best, elapsed)
+    return code, best
+
+def compile_time(cxx, header_fn, flag):
+    _, elapsed = timed(subprocess.check_call,
+                       [cxx, '-x', 'c++', '-std=c++11', flag, header_fn, '-o', os.devnull])
+    return elapsed
+
+def parse_args(args):
+    par = argparse.ArgumentParser(
+        description='Compare the output with and without line_map.')
+    par.add_argument('spec', metavar='SPEC', nargs='?',
+                     default=os.path.join(TESTS_DIR, 'ooooook.ast'),
+                     help='spec file to generate code for (default tests/ooooook.ast)')
+    par.add_argument('-r', '--repeat', metavar='N', type=int, default=3,
+                     help='number of times to generate the code (default 3)')
+    par.add_argument('--cxx', metavar='PROG', default=os.environ.get('CXX', 'g++'),
+                     help='C++ compiler to time (default $CXX or g++)')
+    return par.parse_args(args[1:])
+
+def main(args):
+    args = parse_args(args)
+    cxx = shutil.which(args.cxx)
+    if cxx is None:
+        print('note: %s not found, not timing the compiler' % args.cxx)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, line_map in (('all', False), ('line_map', True)):
+            header_fn = os.path.join(tmpdir, name + '.h')
+            code, gen_time = generate(args.spec, header_fn, line_map, args.repeat)
+            with open(header_fn, 'w') as f:
+                f.write(code)
+            directives = sum(1 for line in code.splitlines()
+                             if line.lstrip('#').lstrip().startswith('line '))
+            print('%-9s %9d bytes %7d lines %6d #line   codegen %6.3fs' % (
+                  name + ':', len(code), code.count('\n'), directives, gen_time))
+            if cxx is not None:
+                print('%-9s preprocess %6.3fs   syntax check %6.3fs' % ('',
+                      compile_time(cxx, header_fn, '-E'),
+                      compile_time(cxx, header_fn, '-fsyntax-only')))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Peak memory and time of parsing a large spec read whole, memory mapped
+and piped in. Run with `-h' for the options.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+sys.path.insert(0, ROOT)
+
+import specgen
+
+# Run in a child process so each mode starts from a clean heap
+CHILD = '''
+import io, resource, sys, time, tracemalloc
+sys.path.insert(0, %(root)r)
+import specgen
+from libtreegen import parser
+# build the parser tables before measuring
+parser.parse(io.StringIO(''.join(specgen.generate(nodes=1))), '<warmup>', debug=False)
+tracemalloc.start()
+start = time.perf_counter()
+spec = parser.parse(%(file)s, %(filename)r, debug=False, stream=%(stream)r)
+elapsed = time.perf_counter() - start
+current, peak = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print('%%d %%d %%d %%f' %% (peak, current, rss, elapsed))
+'''
+
+def measure(spec_fn, stream, pipe):
+    code = CHILD % {
+        'root': ROOT,
+        'file': 'sys.stdin' if pipe else 'None',
+        'filename': '<stdin>' if pipe else spec_fn,
+        'stream': stream,
+    }
+    stdin = None
+    if pipe:
+        with open(spec_fn) as f:
+            stdin = f.read()
+    out = subprocess.check_output([sys.executable, '-c', code], input=stdin,
+                                  cwd=os.path.dirname(os.path.abspath(__file__)),
+                                  universal_newlines=True)
+    peak, current, rss, elapsed = out.split()
+    return int(peak), int(current), int(rss), float(elapsed)
+
+def parse_args(args):
+    par = argparse.ArgumentParser(
+        description='Compare the memory used to parse a big spec file.')
+    par.add_argument('-n', '--nodes', metavar='N', type=int, default=20000,
+                     help='number of nodes in the generated spec (default 20000)')
+    par.add_argument('-f', '--fields', metavar='N', type=int, default=10,
+                     help='number of primitive fields per node (default 10)')
+    return par.parse_args(args[1:])
+
+def main(args):
+    args = parse_args(args)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        spec_fn = os.path.join(tmpdir, 'bench.ast')
+        with open(spec_fn, 'w') as f:
+            size = specgen.write_spec(f, nodes=args.nodes, fields=args.fields)
+        print('spec:   %d nodes, %.1fMB' % (args.nodes, size / 1e6))
+        modes = (('read', False, False), ('mmap', True, False),
+                 ('stdin', False, True), ('pipe', True, True))
+        for name, stream, pipe in modes:
+            peak, current, rss, elapsed = measure(spec_fn, stream, pipe)
+            print('%-6s  peak %7.1fMB  retained %7.1fMB  max rss %7.1fMB  %6.2fs' % (
+                name + ':', peak / 1e6, current / 1e6, rss / 1e3, elapsed))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Parser throughput in AST objects and fields per second. Run with `-h'
+for the options.
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import specgen
+from libtreegen import nodes, parser
+
+def count_nodes(spec):
+    seen = set([id(spec)])
+    todo = [spec]
+    while todo:
+        obj = todo.pop()
+        for value in obj.__dict__.values():
+            values = value if type(value) is list else (value,)
+            for value in values:
+                if isinstance(value, nodes.BaseNode) and id(value) not in seen:
+                    seen.add(id(value))
+                    todo.append(value)
+    return len(seen)
+
+def parse_args(args):
+    par = argparse.ArgumentParser(
+        description='Measure how many AST nodes per second the parser builds.')
+    par.add_argument('-F', '--total-fields', metavar='N', type=int, default=100000,
+                     help='number of fields in the generated spec (default 100000)')
+    par.add_argument('-f', '--fields', metavar='N', type=int, default=10,
+                     help='number of primitive fields per node (default 10)')
+    par.add_argument('-c', '--node-fields', metavar='N', type=int, default=0,
+                     help='number of node pointer fields per node (default 0)')
+    par.add_argument('-r', '--repeat', metavar='N', type=int, default=3,
+                     help='number of times to parse the spec (default 3)')
+    return par.parse_args(args[1:])
+
+def main(args):
+    args = parse_args(args)
+    per_node = args.fields + args.node_fields
+    num_nodes = max(args.total_fields // per_node, 1)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        spec_fn = os.path.join(tmpdir, 'bench.ast')
+        with open(spec_fn, 'w') as f:
+            size = specgen.write_spec(f, nodes=num_nodes, fields=args.fields,
+                                      node_fields=args.node_fields)
+        print('spec:     %d nodes, %d fields, %.1fMB' % (num_nodes, num_nodes * per_node,
+                                                       size / 1e6))
+        # build the parser tables up front so they're not part of the timings
+        parser.parse(io.StringIO(''.join(specgen.generate(nodes=1))), '<warmup>',
+                     debug=False)
+        best = None
+        for i in range(args.repeat):
+            parser.clear_modules()
+            start = time.perf_counter()
+            spec = parser.parse(None, spec_fn, debug=False, stream=False)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        total = count_nodes(spec)
+        print('parse:    %8.3fs (best of %d)' % (best, args.repeat))
+        print('ast:      %d objects, %.0f nodes/sec, %.0f fields/sec' % (
+              total, total / best, num_nodes * per_node / best))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
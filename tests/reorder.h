@@ -0,0 +1,104 @@
+// This file is auto-generated, do not edit.
+#ifndef REORDER_H
+# define REORDER_H 1
+
+# include <string>
+# include <utility>
+
+namespace  {
+    
+    struct Base;
+    struct Mixed;
+    struct Opaque;
+    
+    
+# line 16 "reorder.ast"
+    struct Base {
+# line 18 "reorder.h"
+        // data members ordered by alignment, 4 bytes smaller on LP64
+        struct SpecOrder_ {
+            bool a;
+            int b;
+            bool c;
+        };
+        struct AlignOrder_ {
+            int b;
+            bool a;
+            bool c;
+        };
+        static_assert(sizeof(AlignOrder_) <= sizeof(SpecOrder_), "the members of Base take more space ordered by alignment");
+# line 18 "reorder.ast"
+        int b;
+# line 17 "reorder.ast"
+        bool a;
+# line 19 "reorder.ast"
+        bool c;
+        Base(bool a, int b, bool c)
+                : b(b), 
+                  a(a), 
+                  c(c) {}
+# line 41 "reorder.h"
+        virtual ~Base();
+    };
+    
+# line 23 "reorder.ast"
+    struct Mixed : public Base {
+# line 47 "reorder.h"
+        // data members ordered by alignment, 8 bytes smaller on LP64
+        struct SpecOrder_ {
+            bool d;
+            std::string e;
+            bool f;
+            float g;
+            Base* h;
+        };
+        struct AlignOrder_ {
+            std::string e;
+            Base* h;
+            float g;
+            bool d;
+            bool f;
+        };
+        static_assert(sizeof(AlignOrder_) <= sizeof(SpecOrder_), "the members of Mixed take more space ordered by alignment");
+# line 25 "reorder.ast"
+        std::string e;
+# line 28 "reorder.ast"
+        Base* h;
+# line 27 "reorder.ast"
+        float g;
+# line 24 "reorder.ast"
+        bool d;
+# line 26 "reorder.ast"
+        bool f;
+# line 29 "reorder.ast"
+        Mixed(bool a, int b, bool c, bool d, std::string e, bool f, float g, Base* h)
+                : Base(a, b, c), 
+                  e(std::move(e)), 
+                  h(h), 
+                  g(g), 
+                  d(d), 
+                  f(f) {}
+# line 82 "reorder.h"
+        virtual ~Mixed();
+    };
+    
+# line 32 "reorder.ast"
+    struct Opaque : public Base {
+        bool i;
+        char j;
+        int k;
+# line 91 "reorder.h"
+        virtual ~Opaque();
+    };
+    
+    inline Base::~Base() {}
+    
+    inline Mixed::~Mixed() {
+        delete h;
+    }
+    
+    inline Opaque::~Opaque() {}
+    
+}
+
+#endif
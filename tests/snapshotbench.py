@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Times parsing a spec against loading its snapshot (`--cache'). Run with
+`-h' for the options.
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import specgen
+import libtreegen
+
+def timed(func, *args, **kwargs):
+    # forget the files parsed so far, unchanged files aren't parsed again
+    libtreegen.parser.clear_modules()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def parse_args(args):
+    par = argparse.ArgumentParser(
+        description='Compare parsing a spec with loading its snapshot.')
+    par.add_argument('-n', '--nodes', metavar='N', type=int, default=100000,
+                     help='number of nodes in the generated spec (default 100000)')
+    par.add_argument('-f', '--fields', metavar='N', type=int, default=2,
+                     help='number of primitive fields per node (default 2)')
+    par.add_argument('-c', '--node-fields', metavar='N', type=int, default=1,
+                     help='number of node pointer fields per node (default 1)')
+    par.add_argument('-d', '--depth', metavar='N', type=int, default=4,
+                     help='length of the inheritance chains (default 4)')
+    par.add_argument('--no-verify', dest='verify', action='store_false', default=True,
+                     help="don't compare the generated code")
+    return par.parse_args(args[1:])
+
+def main(args):
+    args = parse_args(args)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        spec_fn = os.path.join(tmpdir, 'bench.ast')
+        cache_dir = os.path.join(tmpdir, 'cache')
+        with open(spec_fn, 'w') as f:
+            size = specgen.write_spec(f, nodes=args.nodes, fields=args.fields,
+                                      node_fields=args.node_fields, depth=args.depth)
+        print('spec:     %d nodes, %.1fMB' % (args.nodes, size / 1e6))
+        # build the parser tables up front so they're not part of the timings
+        warmup = io.StringIO(''.join(specgen.generate(nodes=1)))
+        libtreegen.parse(warmup, '<warmup>', debug=False)
+        parsed, parse_time = timed(libtreegen.parse, None, spec_fn, debug=False)
+        print('parse:    %8.3fs' % parse_time)
+        stored, store_time = timed(libtreegen.parse, None, spec_fn, debug=False,
+                                   cache=cache_dir)
+        snap_size = sum(os.path.getsize(os.path.join(cache_dir, fn))
+                        for fn in os.listdir(cache_dir))
+        print('store:    %8.3fs (%.1fMB snapshot)' % (store_time, snap_size / 1e6))
+        loaded, load_time = timed(libtreegen.parse, None, spec_fn, debug=False,
+                                  cache=cache_dir)
+        print('load:     %8.3fs (%.1fx faster than parsing)' % (load_time,
+                                                             parse_time / load_time))
+        if args.verify:
+            target = parsed.targets[0].name
+            expected = libtreegen.codegen(parsed, target, None, 'bench.h')
+            actual = libtreegen.codegen(loaded, target, None, 'bench.h')
+            if expected != actual:
+                print('verify:   FAILED, generated code differs')
+                return 1
+            print('verify:   ok, generated code is identical')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
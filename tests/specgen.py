@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Scalable spec file generator for stress testing and profiling `treegen'.
+
+Unlike `genoktest.py' and `genbigtest.py', which only produce single `int'
+field nodes, this generator can exercise every part of the spec language
+that the codegen targets care about: primitive fields, node pointer
+fields (strong and weak), list fields, extern types, visitors,
+constructors and inheritance chains.
+
+The spec is produced as a stream of small text chunks by `generate()' and
+written out by `write_spec()', so even specs with millions of fields (or
+gigabytes of text) never need to be held in memory at once.
+
+It can be used as a library from other test scripts:
+
+    import specgen
+    with open('big.ast', 'w') as f:
+        specgen.write_spec(f, nodes=3000, fields=4, visitors=20)
+
+Or from the command line, run with `-h' for the available options.
+"""
+
+import argparse
+import sys
+
+PRIMITIVES = [ 'int', 'bool', 'float', 'string' ]
+
+def node_name(index):
+    return 'Node_%d' % index
+
+def extern_name(index):
+    return 'Extern_%d' % index
+
+def field_name(index, kind, num):
+    return 'node_%d_%s_%d' % (index, kind, num)
+
+def gen_target(lists, externs, accessors, line_directives, extra_options):
+    yield '''\
+//
+// Generated test to run with `treegen', see `tests/specgen.py'
+//
+
+target CPlusPlus {
+    header_only: true;
+'''
+    yield '    use_accessors: %s;\n' % ('true' if accessors else 'false')
+    yield '    use_line_directives: %s;\n' % ('true' if line_directives else 'false')
+    if lists > 0 and not any(name == 'includes' for name, value in extra_options):
+        yield '    includes: [ "<vector>" ];\n'
+    for name, value in extra_options:
+        yield '    %s: %s;\n' % (name, value)
+    for ext in range(externs):
+        yield '''
+    extern %s {
+        type:     "int*";
+        destruct: "delete $$";
+    }
+''' % extern_name(ext)
+    yield '}\n\n'
+
+def gen_visitors(visitors, visitor_options):
+    for vis in range(visitors):
+        yield 'visitor Visitor_%d {\n' % vis
+        for name, value in visitor_options:
+            yield '    %s: %s;\n' % (name, value)
+        yield '}\n\n'
+
+def gen_node(index, nodes, fields, node_fields, lists, externs,
+             extern_fields, depth, ctors):
+    """
+    Generate a single node definition as a series of text chunks.
+
+    Node `index' derives from the node before it unless it starts a new
+    inheritance chain, chains being `depth' nodes long.
+    """
+    base = ''
+    if depth > 1 and index % depth != 0:
+        base = ' : %s' % node_name(index - 1)
+    abstract = 'abstract ' if depth > 1 and index % depth == 0 else ''
+    yield '%snode %s%s {\n' % (abstract, node_name(index), base)
+    args = []
+    for num in range(fields):
+        name = field_name(index, 'field', num)
+        yield '  %s %s;\n' % (PRIMITIVES[num % len(PRIMITIVES)], name)
+        args.append(name)
+    for num in range(node_fields):
+        name = field_name(index, 'child', num)
+        weak = 'weak ' if num % 2 else ''
+        target = node_name((index + num + 1) % nodes)
+        yield '  %s%s %s;\n' % (weak, target, name)
+        args.append(name)
+    for num in range(lists):
+        name = field_name(index, 'list', num)
+        if num % 2:
+            elem = PRIMITIVES[num % len(PRIMITIVES)]
+        else:
+            elem = node_name((index + num + 1) % nodes)
+        yield '  list %s %s;\n' % (elem, name)
+        args.append(name)
+    if externs > 0:
+        for num in range(extern_fields):
+            name = field_name(index, 'extern', num)
+            yield '  %s %s;\n' % (extern_name((index + num) % externs), name)
+            args.append(name)
+    if ctors:
+        yield '  %s(' % node_name(index)
+        # write arguments in batches to keep chunks small for huge nodes
+        for start in range(0, len(args), 1000):
+            sep = ', ' if start > 0 else ''
+            yield sep + ', '.join(args[start:start+1000])
+        yield ');\n'
+    yield '}\n\n'
+
+def generate(nodes=1000, fields=1, node_fields=0, lists=0, externs=0,
+             extern_fields=0, visitors=0, depth=1, ctors=True,
+             accessors=True, line_directives=True, target_options=None,
+             visitor_options=None):
+    """
+    Generate a complete spec file as an iterable of text chunks.
+    """
+    target_options = [] if target_options is None else target_options
+    visitor_options = [] if visitor_options is None else visitor_options
+    yield from gen_target(lists, externs, accessors, line_directives, target_options)
+    yield from gen_visitors(visitors, visitor_options)
+    for index in range(nodes):
+        yield from gen_node(index, nodes, fields, node_fields, lists, externs,
+                            extern_fields, depth, ctors)
+
+def write_spec(out, **kwargs):
+    """
+    Stream a generated spec to the `out' file object, returns the number
+    of characters written.
+    """
+    count = 0
+    for chunk in generate(**kwargs):
+        out.write(chunk)
+        count += len(chunk)
+    return count
+
+def parse_option(text):
+    name, sep, value = text.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError("expected NAME=VALUE, got '%s'" % text)
+    return (name, value)
+
+def parse_args(args):
+    par = argparse.ArgumentParser(
+        description='Generate a (possibly huge) spec file for testing treegen.')
+    par.add_argument('-o', '--output', metavar='FILE', dest='outputfile', default='-',
+                     help='file to write the spec to or - for stdout (default)')
+    par.add_argument('-n', '--nodes', metavar='N', type=int, default=1000,
+                     help='number of node definitions (default 1000)')
+    par.add_argument('-f', '--fields', metavar='N', type=int, default=1,
+                     help='number of primitive fields per node (default 1)')
+    par.add_argument('-c', '--node-fields', metavar='N', type=int, default=0,
+                     help='number of node pointer fields per node, every ' +
+                          'second one is weak (default 0)')
+    par.add_argument('-l', '--lists', metavar='N', type=int, default=0,
+                     help='number of list fields per node (default 0)')
+    par.add_argument('-e', '--externs', metavar='N', type=int, default=0,
+                     help='number of extern types in the target (default 0)')
+    par.add_argument('-x', '--extern-fields', metavar='N', type=int, default=0,
+                     help='number of extern typed fields per node (default 0)')
+    par.add_argument('-v', '--visitors', metavar='N', type=int, default=0,
+                     help='number of visitor definitions (default 0)')
+    par.add_argument('-d', '--depth', metavar='N', type=int, default=1,
+                     help='length of the inheritance chains (default 1, ' +
+                          'no inheritance)')
+    par.add_argument('--no-ctors', dest='ctors', action='store_false', default=True,
+                     help='do not give nodes constructors')
+    par.add_argument('--no-accessors', dest='accessors', action='store_false',
+                     default=True, help='turn off the use_accessors option')
+    par.add_argument('--no-line-directives', dest='line_directives',
+                     action='store_false', default=True,
+                     help='turn off the use_line_directives option')
+    par.add_argument('-t', '--target-option', metavar='NAME=VALUE',
+                     dest='target_options', action='append', default=[],
+                     type=parse_option,
+                     help='extra option to put in the target block')
+    par.add_argument('-V', '--visitor-option', metavar='NAME=VALUE',
+                     dest='visitor_options', action='append', default=[],
+                     type=parse_option,
+                     help='option to put in every visitor block')
+    return par.parse_args(args[1:])
+
+def main(args):
+    args = parse_args(args)
+    kwargs = dict(vars(args))
+    del kwargs['outputfile']
+    if args.outputfile == '-':
+        count = write_spec(sys.stdout, **kwargs)
+    else:
+        with open(args.outputfile, 'w') as out:
+            count = write_spec(out, **kwargs)
+    sys.stderr.write("status: wrote %d nodes (%d characters)\n" % (args.nodes, count))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
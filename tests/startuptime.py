@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Checks the import time and the modules loaded by a few cheap `treegen'
+commands against their budgets. Run with `-h' for the options.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+TREEGEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'treegen')
+
+TRIVIAL_SPEC = '''\
+target CPlusPlus {
+    header_only: true;
+}
+
+node Trivial {
+    int value;
+}
+'''
+
+# name, arguments, import budget (ms), modules that must not be loaded
+SCENARIOS = [
+    ('help',     ['--help'],                   50.0,
+        ['libtreegen', 'ply.lex', 'ply.yacc', 'libtreegen.cplusplus']),
+    ('dump-ast', ['--dump-ast', '{spec}'],     100.0,
+        ['libtreegen.cplusplus', 'libtreegen.ccode']),
+    ('codegen',  ['-o', '{out}', '{spec}'],    120.0,
+        ['libtreegen.server', 'libtreegen.watch']),
+]
+
+def parse_importtime(text):
+    """
+    Returns a dict of module name to cumulative import time (in ms) and
+    the total time spent importing top-level modules.
+    """
+    modules = {}
+    total = 0.0
+    for line in text.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue # header line
+        cumulative = int(fields[1]) / 1000.0
+        modules[fields[2].strip()] = cumulative
+        # nested imports are indented under the module importing them
+        if len(fields[2]) - len(fields[2].lstrip()) == 1:
+            total += cumulative
+    return modules, total
+
+def run_scenario(args, runs):
+    times = []
+    imports = []
+    modules = {}
+    for i in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-X', 'importtime', TREEGEN] + args,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                              universal_newlines=True)
+        times.append((time.perf_counter() - start) * 1000.0)
+        modules, total = parse_importtime(proc.stderr)
+        imports.append(total)
+    return statistics.median(times), statistics.median(imports), modules
+
+def parse_args(args):
+    par = argparse.ArgumentParser(
+        description='Check the startup time of treegen against a budget.')
+    par.add_argument('-r', '--runs', metavar='N', type=int, default=5,
+                     help='number of runs per scenario (default 5)')
+    par.add_argument('-s', '--scale', metavar='FACTOR', type=float, default=1.0,
+                     help='multiply all budgets by FACTOR, for slow machines ' +
+                          '(default 1.0)')
+    return par.parse_args(args[1:])
+
+def main(args):
+    args = parse_args(args)
+    failed = False
+    with tempfile.TemporaryDirectory() as tmpdir:
+        spec = os.path.join(tmpdir, 'trivial.ast')
+        out = os.path.join(tmpdir, 'trivial.h')
+        with open(spec, 'w') as f:
+            f.write(TRIVIAL_SPEC)
+        for name, cmd, budget, forbidden in SCENARIOS:
+            cmd = [arg.format(spec=spec, out=out) for arg in cmd]
+            wall, imports, modules = run_scenario(cmd, args.runs)
+            budget *= args.scale
+            status = 'ok'
+            if imports > budget:
+                status = 'OVER BUDGET'
+                failed = True
+            loaded = [mod for mod in forbidden if mod in modules]
+            if loaded:
+                status = 'LOADED ' + ', '.join(loaded)
+                failed = True
+            print('%-10s wall %7.1fms  imports %7.1fms  budget %7.1fms  %s' %
+                  (name, wall, imports, budget, status))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
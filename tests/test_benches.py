@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Runs each benchmark on a tiny spec, most of them check what they measure
+(ex. that the generated code is the same either way) and fail otherwise.
+Run with `python -m unittest' or pytest.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CXX = shutil.which(os.environ.get('CXX', 'g++'))
+
+class BenchTest(unittest.TestCase):
+    def bench(self, script, *args):
+        proc = subprocess.run([sys.executable, os.path.join(TESTS_DIR, script)] + list(args),
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              universal_newlines=True)
+        self.assertEqual(proc.returncode, 0, proc.stdout)
+        return proc.stdout
+
+    def test_codegenbench(self):
+        self.bench('codegenbench.py', '-n', '50', '-r', '1')
+
+    def test_parsebench(self):
+        self.bench('parsebench.py', '-F', '200', '-r', '1')
+
+    def test_memorybench(self):
+        self.bench('memorybench.py', '-n', '100', '-f', '2')
+
+    def test_snapshotbench(self):
+        self.assertIn('verify:   ok', self.bench('snapshotbench.py', '-n', '100'))
+
+    def test_watchbench(self):
+        self.assertIn('verify:   ok', self.bench('watchbench.py', '-n', '50', '-e', '2'))
+
+    def test_linemapbench(self):
+        self.bench('linemapbench.py', '-r', '1')
+
+    def test_startuptime(self):
+        # generous budgets, this only checks that nothing unexpected is loaded
+        self.bench('startuptime.py', '-r', '1', '-s', '10')
+
+    @unittest.skipIf(CXX is None, 'no C++ compiler found')
+    def test_dispatchbench(self):
+        self.bench('dispatchbench.py', '-d', '4', '-n', '100', '-r', '1')
+
+    @unittest.skipIf(CXX is None, 'no C++ compiler found')
+    def test_kindbench(self):
+        self.bench('kindbench.py', '-d', '4', '-n', '100', '-r', '1')
+
+    @unittest.skipIf(CXX is None, 'no C++ compiler found')
+    def test_layoutbench(self):
+        self.bench('layoutbench.py', '-n', '20')
+
+if __name__ == "__main__":
+    unittest.main()
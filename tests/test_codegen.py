@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Generates the code for the specs next to this file and compares it with
+the expected output (the `.h' file of the same name), which is also
+compiled when a C++ compiler is found. Run with `python -m unittest' or
+pytest, set TREEGEN_UPDATE=1 in the environment to rewrite the expected
+output instead.
+"""
+
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+TREEGEN = os.path.join(TESTS_DIR, '..', 'treegen')
+
+sys.path.insert(0, os.path.join(TESTS_DIR, '..'))
+
+import libtreegen
+from libtreegen.server import request as server_request
+
+# compact_visitors, use_arena, use_kinds and use_dispatch, reorder_fields
+# and line_map
+SPECS = ['compact', 'arena', 'kinds', 'reorder']
+
+CXX = shutil.which(os.environ.get('CXX', 'g++'))
+UPDATE = os.environ.get('TREEGEN_UPDATE') == '1'
+
+def expected(name):
+    with open(os.path.join(TESTS_DIR, name + '.h'), 'r') as f:
+        return f.read()
+
+class CodegenTest(unittest.TestCase):
+    def setUp(self):
+        # the specs are generated from a scratch directory so that the
+        # file names in the #line directives don't depend on where it is
+        self.tmpdir = tempfile.TemporaryDirectory()
+        for name in SPECS:
+            shutil.copy(os.path.join(TESTS_DIR, name + '.ast'), self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, filename):
+        return os.path.join(self.tmpdir.name, filename)
+
+    def read(self, filename):
+        with open(self.path(filename), 'r') as f:
+            return f.read()
+
+    def treegen(self, *args, status=0):
+        proc = subprocess.run([sys.executable, TREEGEN] + list(args), cwd=self.tmpdir.name,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              universal_newlines=True)
+        self.assertEqual(proc.returncode, status, proc.stderr)
+        return proc.stdout
+
+    def test_specs(self):
+        for name in SPECS:
+            with self.subTest(name):
+                self.treegen(name + '.ast', '-o', name + '.h')
+                if UPDATE:
+                    shutil.copy(self.path(name + '.h'), TESTS_DIR)
+                self.assertEqual(self.read(name + '.h'), expected(name))
+
+    @unittest.skipIf(CXX is None, 'no C++ compiler found')
+    def test_compile(self):
+        for name in SPECS:
+            with self.subTest(name):
+                proc = subprocess.run([CXX, '-std=c++11', '-Wall', '-Werror', '-fsyntax-only',
+                                       '-x', 'c++', os.path.join(TESTS_DIR, name + '.h')],
+                                      stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                      universal_newlines=True)
+                self.assertEqual(proc.returncode, 0, proc.stdout)
+
+    def test_stdout(self):
+        # streamed as it's rendered, named after stdout instead of the file
+        code = self.treegen('arena.ast')
+        self.assertEqual(code, expected('arena').replace('ARENA_H', '_STDOUT_')
+                                                .replace('"arena.h"', '"<stdout>"'))
+
+    def test_stdout_file(self):
+        # stdout redirected to a file is seekable but isn't compared
+        with open(self.path('out.h'), 'w') as out:
+            subprocess.check_call([sys.executable, TREEGEN, 'arena.ast'],
+                                  cwd=self.tmpdir.name, stdout=out)
+        self.assertEqual(self.read('out.h'), expected('arena').replace('ARENA_H', '_STDOUT_')
+                                                          .replace('"arena.h"', '"<stdout>"'))
+
+    def test_multiple_targets(self):
+        os.mkdir(self.path('a'))
+        os.mkdir(self.path('b'))
+        for jobs in ('1', '2'):
+            with self.subTest(jobs=jobs):
+                self.treegen('-j', jobs, '-t', 'CPlusPlus=a/kinds.h',
+                             '-t', 'CPlusPlus=b/kinds.h', 'kinds.ast')
+                for out in ('a', 'b'):
+                    self.assertEqual(self.read(out + '/kinds.h'),
+                                     expected('kinds').replace('"kinds.h"', '"%s/kinds.h"' % out))
+                os.unlink(self.path('a/kinds.h'))
+                os.unlink(self.path('b/kinds.h'))
+
+    def test_unchanged_output(self):
+        self.treegen('compact.ast', '-o', 'compact.h')
+        os.utime(self.path('compact.h'), (0, 0))
+        self.treegen('compact.ast', '-o', 'compact.h')
+        self.assertEqual(os.stat(self.path('compact.h')).st_mtime, 0)
+
+    def test_cache(self):
+        # the second run loads the snapshot the first one wrote
+        for run in range(2):
+            self.treegen('--cache', 'cache', 'reorder.ast', '-o', 'reorder.h')
+            self.assertEqual(self.read('reorder.h'), expected('reorder'))
+            self.assertEqual(len(os.listdir(self.path('cache'))), 1)
+
+    def test_server(self):
+        sock = self.path('treegen.sock')
+        server = subprocess.Popen([sys.executable, TREEGEN, '--serve', sock],
+                                  cwd=self.tmpdir.name, stdout=subprocess.DEVNULL,
+                                  stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.time() + 30
+            while not os.path.exists(sock):
+                self.assertLess(time.time(), deadline, 'server did not start')
+                time.sleep(0.05)
+            with open(self.path('bad.ast'), 'w') as f:
+                f.write('node A {\n')
+            for name in SPECS:
+                self.treegen('--server', sock, name + '.ast', '-o', name + '.h')
+                self.assertEqual(self.read(name + '.h'), expected(name))
+                # a bad spec only fails its own request
+                self.treegen('--server', sock, 'bad.ast', '-o', 'bad.h', status=1)
+            # --server falls back to generating in-process, ask it directly
+            response = server_request(sock, { "spec": "kinds.ast", "filename": "kinds.ast",
+                                              "cwd": self.tmpdir.name, "output": "kinds.h" })
+            self.assertTrue(response["ok"], response["errors"])
+            self.assertEqual(response["code"], expected('kinds'))
+        finally:
+            server.terminate()
+            server.wait()
+
+    def test_watch(self):
+        for name in SPECS:
+            with self.subTest(name):
+                # with treegen's default indentation
+                watcher = libtreegen.Watcher(self.path(name + '.ast'), self.path(name + '.h'),
+                                             indent='    ', log=io.StringIO())
+                self.assertTrue(watcher.regenerate())
+                self.assertEqual(self.read(name + '.h'),
+                                 expected(name).replace('"%s.' % name,
+                                                        '"%s/%s.' % (self.tmpdir.name, name)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Checks that watch mode regenerates exactly what generating from scratch
+does after editing the spec. Run with `python -m unittest' or pytest.
+"""
+
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import libtreegen
+
+SPEC = '''\
+target CPlusPlus {
+    header_only: true;
+    use_kinds: true;
+}
+visitor Visitor { }
+abstract node A { int a; }
+node E : A { float e; }
+node B : A { bool b; }
+node C : B { string c; }
+'''
+
+class WatchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.spec_fn = os.path.join(self.tmpdir.name, 'spec.ast')
+        self.out_fn = os.path.join(self.tmpdir.name, 'spec.h')
+        self.edits = 0
+        self.write_spec(SPEC)
+        self.watcher = libtreegen.Watcher(self.spec_fn, self.out_fn, log=io.StringIO())
+        self.assertTrue(self.watcher.regenerate())
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_spec(self, text, filename=None):
+        filename = self.spec_fn if filename is None else filename
+        with open(filename, 'w') as f:
+            f.write(text)
+        # timestamps can be too coarse to tell the edits apart
+        self.edits += 1
+        stamp = os.stat(filename).st_mtime_ns + self.edits * 1000000000
+        os.utime(filename, ns=(stamp, stamp))
+
+    def edit(self, old, new, filename=None):
+        filename = self.spec_fn if filename is None else filename
+        with open(filename, 'r') as f:
+            text = f.read()
+        self.assertIn(old, text)
+        self.write_spec(text.replace(old, new), filename)
+        self.watcher.poll()
+        with open(self.spec_fn, 'r') as f:
+            spec = libtreegen.parse(f, self.spec_fn, debug=False)
+        expected = libtreegen.codegen(spec, 'CPlusPlus', None, self.out_fn, '  ')
+        with open(self.out_fn, 'r') as f:
+            self.assertEqual(f.read(), expected)
+        return expected
+
+    def test_rename_leaf(self):
+        # classof() of A and B tests for a range of kinds ending at C
+        code = self.edit('node C : B', 'node D : B')
+        self.assertIn('AKind::D', code)
+        self.assertNotIn('AKind::C', code)
+
+    def test_add_field(self):
+        self.edit('node B : A { bool b; }', 'node B : A {\n    bool b;\n    int bb;\n}')
+
+    def test_move_nodes(self):
+        self.edit('visitor Visitor { }', '\n\nvisitor Visitor { }')
+
+    def test_add_derived(self):
+        self.edit('node C : B', 'node F : C { }\nnode C : B')
+
+    def test_target_option(self):
+        self.edit('use_kinds: true;', 'use_kinds: false;')
+
+    def test_imported_file(self):
+        types_fn = os.path.join(self.tmpdir.name, 'types.ast')
+        self.write_spec('node T { int t; }\n', types_fn)
+        self.edit('visitor Visitor { }', 'import "types.ast";\nvisitor Visitor { }')
+        self.edit('int t;', 'int t; bool u;', types_fn)
+
+if __name__ == "__main__":
+    unittest.main()
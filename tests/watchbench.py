@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Times regenerating the code in watch mode after an edit, checking it
+against generating from scratch. Run with `-h' for the options.
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import specgen
+import libtreegen
+
+def parse_args(args):
+    par = argparse.ArgumentParser(
+        description='Time regenerating the code in watch mode after an edit.')
+    par.add_argument('-n', '--nodes', metavar='N', type=int, default=3000,
+                     help='number of nodes in the generated spec (default 3000)')
+    par.add_argument('-f', '--fields', metavar='N', type=int, default=4,
+                     help='number of primitive fields per node (default 4)')
+    par.add_argument('-v', '--visitors', metavar='N', type=int, default=4,
+                     help='number of visitors in the generated spec (default 4)')
+    par.add_argument('-d', '--depth', metavar='N', type=int, default=4,
+                     help='length of the inheritance chains (default 4)')
+    par.add_argument('-e', '--edits', metavar='N', type=int, default=5,
+                     help='number of edits to time (default 5)')
+    par.add_argument('--no-verify', dest='verify', action='store_false', default=True,
+                     help="don't compare the generated code")
+    return par.parse_args(args[1:])
+
+def main(args):
+    args = parse_args(args)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        spec_fn = os.path.join(tmpdir, 'bench.ast')
+        out_fn = os.path.join(tmpdir, 'bench.h')
+        with open(spec_fn, 'w') as f:
+            size = specgen.write_spec(f, nodes=args.nodes, fields=args.fields,
+                                      node_fields=1, lists=1, visitors=args.visitors,
+                                      depth=args.depth)
+        print('spec:     %d nodes, %.1fMB' % (args.nodes, size / 1e6))
+        watcher = libtreegen.Watcher(spec_fn, out_fn, log=io.StringIO())
+        start = time.perf_counter()
+        watcher.regenerate()
+        print('first:    %8.3fs' % (time.perf_counter() - start))
+        # a node with a base, so its derived nodes change too
+        index = args.nodes // 2 | 1
+        header = 'node %s : %s {\n' % (specgen.node_name(index), specgen.node_name(index - 1))
+        for edit in range(args.edits):
+            with open(spec_fn, 'r') as f:
+                text = f.read()
+            if header not in text:
+                sys.stderr.write("error: can't find node %s to edit\n" %
+                                 specgen.node_name(index))
+                return 1
+            with open(spec_fn, 'w') as f:
+                f.write(text.replace(header, header + '  int edit_%d;\n' % edit))
+            # make sure the change is seen even with coarse timestamps
+            stamp = os.stat(spec_fn).st_mtime_ns + (edit + 1) * 1000000000
+            os.utime(spec_fn, ns=(stamp, stamp))
+            start = time.perf_counter()
+            watcher.poll()
+            print('edit %-3d %8.3fs' % (edit + 1, time.perf_counter() - start))
+            if args.verify:
+                libtreegen.parser.clear_modules()
+                spec = libtreegen.parse(None, spec_fn, debug=False)
+                expected = libtreegen.codegen(spec, spec.targets[0].name, None, out_fn, '  ')
+                with open(out_fn, 'r') as f:
+                    if f.read() != expected:
+                        print('verify:   FAILED, generated code differs')
+                        return 1
+        if args.verify:
+            print('verify:   ok, generated code is identical')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))